@@ -5,3 +5,6 @@ class CadastroConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cadastro"
     verbose_name = "Cadastro de Prestadores"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,93 @@
+"""
+Cache em disco do texto e do layout dos PDFs de contrato.
+
+Ler o PDF (pdfplumber + PyMuPDF) é quase todo o tempo de
+extrator.extrair_contrato; as regex levam milissegundos. Depois da primeira
+leitura, o texto de cada página, as linhas com posição e os widgets (o que
+DocumentoPDF.exportar devolve) ficam em
+
+    MEDIA_ROOT/contratos_cache/<sha[:2]>/<sha256>.json.gz
+
+com a chave no SHA-256 do conteúdo do PDF. Reenviar o mesmo arquivo ou
+reextrair depois de mudar as regras (comando reextrair_contratos) roda só as
+regex sobre esse JSON, sem abrir o PDF.
+
+VERSAO_CACHE vai dentro do arquivo: incrementar quando DocumentoPDF mudar o
+que lê de cada página; entradas de versão antiga contam como ausentes e são
+regravadas na próxima leitura.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+from .documento_pdf import HAS_PYMUPDF, DocumentoPDF
+
+VERSAO_CACHE = 1
+
+
+def _diretorio() -> Path:
+    return Path(settings.MEDIA_ROOT) / "contratos_cache"
+
+
+def caminho_cache(sha256: str) -> Path:
+    return _diretorio() / sha256[:2] / f"{sha256}.json.gz"
+
+
+def ler(sha256: str) -> dict | None:
+    """
+    Dados de DocumentoPDF.exportar() gravados para o PDF, ou None se não
+    houver entrada válida. Entradas sem layout (gravadas sem PyMuPDF) não
+    valem quando o PyMuPDF está disponível.
+    """
+    try:
+        with gzip.open(caminho_cache(sha256), "rt", encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError):
+        return None  # entrada corrompida: é regravada na próxima leitura do PDF
+    if dados.get("versao") != VERSAO_CACHE:
+        return None
+    if dados["layout"] is None and HAS_PYMUPDF:
+        return None
+    return dados
+
+
+def gravar(sha256: str, dados: dict) -> Path:
+    """Grava a entrada de forma atômica (temporário + rename, seguro com vários processos)."""
+    caminho = caminho_cache(sha256)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    conteudo = json.dumps({"versao": VERSAO_CACHE, **dados}, ensure_ascii=False)
+    with tempfile.NamedTemporaryFile(dir=caminho.parent, suffix=".tmp", delete=False) as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode="wb") as gz:
+            gz.write(conteudo.encode("utf-8"))
+    os.replace(tmp.name, caminho)
+    return caminho
+
+
+def abrir(caminho_pdf, sha256: str) -> DocumentoPDF:
+    """DocumentoPDF do cache, se houver entrada para o SHA-256; senão, lido do PDF."""
+    dados = ler(sha256)
+    if dados is not None:
+        return DocumentoPDF.de_dados(caminho_pdf, dados)
+    return DocumentoPDF(caminho_pdf)
+
+
+def guardar(sha256: str, doc: DocumentoPDF) -> bool:
+    """
+    Grava o texto e o layout de `doc` (lidos do PDF) no cache. Falhas ao ler
+    páginas ainda não lidas ou ao gravar não interrompem a extração: o PDF
+    só volta a ser lido na próxima vez.
+    """
+    if doc.do_cache:
+        return True
+    try:
+        gravar(sha256, doc.exportar())
+    except Exception:
+        return False
+    return True
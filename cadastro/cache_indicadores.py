@@ -0,0 +1,89 @@
+"""
+Cache dos dashboards de indicadores.
+
+Os dados calculados por cada dashboard (séries, rótulos, listas de filtros)
+são guardados no cache do Django sob a chave (view, filtros, versão dos
+dados). A versão (VersaoDados) é incrementada por sinais quando um upload
+muda de status ou quando prestadores, especialidades, mapeamentos, médicos
+e serviços são editados — a partir daí as chaves antigas simplesmente
+deixam de ser lidas e expiram sozinhas. Só os dados entram no cache, nunca o HTML: a página continua
+sendo renderizada por request (usuário logado, mensagens, CSRF).
+
+O backend é configurado em settings.CACHES (CACHE_BACKEND no .env).
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import VersaoDados
+
+CHAVE_VERSAO = "indicadores"
+
+_PREFIXO = "indicadores"
+_CONTADORES = ("acertos", "faltas")
+
+
+def versao_dados() -> int:
+    versao = (
+        VersaoDados.objects.filter(chave=CHAVE_VERSAO)
+        .values_list("versao", flat=True).first()
+    )
+    return versao or 0
+
+
+def incrementar_versao() -> None:
+    """Invalida todos os dashboards em cache (chamada pelos sinais)."""
+    if not VersaoDados.objects.filter(chave=CHAVE_VERSAO).update(versao=F("versao") + 1):
+        VersaoDados.objects.get_or_create(chave=CHAVE_VERSAO, defaults={"versao": 1})
+
+
+def _contar(nome: str) -> None:
+    chave = f"{_PREFIXO}:stats:{nome}"
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # Contador ainda não existe (ou expirou): cria sem expiração
+        if not cache.add(chave, 1, timeout=None):
+            cache.incr(chave)
+
+
+def estatisticas() -> dict:
+    """Acertos/faltas acumulados no backend de cache e a versão atual."""
+    valores = cache.get_many([f"{_PREFIXO}:stats:{n}" for n in _CONTADORES])
+    dados = {n: valores.get(f"{_PREFIXO}:stats:{n}", 0) for n in _CONTADORES}
+    total = dados["acertos"] + dados["faltas"]
+    dados["taxa_acerto"] = round(dados["acertos"] / total, 3) if total else None
+    dados["versao_dados"] = versao_dados()
+    return dados
+
+
+def chave_cache(view: str, filtros: dict, versao: int) -> str:
+    resumo = hashlib.sha1(
+        json.dumps(filtros, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f"{_PREFIXO}:{view}:v{versao}:{resumo}"
+
+
+def etag_indicadores(view: str, filtros: dict) -> str:
+    """ETag forte das séries de `view`: muda junto com a versão dos dados."""
+    return hashlib.sha1(chave_cache(view, filtros, versao_dados()).encode()).hexdigest()
+
+
+def dados_em_cache(view: str, filtros: dict, calcular):
+    """
+    Devolve os dados do dashboard `view` para `filtros`, calculando-os com
+    `calcular()` apenas se ainda não estiverem em cache nesta versão.
+    """
+    chave = chave_cache(view, filtros, versao_dados())
+    dados = cache.get(chave)
+    if dados is not None:
+        _contar("acertos")
+        return dados
+    _contar("faltas")
+    dados = calcular()
+    cache.set(chave, dados, timeout=getattr(settings, "INDICADORES_CACHE_TIMEOUT", 3600))
+    return dados
@@ -0,0 +1,126 @@
+"""
+Cache em disco dos relatórios XLSX gerados (o sistema não gera relatório
+de produção em PDF; só o XLSX passa por aqui).
+
+Cada arquivo fica em MEDIA_ROOT/relatorios_cache/<prestador>/ com o nome
+<AAAA-MM>_v<versão dos dados>_l<versão do layout>.xlsx. A versão dos dados
+é a mesma dos dashboards (cache_indicadores.versao_dados): os sinais a
+incrementam quando uploads, prestadores, especialidades, serviços,
+mapeamentos ou médicos mudam — tudo o que entra em parametros_relatorio.
+Assim a chave sai de uma única consulta, e um acerto não monta índice de
+mapeamentos nem agrega produção. A versão é lida antes de gerar: se os
+dados mudarem durante a geração, o arquivo fica sob a versão antiga e
+nunca é servido. Entradas de outras versões do mesmo prestador e período
+são apagadas quando a nova é gravada.
+
+O diretório é limitado a RELATORIOS_CACHE_MAX_MB; ao gravar, os arquivos
+usados há mais tempo (mtime, renovado a cada acerto) são removidos primeiro.
+Um acerto devolve a entrada já aberta; um relatório recém-gerado é servido
+da memória. No Windows, um arquivo aberto (um download em andamento) não
+pode ser substituído nem apagado: a gravação e a poda o deixam para depois.
+"""
+
+import io
+
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from django.conf import settings
+
+from .cache_indicadores import versao_dados
+
+# Incrementar quando o layout de relatorio_producao mudar
+VERSAO_LAYOUT = 1
+
+
+def _diretorio() -> Path:
+    return Path(settings.MEDIA_ROOT) / "relatorios_cache"
+
+
+def caminho_relatorio(prestador_pk: int, mes_ini: int, ano_ini: int, versao: int) -> Path:
+    """Entrada do relatório do prestador para o período e a versão dos dados."""
+    nome = f"{ano_ini}-{mes_ini:02d}_v{versao}_l{VERSAO_LAYOUT}.xlsx"
+    return _diretorio() / str(prestador_pk) / nome
+
+
+def abrir(caminho: Path) -> Optional[BinaryIO]:
+    """Entrada aberta para leitura (None se não existe); renova sua posição na ordem LRU."""
+    try:
+        arquivo = open(caminho, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass  # podada logo após a abertura, ou em uso (Windows): só perde a renovação
+    return arquivo
+
+
+def gravar(caminho: Path, conteudo: bytes) -> None:
+    """
+    Grava a entrada de forma atômica (arquivo temporário + rename, seguro
+    com vários workers), apaga as versões antigas do mesmo prestador e
+    período e aplica o limite de tamanho.
+    """
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=caminho.parent, suffix=".tmp", delete=False) as tmp:
+        tmp.write(conteudo)
+    try:
+        os.replace(tmp.name, caminho)
+    except PermissionError:
+        # Windows: a mesma entrada já existe e está sendo lida; o conteúdo é igual
+        _apagar(Path(tmp.name))
+
+    periodo = caminho.name.split("_", 1)[0]
+    for antigo in caminho.parent.glob(f"{periodo}_*.xlsx"):
+        if antigo != caminho:
+            _apagar(antigo)
+
+    _podar(getattr(settings, "RELATORIOS_CACHE_MAX_MB", 200) * 1024 * 1024)
+
+
+def _apagar(arquivo: Path) -> bool:
+    """Remove o arquivo; False se ele está aberto (Windows) e fica para a próxima poda."""
+    try:
+        arquivo.unlink(missing_ok=True)
+    except OSError:
+        return False
+    return True
+
+
+def _podar(limite: int) -> None:
+    """Remove as entradas menos usadas até o diretório caber em `limite` bytes."""
+    entradas = []
+    for arquivo in _diretorio().glob("*/*.xlsx"):
+        try:
+            info = arquivo.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((info.st_mtime, info.st_size, arquivo))
+
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, arquivo in sorted(entradas, key=lambda e: e[0]):
+        if total <= limite:
+            break
+        if _apagar(arquivo):
+            total -= tamanho
+
+
+def relatorio_em_cache(prestador_pk: int, mes_ini: int, ano_ini: int,
+                       gerar: Callable[[], bytes]) -> tuple[BinaryIO, bool]:
+    """
+    XLSX do prestador para o período, aberto para leitura (o próprio arquivo
+    em cache ou, se acabou de ser gerado, um BytesIO); `gerar() -> bytes` só
+    é chamado (e só então os parâmetros do relatório são calculados) quando
+    a entrada da versão atual não está em disco.
+    Devolve (arquivo, True se veio do cache).
+    """
+    caminho = caminho_relatorio(prestador_pk, mes_ini, ano_ini, versao_dados())
+    arquivo = abrir(caminho)
+    if arquivo is not None:
+        return arquivo, True
+    conteudo = gerar()
+    gravar(caminho, conteudo)
+    return io.BytesIO(conteudo), False
@@ -0,0 +1,116 @@
+"""
+Consultas de produção usadas pelos dashboards de indicadores.
+
+Tudo é agregado no banco sobre a tabela de fatos (ProducaoFato) com
+values(...).annotate(Sum(...)); as funções devolvem apenas as tuplas já
+somadas. Filtros de médico e de agenda viram cláusulas WHERE.
+
+Médicos são filtrados pelo FK `medico` (resolvido na importação, ver
+vinculo_medicos). Chaves de agenda/profissional estão sempre normalizadas
+(ver normalizacao.normalizar_nome); os filtros por trecho de nome devem vir
+na mesma forma.
+"""
+
+import calendar
+from datetime import date
+
+from django.db.models import Q, Sum
+
+from .models import ProducaoFato, UploadVigente
+
+
+def meses_disponiveis():
+    """
+    [("AAAA-MM", "Mês/AAAA"), …] dos meses com upload confirmado, em ordem.
+    Lê os ponteiros UploadVigente (um por mês/tipo), não o histórico de uploads.
+    """
+    meses = (
+        UploadVigente.objects.order_by("mes")
+        .values_list("mes", flat=True).distinct()
+    )
+    return [(m.strftime("%Y-%m"), m.strftime("%b/%Y").capitalize()) for m in meses]
+
+
+def intervalo_meses(chaves):
+    """Primeiro e último dia cobertos por uma lista ordenada de chaves "AAAA-MM"."""
+    ano_ini, mes_ini = int(chaves[0][:4]), int(chaves[0][5:])
+    ano_fim, mes_fim = int(chaves[-1][:4]), int(chaves[-1][5:])
+    return (
+        date(ano_ini, mes_ini, 1),
+        date(ano_fim, mes_fim, calendar.monthrange(ano_fim, mes_fim)[1]),
+    )
+
+
+def _fatos(ini, fim, medicos):
+    """
+    Fatos do intervalo. Com `medicos` (pks de Medico) restringe às linhas
+    desses profissionais; sem médicos usa os totais das agendas.
+    """
+    fatos = ProducaoFato.objects.filter(mes__gte=ini, mes__lte=fim)
+    if medicos:
+        return fatos.filter(medico_id__in=list(medicos))
+    return fatos.filter(profissional_chave="")
+
+
+def producao_por_agenda_mes(
+    ini, fim, medicos=None, *,
+    agendas=None, trecho_agenda="", trecho_medico="", campo="agend_totais",
+):
+    """
+    Soma de `campo` agrupada por agenda e mês.
+
+    Retorna { (agenda_chave, "AAAA-MM"): total }. `agendas` limita às
+    chaves informadas; `trecho_agenda` / `trecho_medico` filtram por parte
+    do nome (já normalizada).
+    """
+    fatos = _fatos(ini, fim, medicos)
+    if agendas is not None:
+        fatos = fatos.filter(agenda_chave__in=list(agendas))
+    if trecho_agenda:
+        fatos = fatos.filter(agenda_chave__contains=trecho_agenda)
+    if trecho_medico:
+        fatos = fatos.filter(profissional_chave__contains=trecho_medico)
+
+    return {
+        (agenda, mes.strftime("%Y-%m")): total
+        for agenda, mes, total in (
+            fatos.values("agenda_chave", "mes")
+            .annotate(total=Sum(campo))
+            .values_list("agenda_chave", "mes", "total")
+        )
+    }
+
+
+def agendas_com_producao(ini, fim, medicos=None):
+    """Chaves das agendas com alguma linha de produção no intervalo."""
+    return sorted(
+        _fatos(ini, fim, medicos)
+        .order_by()
+        .values_list("agenda_chave", flat=True)
+        .distinct()
+    )
+
+
+def producao_por_prestador_agenda_mes(ini, fim, *, agendas=None, campo="agend_totais"):
+    """
+    Soma de `campo` por prestador, agenda e mês — todos os prestadores ativos
+    numa única consulta agregada.
+
+    Retorna { (prestador_id, agenda_chave, "AAAA-MM"): total }. As linhas dos
+    médicos ativos entram sob o prestador do médico; os totais das agendas
+    (usados pelos prestadores sem médicos cadastrados) vêm com prestador_id None.
+    """
+    fatos = ProducaoFato.objects.filter(mes__gte=ini, mes__lte=fim).filter(
+        Q(medico__ativo=True, medico__prestador__ativo=True) | Q(profissional_chave="")
+    )
+    if agendas is not None:
+        fatos = fatos.filter(agenda_chave__in=list(agendas))
+
+    return {
+        (prestador_id, agenda, mes.strftime("%Y-%m")): total
+        for prestador_id, agenda, mes, total in (
+            fatos.values("medico__prestador_id", "agenda_chave", "mes")
+            .annotate(total=Sum(campo))
+            .values_list("medico__prestador_id", "agenda_chave", "mes", "total")
+        )
+    }
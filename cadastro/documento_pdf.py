@@ -0,0 +1,174 @@
+"""
+Documento PDF aberto uma única vez, com leitura preguiçosa por página.
+
+A extração de contratos (extrator.extrair_contrato) usa duas visões do
+mesmo arquivo:
+  - o texto do pdfplumber, base das regex do contrato;
+  - o layout do PyMuPDF: linhas com a posição de cada span, o texto
+    simples da página e os widgets de formulário (FullName do DocuSign).
+
+Cada biblioteca abre o arquivo no máximo uma vez, e cada página é lida no
+máximo uma vez por biblioteca: o texto simples do PyMuPDF é montado a
+partir das mesmas linhas usadas para localizar os blocos de assinatura,
+em vez de uma nova passada com get_text(). Use como context manager:
+
+    with DocumentoPDF(caminho) as doc:
+        doc.texto, doc.linhas(0), doc.widgets(0)
+
+exportar() devolve o texto e o layout de todas as páginas em tipos JSON, e
+DocumentoPDF.de_dados() recria o documento a partir deles sem abrir o PDF
+(é o que o cache_contratos guarda em disco).
+"""
+
+from typing import NamedTuple
+
+try:
+    import pdfplumber
+    HAS_PDFPLUMBER = True
+except ImportError:
+    HAS_PDFPLUMBER = False
+
+try:
+    import fitz  # PyMuPDF
+    HAS_PYMUPDF = True
+except ImportError:
+    HAS_PYMUPDF = False
+
+
+class Span(NamedTuple):
+    texto: str
+    bbox: tuple  # (x0, y0, x1, y1)
+
+
+class Widget(NamedTuple):
+    nome: str    # field_name
+    valor: str   # field_value
+    y0: float
+
+
+class DocumentoPDF:
+
+    def __init__(self, caminho_pdf):
+        self.caminho = str(caminho_pdf)
+        self._plumber = None
+        self._fitz = None
+        self._textos = {}     # página -> texto do pdfplumber
+        self._linhas = {}     # página -> [[Span, …], …] do PyMuPDF
+        self._widgets = {}    # página -> [Widget, …]
+        self._texto = None
+        self._n_paginas = None
+        self._n_paginas_layout = None
+        self._tem_layout = HAS_PYMUPDF
+        self.do_cache = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self) -> None:
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+        if self._fitz is not None:
+            self._fitz.close()
+            self._fitz = None
+
+    # ── pdfplumber ───────────────────────────────────────────────────────────
+
+    def _pdf_plumber(self):
+        if self._plumber is None:
+            if not HAS_PDFPLUMBER:
+                raise ImportError("pdfplumber não está instalado. Execute: pip install pdfplumber")
+            self._plumber = pdfplumber.open(self.caminho)
+        return self._plumber
+
+    @property
+    def n_paginas(self) -> int:
+        if self._n_paginas is None:
+            self._n_paginas = len(self._pdf_plumber().pages)
+        return self._n_paginas
+
+    def texto_pagina(self, i: int) -> str:
+        """Texto da página `i` segundo o pdfplumber ("" se vazia)."""
+        if i not in self._textos:
+            self._textos[i] = self._pdf_plumber().pages[i].extract_text() or ""
+        return self._textos[i]
+
+    @property
+    def texto(self) -> str:
+        """Texto de todas as páginas (pdfplumber), uma página por bloco."""
+        if self._texto is None:
+            self._texto = "\n".join(t for t in map(self.texto_pagina, range(self.n_paginas)) if t)
+        return self._texto
+
+    # ── PyMuPDF ──────────────────────────────────────────────────────────────
+
+    @property
+    def tem_layout(self) -> bool:
+        return self._tem_layout
+
+    def _doc_fitz(self):
+        if self._fitz is None:
+            self._fitz = fitz.open(self.caminho)
+        return self._fitz
+
+    @property
+    def n_paginas_layout(self) -> int:
+        if self._n_paginas_layout is None:
+            self._n_paginas_layout = self._doc_fitz().page_count
+        return self._n_paginas_layout
+
+    def linhas(self, i: int) -> list:
+        """Linhas de texto da página `i`, cada uma como lista de Span (em ordem)."""
+        if i not in self._linhas:
+            self._linhas[i] = [
+                [Span(span["text"], tuple(span["bbox"])) for span in linha.get("spans", [])]
+                for bloco in self._doc_fitz()[i].get_text("dict")["blocks"]
+                for linha in bloco.get("lines", [])
+            ]
+        return self._linhas[i]
+
+    def texto_layout(self, i: int) -> str:
+        """Texto simples da página `i` (PyMuPDF): uma linha por linha de layout."""
+        return "".join("".join(s.texto for s in linha) + "\n" for linha in self.linhas(i))
+
+    def widgets(self, i: int) -> list:
+        """Widgets de formulário da página `i` com nome e valor preenchidos."""
+        if i not in self._widgets:
+            self._widgets[i] = [
+                Widget(w.field_name or "", w.field_value, w.rect.y0)
+                for w in self._doc_fitz()[i].widgets()
+                if w.field_value
+            ]
+        return self._widgets[i]
+
+    # ── Exportação (cache_contratos) ─────────────────────────────────────────
+
+    @classmethod
+    def de_dados(cls, caminho_pdf, dados: dict) -> "DocumentoPDF":
+        """Documento já lido, a partir do dicionário de exportar(); não abre o PDF."""
+        doc = cls(caminho_pdf)
+        doc.do_cache = True
+        doc._textos = dict(enumerate(dados["paginas"]))
+        doc._n_paginas = len(dados["paginas"])
+        doc._tem_layout = dados["layout"] is not None
+        for i, pagina in enumerate(dados["layout"] or []):
+            doc._linhas[i] = [[Span(t, tuple(bbox)) for t, bbox in linha] for linha in pagina["linhas"]]
+            doc._widgets[i] = [Widget(*w) for w in pagina["widgets"]]
+        doc._n_paginas_layout = len(doc._linhas)
+        return doc
+
+    def exportar(self) -> dict:
+        """Texto e layout de todas as páginas (lê as que faltam), só com tipos JSON."""
+        layout = None
+        if self.tem_layout:
+            layout = [
+                {
+                    "linhas": [[[s.texto, list(s.bbox)] for s in linha] for linha in self.linhas(i)],
+                    "widgets": [list(w) for w in self.widgets(i)],
+                }
+                for i in range(self.n_paginas_layout)
+            ]
+        return {"paginas": [self.texto_pagina(i) for i in range(self.n_paginas)], "layout": layout}
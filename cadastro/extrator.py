@@ -8,29 +8,34 @@ Versão 3 – correções:
     (ex: "Tatiana" em vez de "Tatiana Rozov") e usa o fallback regex do pdfplumber.
   - Tabela Anexo 1 Formato B: estratégia reescrita para capturar linhas da tabela
     1.3 mesmo quando o pdfplumber as fragmenta em múltiplas linhas.
+
+Versão 4 – desempenho:
+  - As regex são compiladas uma vez, no carregamento do módulo.
+  - Cada extrator procura só na sua seção do contrato (preâmbulo, Anexo 1,
+    bloco de assinaturas), localizada por SecoesContrato numa única passada
+    pelo texto; se o campo não estiver lá, a busca volta ao trecho onde era
+    feita antes. Comparação com a busca no texto todo: bench_extrator.
 """
 
 import re
 from datetime import date
 from dateutil.relativedelta import relativedelta
 
-try:
-    import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
-
-try:
-    import fitz  # PyMuPDF
-    HAS_PYMUPDF = True
-except ImportError:
-    HAS_PYMUPDF = False
+from . import cache_contratos
+from .documento_pdf import DocumentoPDF
 
 
 # ---------------------------------------------------------------------------
 # Utilitários
 # ---------------------------------------------------------------------------
 
+_RE_DATA_EXTENSO = re.compile(r"(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})", re.IGNORECASE)
+_RE_DATA_BARRAS = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_NAO_DIGITO = re.compile(r"[^\d]")
+_RE_SO_NUMEROS = re.compile(r"^[\d\s\.\-]+$")
+
+
 def _mes_pt(nome: str) -> int:
     meses = {
         "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3,
@@ -42,20 +47,24 @@ def _mes_pt(nome: str) -> int:
 
 
 def _parse_data_pt(texto: str) -> date | None:
-    m = re.search(r"(\d{1,2})\s+de\s+(\w+)\s+de\s+(\d{4})", texto, re.IGNORECASE)
+    m = _RE_DATA_EXTENSO.search(texto)
     if m:
         dia, mes_nome, ano = int(m.group(1)), m.group(2), int(m.group(3))
         mes = _mes_pt(mes_nome)
         if mes:
             return date(ano, mes, dia)
-    m = re.search(r"(\d{1,2})/(\d{1,2})/(\d{4})", texto)
+    m = _RE_DATA_BARRAS.search(texto)
     if m:
         return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
     return None
 
 
 def _limpar(texto: str) -> str:
-    return re.sub(r"\s+", " ", texto).strip()
+    return _RE_ESPACOS.sub(" ", texto).strip()
+
+
+def _formatar_cpf(digitos: str) -> str:
+    return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
 
 
 def _title_case_nome(nome: str) -> str:
@@ -74,39 +83,161 @@ def _title_case_nome(nome: str) -> str:
     return " ".join(resultado)
 
 
-def _extrair_texto_pdf(caminho_pdf) -> str:
-    if not HAS_PDFPLUMBER:
-        raise ImportError("pdfplumber não está instalado. Execute: pip install pdfplumber")
-    texto = []
-    with pdfplumber.open(caminho_pdf) as pdf:
-        for pagina in pdf.pages:
-            t = pagina.extract_text()
-            if t:
-                texto.append(t)
-    return "\n".join(texto)
+# ---------------------------------------------------------------------------
+# Índice de seções
+# ---------------------------------------------------------------------------
+
+_RE_ANEXO1 = re.compile(r"ANEXO\s+[I1]\b|ANEXO\s+III\s*[:\-]?\s*CONTRATO", re.IGNORECASE)
 
+# Títulos em início de linha; a busca ancorada em ^ custa o mesmo que uma
+# única regex sobre o texto, bem menos que uma alternância solta com IGNORECASE.
+_RE_TITULOS = re.compile(
+    r"^[ \t]*(?:"
+    r"(?P<anexo1>ANEXO\s+[I1]\b|ANEXO\s+III\s*[:\-]?\s*CONTRATO)"
+    r"|(?P<item>\d{1,2}\.\d{1,2})(?!\d)"
+    r"|(?P<assinatura>CONTRATADO\s*\(A\)|Testemunha)"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
 
-def _localizar_anexo1(texto: str) -> str:
+
+class SecoesContrato:
     """
-    Retorna o trecho do texto a partir do "ANEXO 1" (Condições Específicas),
-    pois é nessa seção que ficam os dados mais confiáveis da contratada.
-    Se não encontrar, retorna o texto completo.
+    Trechos do texto de um contrato, localizados numa única passada pelos
+    títulos em início de linha:
+
+      - "preambulo": do início até o primeiro item numerado ("1.1") ou o
+        Anexo 1 — a qualificação da contratada;
+      - "anexo1": do título "ANEXO 1" (Condições Específicas) ao fim. Sem o
+        título em início de linha, vale a primeira menção no texto, como
+        antes do índice;
+      - "assinatura": do primeiro bloco "CONTRATADO (A)" / "Testemunha" ao fim.
+
+    Seção não encontrada é o texto todo. Valor mensal, valor global e a
+    tabela 3.1 são procurados primeiro no Anexo 1, onde ficam os valores
+    contratados: uma menção anterior no corpo do contrato não prevalece.
+
+    Com `indexar=False` não há seções: cada extrator varre o texto todo,
+    exatamente como antes do índice (é a referência do bench_extrator). Em
+    ambos os modos, objeto, serviços contratados e vigência leem o trecho
+    de trecho_anexo1().
     """
-    m = re.search(r"ANEXO\s+[I1]\b|ANEXO\s+III\s*[:\-]?\s*CONTRATO", texto, re.IGNORECASE)
-    if m:
-        return texto[m.start():]
-    return texto
+
+    def __init__(self, texto: str, indexar: bool = True):
+        self.texto = texto
+        self._inicios = {}
+        if indexar:
+            for m in _RE_TITULOS.finditer(texto):
+                self._inicios.setdefault(m.lastgroup, m.start(m.lastgroup))
+                if len(self._inicios) == 3:
+                    break
+        fins_preambulo = [self._inicios[t] for t in ("item", "anexo1") if t in self._inicios]
+        self._fim_preambulo = min(fins_preambulo, default=None)
+
+        # Sem o título em início de linha, vale a primeira menção ao Anexo 1
+        if "anexo1" in self._inicios:
+            self._inicio_anexo1 = self._inicios["anexo1"]
+        else:
+            m = _RE_ANEXO1.search(texto)
+            self._inicio_anexo1 = m.start() if m else 0
+            if indexar:
+                self._inicios["anexo1"] = self._inicio_anexo1
+        self._trechos = {}
+
+    def trecho_anexo1(self) -> str:
+        """Do Anexo 1 ao fim (o texto todo se não houver), com ou sem índice."""
+        return self.texto[self._inicio_anexo1:]
+
+    def trecho(self, secao: str) -> str:
+        if secao not in self._trechos:
+            if secao == "preambulo":
+                self._trechos[secao] = self.texto[:self._fim_preambulo]
+            else:
+                self._trechos[secao] = self.texto[self._inicios.get(secao, 0):]
+        return self._trechos[secao]
+
+    def buscar(self, padrao: re.Pattern, secao: str) -> re.Match | None:
+        """Primeiro casamento de `padrao` na seção ou, se não houver, no texto todo."""
+        trecho = self.trecho(secao)
+        m = padrao.search(trecho)
+        if m is None and len(trecho) < len(self.texto):
+            m = padrao.search(self.texto)
+        return m
+
+
+def _vazio(valor) -> bool:
+    if isinstance(valor, dict):
+        return not any(valor.values())
+    if isinstance(valor, tuple):
+        return not any(valor)
+    return not valor
+
+
+def _na_secao(secoes: SecoesContrato, secao: str, extrator):
+    """
+    Aplica `extrator` ao trecho da seção; se ele não achar nada, repete no
+    texto todo (onde o campo era procurado antes do índice).
+    """
+    trecho = secoes.trecho(secao)
+    valor = extrator(trecho)
+    if _vazio(valor) and len(trecho) < len(secoes.texto):
+        valor = extrator(secoes.texto)
+    return valor
 
 
 # ---------------------------------------------------------------------------
 # Extratores via PyMuPDF (widgets DocuSign + texto de páginas específicas)
 # ---------------------------------------------------------------------------
 
-def _extrair_widgets_docusign(caminho_pdf) -> dict:
+_RE_ID_DOCUSIGN = re.compile(r"^[0-9a-f\-]{30,}$", re.IGNORECASE)
+_RE_ROTULO_CONTRATADO = re.compile(r"CONTRATADO\s*\(A\)", re.IGNORECASE)
+_RE_ROTULO_TESTEMUNHA = re.compile(r"Testemunha[\s\S]{0,30}?Contratado", re.IGNORECASE)
+_RE_ASSINATURA_CONTRATADO = re.compile(
+    r"CONTRATADO\s*\(A\)[\s\S]{0,80}?"
+    r"Nome\s*:\s*([^\n\r]+?)[\s\S]{0,40}?"
+    r"CPF\s*:\s*([\d\s\.\-]{9,14})",
+    re.IGNORECASE,
+)
+_RE_CPF_CONTRATADO = re.compile(
+    r"CONTRATADO\s*\(A\)[\s\S]{0,120}?CPF\s*:\s*([\d\s\.\-]{9,14})", re.IGNORECASE
+)
+_RE_NOME_TESTEMUNHA = re.compile(
+    r"Testemunha[\s\S]{0,30}?Contratado\s*\(A?\)[\s\S]{0,120}?"
+    r"Nome\s*:\s*([A-Z][A-Za-zÀ-ÿ\s]{3,60}?)(?:\s*\n|\s*CPF)",
+    re.IGNORECASE,
+)
+_RE_CPF_TESTEMUNHA = re.compile(
+    r"Testemunha[\s\S]{0,30}?Contratado[\s\S]{0,150}?CPF\s*:\s*([\d\s\.\-]{9,14})", re.IGNORECASE
+)
+
+
+def _fullnames(widgets) -> list[tuple[float, str]]:
+    """(y, valor) dos widgets FullName preenchidos, ignorando IDs hexadecimais do DocuSign."""
+    nomes = []
+    for w in widgets:
+        if "FullName" in w.nome:
+            val = w.valor.strip()
+            if not _RE_ID_DOCUSIGN.match(val):
+                nomes.append((w.y0, val))
+    return nomes
+
+
+def _y_ultima_linha_com(linhas, padrao: re.Pattern) -> float | None:
+    """Base (y1) do primeiro span que casa com `padrao` na última linha em que ele aparece."""
+    y = None
+    for linha in linhas:
+        for span in linha:
+            if padrao.search(span.texto):
+                y = span.bbox[3]
+                break
+    return y
+
+
+def _extrair_widgets_docusign(doc: DocumentoPDF) -> dict:
     """
-    Usa PyMuPDF para:
+    Usa o layout do PyMuPDF (via DocumentoPDF, cada página lida uma vez) para:
     1. Ler campos de formulário FullName preenchidos pelo DocuSign (nome contratado).
-    2. Ler o texto da última página do documento assinado para capturar:
+    2. Ler o texto das páginas do documento assinado para capturar:
        - Nome e CPF do CONTRATADO(A) (bloco de assinatura)
        - Nome e CPF da Testemunha Contratado(A)
     """
@@ -116,32 +247,17 @@ def _extrair_widgets_docusign(caminho_pdf) -> dict:
         "nome_testemunha": "",
         "cpf_testemunha": "",
     }
-    if not HAS_PYMUPDF:
+    if not doc.tem_layout:
         return resultado
 
     try:
-        doc = fitz.open(str(caminho_pdf))
-
         # -----------------------------------------------------------------
         # Estratégia 1: widgets FullName na página 1 (Termo de Adesão)
         # Rejeita nomes com apenas UMA palavra (ex: "Tatiana" em vez de
         # "Tatiana Rozov") — são assinaturas desenhadas/abreviadas do DocuSign.
         # -----------------------------------------------------------------
-        page0 = doc[0]
-        y_contratado = None
-        for b in page0.get_text("dict")["blocks"]:
-            for line in b.get("lines", []):
-                for span in line.get("spans", []):
-                    if re.search(r"CONTRATADO\s*\(A\)", span["text"], re.IGNORECASE):
-                        y_contratado = span["bbox"][3]
-                        break
-
-        fullnames = []
-        for w in page0.widgets():
-            if "FullName" in (w.field_name or "") and w.field_value:
-                val = w.field_value.strip()
-                if not re.match(r"^[0-9a-f\-]{30,}$", val, re.IGNORECASE):
-                    fullnames.append((w.rect.y0, val))
+        y_contratado = _y_ultima_linha_com(doc.linhas(0), _RE_ROTULO_CONTRATADO)
+        fullnames = _fullnames(doc.widgets(0))
 
         if fullnames:
             fullnames.sort(key=lambda x: x[0])
@@ -161,60 +277,37 @@ def _extrair_widgets_docusign(caminho_pdf) -> dict:
         # Estratégia 2: varrer TODAS as páginas buscando bloco de assinatura
         # com 'CONTRATADO (A)' / 'Testemunha Contratado'
         # -----------------------------------------------------------------
-        texto_completo_doc = []
-        for pg in doc:
-            t = pg.get_text()
-            if t:
-                texto_completo_doc.append(t)
-        texto_todas = "\n".join(texto_completo_doc)
+        paginas = range(doc.n_paginas_layout)
+        texto_todas = "\n".join(t for t in map(doc.texto_layout, paginas) if t)
+        secoes = SecoesContrato(texto_todas)
 
         # Nome e CPF do CONTRATADO(A) a partir do bloco de assinatura textual
         if not resultado["nome_contratado"]:
-            m_cont = re.search(
-                r"CONTRATADO\s*\(A\)[\s\S]{0,80}?"
-                r"Nome\s*:\s*([^\n\r]+?)[\s\S]{0,40}?"
-                r"CPF\s*:\s*([\d\s\.\-]{9,14})",
-                texto_todas, re.IGNORECASE
-            )
+            m_cont = secoes.buscar(_RE_ASSINATURA_CONTRATADO, "assinatura")
             if m_cont:
                 nome_raw = _limpar(m_cont.group(1))
-                if nome_raw and not re.match(r"^[\d\s\.\-]+$", nome_raw):
+                if nome_raw and not _RE_SO_NUMEROS.match(nome_raw):
                     resultado["nome_contratado"] = _title_case_nome(nome_raw)
-                cpf_raw = re.sub(r"[^\d]", "", m_cont.group(2))
+                cpf_raw = _RE_NAO_DIGITO.sub("", m_cont.group(2))
                 if len(cpf_raw) == 11:
-                    resultado["cpf_contratado"] = f"{cpf_raw[:3]}.{cpf_raw[3:6]}.{cpf_raw[6:9]}-{cpf_raw[9:]}"
+                    resultado["cpf_contratado"] = _formatar_cpf(cpf_raw)
 
         # CPF do contratado (mesmo que o nome já tenha sido capturado)
         if not resultado["cpf_contratado"]:
-            m_cpf = re.search(
-                r"CONTRATADO\s*\(A\)[\s\S]{0,120}?CPF\s*:\s*([\d\s\.\-]{9,14})",
-                texto_todas, re.IGNORECASE
-            )
+            m_cpf = secoes.buscar(_RE_CPF_CONTRATADO, "assinatura")
             if m_cpf:
-                cpf_raw = re.sub(r"[^\d]", "", m_cpf.group(1))
+                cpf_raw = _RE_NAO_DIGITO.sub("", m_cpf.group(1))
                 if len(cpf_raw) == 11:
-                    resultado["cpf_contratado"] = f"{cpf_raw[:3]}.{cpf_raw[3:6]}.{cpf_raw[6:9]}-{cpf_raw[9:]}"
+                    resultado["cpf_contratado"] = _formatar_cpf(cpf_raw)
 
         # -----------------------------------------------------------------
         # Estratégia 3: testemunha do contratado
         # -----------------------------------------------------------------
-        for pg in doc:
-            y_test = None
-            for b in pg.get_text("dict")["blocks"]:
-                for line in b.get("lines", []):
-                    for span in line.get("spans", []):
-                        txt = span["text"]
-                        if re.search(r"Testemunha[\s\S]{0,30}?Contratado", txt, re.IGNORECASE):
-                            y_test = span["bbox"][3]
-                            break
+        for pagina in paginas:
+            y_test = _y_ultima_linha_com(doc.linhas(pagina), _RE_ROTULO_TESTEMUNHA)
 
             if y_test is not None:
-                fntest = []
-                for w in pg.widgets():
-                    if "FullName" in (w.field_name or "") and w.field_value:
-                        val = w.field_value.strip()
-                        if not re.match(r"^[0-9a-f\-]{30,}$", val, re.IGNORECASE):
-                            fntest.append((w.rect.y0, val))
+                fntest = _fullnames(doc.widgets(pagina))
                 if fntest:
                     fntest.sort(key=lambda x: x[0])
                     for y, val in fntest:
@@ -224,28 +317,20 @@ def _extrair_widgets_docusign(caminho_pdf) -> dict:
 
         # Fallback: regex sobre texto de todas as páginas
         if not resultado["nome_testemunha"]:
-            m_test = re.search(
-                r"Testemunha[\s\S]{0,30}?Contratado\s*\(A?\)[\s\S]{0,120}?"
-                r"Nome\s*:\s*([A-Z][A-Za-z\u00c0-\u00ff\s]{3,60}?)(?:\s*\n|\s*CPF)",
-                texto_todas, re.IGNORECASE
-            )
+            m_test = secoes.buscar(_RE_NOME_TESTEMUNHA, "assinatura")
             if m_test:
                 nome_raw = _limpar(m_test.group(1))
-                if len(nome_raw) >= 5 and not re.match(r"^[\d\s\.\-]+$", nome_raw):
+                if len(nome_raw) >= 5 and not _RE_SO_NUMEROS.match(nome_raw):
                     resultado["nome_testemunha"] = _title_case_nome(nome_raw)
 
         # CPF da testemunha
         if not resultado.get("cpf_testemunha"):
-            m_cpf_t = re.search(
-                r"Testemunha[\s\S]{0,30}?Contratado[\s\S]{0,150}?CPF\s*:\s*([\d\s\.\-]{9,14})",
-                texto_todas, re.IGNORECASE
-            )
+            m_cpf_t = secoes.buscar(_RE_CPF_TESTEMUNHA, "assinatura")
             if m_cpf_t:
-                cpf_raw = re.sub(r"[^\d]", "", m_cpf_t.group(1))
+                cpf_raw = _RE_NAO_DIGITO.sub("", m_cpf_t.group(1))
                 if len(cpf_raw) == 11:
-                    resultado["cpf_testemunha"] = f"{cpf_raw[:3]}.{cpf_raw[3:6]}.{cpf_raw[6:9]}-{cpf_raw[9:]}"
+                    resultado["cpf_testemunha"] = _formatar_cpf(cpf_raw)
 
-        doc.close()
     except Exception:
         pass
 
@@ -256,16 +341,27 @@ def _extrair_widgets_docusign(caminho_pdf) -> dict:
 # Extratores individuais
 # ---------------------------------------------------------------------------
 
+_RE_NUMERO_PROCESSO = re.compile(r"N[°º\.]+\s*do\s*processo[:\s]+([\d]+)", re.IGNORECASE)
+_RE_PROCESSO_ID = re.compile(r"(\d{3,6})\s*[–-]\s*ID[:\s]*(\d+)")
+
+
 def _extrair_numero_processo(texto: str) -> str:
-    m = re.search(r"N[°º\.]+\s*do\s*processo[:\s]+([\d]+)", texto, re.IGNORECASE)
+    m = _RE_NUMERO_PROCESSO.search(texto)
     if m:
         return m.group(1).strip()
-    m = re.search(r"(\d{3,6})\s*[\u2013-]\s*ID[:\s]*(\d+)", texto)
+    m = _RE_PROCESSO_ID.search(texto)
     if m:
         return m.group(1).strip()
     return ""
 
 
+_RES_RAZAO_SOCIAL = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"presente\s+instrumento,\s+([A-ZÁÀÃÂÉÊÍÓÔÕÚÇ][A-ZÁÀÃÂÉÊÍÓÔÕÚÇ\s\-\.]{2,80}?)\s*,\s*inscrit",
+    r"instrumento,\s+([A-ZÁÀÃÂÉÊÍÓÔÕÚÇ][A-ZÁÀÃÂÉÊÍÓÔÕÚÇ\s\-\.]{2,80}?)\s*,?\s*inscrit",
+    r"AME\s+CARAGUATATUBA\s+e\s+([A-ZÁÀÃÂÉÊÍÓÔÕÚÇ][A-ZÁÀÃÂÉÊÍÓÔÕÚÇ\s\-\.]{2,80}?)\s*,\s*doravante",
+))
+
+
 def _extrair_razao_social(texto: str) -> str:
     """
     Extrai a razão social da contratada.
@@ -273,59 +369,62 @@ def _extrair_razao_social(texto: str) -> str:
     Padrão 2: "instrumento, RAZAO SOCIAL, inscrita"
     Padrão 3: "AME CARAGUATATUBA e RAZAO SOCIAL, doravante"
     """
-    m = re.search(
-        r"presente\s+instrumento,\s+([A-ZÁÀÃÂÉÊÍÓÔÕÚÇ][A-ZÁÀÃÂÉÊÍÓÔÕÚÇ\s\-\.]{2,80}?)\s*,\s*inscrit",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return _limpar(m.group(1))
-
-    m = re.search(
-        r"instrumento,\s+([A-ZÁÀÃÂÉÊÍÓÔÕÚÇ][A-ZÁÀÃÂÉÊÍÓÔÕÚÇ\s\-\.]{2,80}?)\s*,?\s*inscrit",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return _limpar(m.group(1))
+    for padrao in _RES_RAZAO_SOCIAL:
+        m = padrao.search(texto)
+        if m:
+            return _limpar(m.group(1))
+    return ""
 
-    m = re.search(
-        r"AME\s+CARAGUATATUBA\s+e\s+([A-ZÁÀÃÂÉÊÍÓÔÕÚÇ][A-ZÁÀÃÂÉÊÍÓÔÕÚÇ\s\-\.]{2,80}?)\s*,\s*doravante",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return _limpar(m.group(1))
 
-    return ""
+_RE_CNPJ = re.compile(
+    r"CNPJ\s*(?:n[°º\.]+|sob\s+o\s+n[°º\.]+)?\s*[:\s]*([\d]{2}[\.\/\s]?[\d]{3}[\.\/\s]?[\d]{3}[\.\/\s]?[\d]{4}[-\s]?[\d]{2})",
+    re.IGNORECASE,
+)
+_RE_14_DIGITOS = re.compile(r"^\d{14}$")
 
 
 def _extrair_cnpj(texto: str) -> str:
-    matches = re.findall(
-        r"CNPJ\s*(?:n[°º\.]+|sob\s+o\s+n[°º\.]+)?\s*[:\s]*([\d]{2}[\.\/\s]?[\d]{3}[\.\/\s]?[\d]{3}[\.\/\s]?[\d]{4}[-\s]?[\d]{2})",
-        texto, re.IGNORECASE
-    )
-    if matches:
-        raw = re.sub(r"\s", "", matches[0])
-        if re.match(r"^\d{14}$", raw):
+    # Só o primeiro CNPJ interessa: search em vez de findall no texto todo
+    m = _RE_CNPJ.search(texto)
+    if m:
+        raw = _RE_ESPACOS.sub("", m.group(1))
+        if _RE_14_DIGITOS.match(raw):
             raw = f"{raw[:2]}.{raw[2:5]}.{raw[5:8]}/{raw[8:12]}-{raw[12:]}"
         return raw
     return ""
 
 
+_RES_INSCRICAO_MUNICIPAL = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"Inscri[çc][ãa]o\s+Municipal\s+[Ss]ob\s+N[.º°]+\s*([\d\.\-]+)",
+    r"Inscri[çc][ãa]o\s+Municipal\s+(?:n[°º.]+\s*)?:?\s*([\d\.\-]+)",
+))
+
+
 def _extrair_inscricao_municipal(texto: str) -> str:
-    m = re.search(
-        r"Inscri[\u00e7c][\u00e3a]o\s+Municipal\s+[Ss]ob\s+N[.\u00ba\u00b0]+\s*([\d\.\-]+)",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return m.group(1).strip()
-    m = re.search(
-        r"Inscri[\u00e7c][\u00e3a]o\s+Municipal\s+(?:n[°º.]+\s*)?:?\s*([\d\.\-]+)",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return m.group(1).strip()
+    for padrao in _RES_INSCRICAO_MUNICIPAL:
+        m = padrao.search(texto)
+        if m:
+            return m.group(1).strip()
     return ""
 
 
+_RES_BLOCO_ENDERECO = tuple(
+    re.compile(prefixo + r"(.+?)(?:,?\s*no\s+munic[íi]pio|Doravante|DECLARA)", re.IGNORECASE | re.DOTALL)
+    for prefixo in (
+        r"estabelecida\s+na\s+",
+        r"com\s+sede\s+na\s+",
+        r"sede\s+(?:social\s+)?na\s+",
+    )
+)
+_RE_CEP_ROTULO = re.compile(r"CEP[:\s]+([\d]{2}\.?[\d]{3}[-–][\d]{3})", re.IGNORECASE)
+_RE_CEP = re.compile(r"([\d]{5}[-–][\d]{3})")
+_RE_CIDADE = re.compile(r"munic[íi]pio\s+de\s+([\w\s]+?)(?:,|$|\n)", re.IGNORECASE)
+_RE_INICIA_DIGITO = re.compile(r"^\d+")
+_RE_NUMERO_FINAL = re.compile(r"\b(\d+)\s*$")
+_RE_NUMERO_E_RESTO = re.compile(r"^(\d+)\s*(.*)")
+_RE_LOGRADOURO_NUMERO = re.compile(r"^(.+?),?\s*(\d+)\s*(.*)")
+
+
 def _extrair_endereco(texto: str) -> dict:
     """
     Extrai endereço a partir de padrões como:
@@ -347,15 +446,8 @@ def _extrair_endereco(texto: str) -> dict:
     }
 
     bloco = ""
-    for prefixo in [
-        r"estabelecida\s+na\s+",
-        r"com\s+sede\s+na\s+",
-        r"sede\s+(?:social\s+)?na\s+",
-    ]:
-        m = re.search(
-            prefixo + r"(.+?)(?:,?\s*no\s+munic[íi]pio|Doravante|DECLARA)",
-            texto, re.IGNORECASE | re.DOTALL
-        )
+    for padrao in _RES_BLOCO_ENDERECO:
+        m = padrao.search(texto)
         if m:
             bloco = _limpar(m.group(1))
             break
@@ -364,15 +456,15 @@ def _extrair_endereco(texto: str) -> dict:
         return resultado
 
     # ── Extrai CEP e remove do bloco ──────────────────────────────────────
-    cep_m = re.search(r"CEP[:\s]+([\d]{2}\.?[\d]{3}[-–][\d]{3})", bloco, re.IGNORECASE)
+    cep_m = _RE_CEP_ROTULO.search(bloco)
     if not cep_m:
-        cep_m = re.search(r"([\d]{5}[-–][\d]{3})", bloco)
+        cep_m = _RE_CEP.search(bloco)
     if cep_m:
         resultado["cep"] = cep_m.group(1).strip()
         bloco = bloco[:cep_m.start()].strip().rstrip(",").strip()
 
     # ── Extrai cidade ──────────────────────────────────────────────────────
-    cidade_m = re.search(r"munic[íi]pio\s+de\s+([\w\s]+?)(?:,|$|\n)", texto, re.IGNORECASE)
+    cidade_m = _RE_CIDADE.search(texto)
     if cidade_m:
         resultado["cidade"] = _limpar(cidade_m.group(1))
 
@@ -385,11 +477,11 @@ def _extrair_endereco(texto: str) -> dict:
         resultado["logradouro"] = partes[0]
 
         # Segundo segmento deve iniciar com dígito (número)
-        if re.match(r"^\d+", partes[1]):
+        if _RE_INICIA_DIGITO.match(partes[1]):
             resultado["numero"] = partes[1]
         else:
             # Número pode estar embutido no final do logradouro (ex: "RUA X 123")
-            num_emb = re.search(r"\b(\d+)\s*$", partes[0])
+            num_emb = _RE_NUMERO_FINAL.search(partes[0])
             if num_emb:
                 resultado["logradouro"] = partes[0][:num_emb.start()].strip()
                 resultado["numero"] = num_emb.group(1)
@@ -409,7 +501,7 @@ def _extrair_endereco(texto: str) -> dict:
     elif len(partes) == 2:
         resultado["logradouro"] = partes[0]
         # Tenta separar número do bairro dentro da segunda parte
-        m2 = re.match(r"^(\d+)\s*(.*)", partes[1])
+        m2 = _RE_NUMERO_E_RESTO.match(partes[1])
         if m2:
             resultado["numero"] = m2.group(1)
             resultado["bairro"] = m2.group(2).strip()
@@ -418,7 +510,7 @@ def _extrair_endereco(texto: str) -> dict:
 
     else:
         # Apenas uma parte: tenta extrair número via regex
-        m3 = re.match(r"^(.+?),?\s*(\d+)\s*(.*)", bloco)
+        m3 = _RE_LOGRADOURO_NUMERO.match(bloco)
         if m3:
             resultado["logradouro"] = m3.group(1).strip()
             resultado["numero"] = m3.group(2)
@@ -429,27 +521,30 @@ def _extrair_endereco(texto: str) -> dict:
     return resultado
 
 
+_RE_BLOCO_11 = re.compile(r"1\.1.+?1\.2", re.DOTALL)
+_RE_BLOCO_11_CURTO = re.compile(r"1\.1.{0,300}", re.DOTALL)
+_RE_OBJETO_SERVICOS = re.compile(
+    r"presta[çc][ãa]o\s+de\s+servi[çc]os\s+(?:m[ée]dicos\s+)?de\s+([^\n\.]{5,200})",
+    re.IGNORECASE,
+)
+_RE_OBJETO_PRESTACAO = re.compile(r"presta[çc][ãa]o\s+de\s+([^\n\.]{5,200})", re.IGNORECASE)
+
+
 def _extrair_objeto(texto: str) -> str:
     bloco_11 = ""
-    m = re.search(r"1\.1.+?1\.2", texto, re.DOTALL)
+    m = _RE_BLOCO_11.search(texto)
     if m:
         bloco_11 = m.group(0)
     else:
-        m = re.search(r"1\.1.{0,300}", texto, re.DOTALL)
+        m = _RE_BLOCO_11_CURTO.search(texto)
         if m:
             bloco_11 = m.group(0)
 
     if bloco_11:
-        m = re.search(
-            r"presta[\u00e7c][\u00e3a]o\s+de\s+servi[\u00e7c]os\s+(?:m[\u00e9e]dicos\s+)?de\s+([^\n\.]{5,200})",
-            bloco_11, re.IGNORECASE
-        )
+        m = _RE_OBJETO_SERVICOS.search(bloco_11)
         if m:
             return _limpar(m.group(1)).rstrip(".")
-        m = re.search(
-            r"presta[\u00e7c][\u00e3a]o\s+de\s+([^\n\.]{5,200})",
-            bloco_11, re.IGNORECASE
-        )
+        m = _RE_OBJETO_PRESTACAO.search(bloco_11)
         if m:
             return _limpar(m.group(1)).rstrip(".")
         return _limpar(bloco_11.replace("1.1", "").replace("1.2", ""))[:300].rstrip(".")
@@ -457,6 +552,16 @@ def _extrair_objeto(texto: str) -> str:
     return ""
 
 
+_RES_REPRESENTANTE = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"CONTRATADO\s*\(A\)[\s\S]{0,80}?Nome\s*:\s*([^\n\r]{3,80}?)[\s\S]{0,60}?CPF\s*:\s*([\d]{3}[\.\s]?[\d]{3}[\.\s]?[\d]{3}[-\.\s]?[\d]{2})",
+    r"Contratado\s*\(a\)[\s\S]{0,80}?Nome\s*:\s*([^\n\r]{3,80}?)[\s\S]{0,60}?CPF\s*:\s*([\d]{3}[\.\s]?[\d]{3}[\.\s]?[\d]{3}[-\.\s]?[\d]{2})",
+))
+_RE_REPRESENTANTE_CPF = re.compile(
+    r"CONTRATADO[\s\S]{0,200}?CPF[:\s]*([\d]{3}[\.\s]?[\d]{3}[\.\s]?[\d]{3}[-\.\s]?[\d]{2})",
+    re.IGNORECASE,
+)
+
+
 def _extrair_representante_tecnico(texto: str) -> tuple[str, str]:
     """
     Extrai nome e CPF do CONTRATADO(A) por regex no texto pdfplumber.
@@ -468,27 +573,21 @@ def _extrair_representante_tecnico(texto: str) -> tuple[str, str]:
         CPF: 03954978849
     """
     # Padrão principal: "CONTRATADO (A) ... Nome: NOME ... CPF: NUMERO"
-    for pat in [
-        r"CONTRATADO\s*\(A\)[\s\S]{0,80}?Nome\s*:\s*([^\n\r]{3,80}?)[\s\S]{0,60}?CPF\s*:\s*([\d]{3}[\.\s]?[\d]{3}[\.\s]?[\d]{3}[-\.\s]?[\d]{2})",
-        r"Contratado\s*\(a\)[\s\S]{0,80}?Nome\s*:\s*([^\n\r]{3,80}?)[\s\S]{0,60}?CPF\s*:\s*([\d]{3}[\.\s]?[\d]{3}[\.\s]?[\d]{3}[-\.\s]?[\d]{2})",
-    ]:
-        m = re.search(pat, texto, re.IGNORECASE)
+    for padrao in _RES_REPRESENTANTE:
+        m = padrao.search(texto)
         if m:
             nome_raw = _limpar(m.group(1))
-            cpf_raw = re.sub(r"[^\d]", "", m.group(2))
-            if nome_raw and not re.match(r'^[\d\s\.\-]+$', nome_raw):
+            cpf_raw = _RE_NAO_DIGITO.sub("", m.group(2))
+            if nome_raw and not _RE_SO_NUMEROS.match(nome_raw):
                 nome = _title_case_nome(nome_raw)
-                cpf = f"{cpf_raw[:3]}.{cpf_raw[3:6]}.{cpf_raw[6:9]}-{cpf_raw[9:]}" if len(cpf_raw) == 11 else m.group(2).strip()
+                cpf = _formatar_cpf(cpf_raw) if len(cpf_raw) == 11 else m.group(2).strip()
                 return nome, cpf
 
     # Fallback: só CPF
-    m = re.search(
-        r"CONTRATADO[\s\S]{0,200}?CPF[:\s]*([\d]{3}[\.\s]?[\d]{3}[\.\s]?[\d]{3}[-\.\s]?[\d]{2})",
-        texto, re.IGNORECASE
-    )
+    m = _RE_REPRESENTANTE_CPF.search(texto)
     if m:
-        cpf_raw = re.sub(r"[^\d]", "", m.group(1))
-        cpf = f"{cpf_raw[:3]}.{cpf_raw[3:6]}.{cpf_raw[6:9]}-{cpf_raw[9:]}" if len(cpf_raw) == 11 else m.group(1).strip()
+        cpf_raw = _RE_NAO_DIGITO.sub("", m.group(1))
+        cpf = _formatar_cpf(cpf_raw) if len(cpf_raw) == 11 else m.group(1).strip()
         return "", cpf
 
     return "", ""
@@ -503,18 +602,37 @@ def _extrair_representante_legal(texto: str) -> tuple[str, str]:
 # Extratores de serviços
 # ---------------------------------------------------------------------------
 
+_RE_FORMATO_A = re.compile(r"\b(MAPA|HOLTER|Eletrocardiograma)\b", re.IGNORECASE)
+_RE_FORMATO_B = re.compile(
+    r"\b(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[çc][ãa]o)", re.IGNORECASE
+)
+
+
 def _detectar_formato_tabela(bloco: str) -> str:
     """
     Detecta o formato da tabela de serviços.
     Retorna 'A' (MAPA/HOLTER/ECG) ou 'B' (Especialidade+Serviço genérico).
     """
-    if re.search(r"\b(MAPA|HOLTER|Eletrocardiograma)\b", bloco, re.IGNORECASE):
+    if _RE_FORMATO_A.search(bloco):
         return "A"
-    if re.search(r"\b(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[\u00e7c][\u00e3a]o)", bloco, re.IGNORECASE):
+    if _RE_FORMATO_B.search(bloco):
         return "B"
     return "B"  # default
 
 
+_RE_A_EXAME = re.compile(
+    r"^(MAPA|HOLTER|Eletrocardiograma|Eletrocardiogram|ECG)\s+"
+    r"(\d+)\s+"
+    r"([\d\.]+,\d{2})"
+    r"(?:\s+([\d\.]+,\d{2}))?",
+    re.IGNORECASE,
+)
+_RE_A_VALOR_FINAL = re.compile(r"([\d\.]+,\d{2})\s*$")
+_RE_A_ECG = re.compile(r"^Eletrocardiogram[a]?$", re.IGNORECASE)
+_RE_A_PRAZO = re.compile(r"(\d+\s*dias?\s*[úu]teis?)", re.IGNORECASE)
+_RE_DIGITOS = re.compile(r"\d+")
+
+
 def _extrair_servicos_formato_a(bloco: str) -> list[dict]:
     """
     Formato A: tabela do contrato de MAPA/HOLTER/ECG.
@@ -523,29 +641,20 @@ def _extrair_servicos_formato_a(bloco: str) -> list[dict]:
     servicos = []
     linhas = bloco.split("\n")
 
-    pat_exame = re.compile(
-        r"^(MAPA|HOLTER|Eletrocardiograma|Eletrocardiogram|ECG)\s+"
-        r"(\d+)\s+"
-        r"([\d\.]+,\d{2})"
-        r"(?:\s+([\d\.]+,\d{2}))?",
-        re.IGNORECASE
-    )
-    pat_val_final = re.compile(r"([\d\.]+,\d{2})\s*$")
-
     i = 0
     while i < len(linhas):
         linha = linhas[i].strip()
-        m = pat_exame.match(linha)
+        m = _RE_A_EXAME.match(linha)
         if m:
             nome = m.group(1).strip().title()
-            nome = re.sub(r"^Eletrocardiogram[a]?$", "Eletrocardiograma", nome, flags=re.IGNORECASE)
+            nome = _RE_A_ECG.sub("Eletrocardiograma", nome)
             media = m.group(2)
             val1 = m.group(3)
             val2 = m.group(4)
 
             prazo = "5 dias úteis"
             for j in range(i + 1, min(i + 5, len(linhas))):
-                pm = re.search(r"(\d+\s*dias?\s*[\u00fau]teis?)", linhas[j], re.IGNORECASE)
+                pm = _RE_A_PRAZO.search(linhas[j])
                 if pm:
                     prazo = _limpar(pm.group(1))
                     break
@@ -556,10 +665,11 @@ def _extrair_servicos_formato_a(bloco: str) -> list[dict]:
                 total = val1
                 unit = ""
                 if i + 1 < len(linhas):
-                    mu = pat_val_final.search(linhas[i + 1].strip())
+                    mu = _RE_A_VALOR_FINAL.search(linhas[i + 1].strip())
                     if mu:
                         unit = mu.group(1)
 
+            prazo_dias = _RE_DIGITOS.search(prazo)
             servicos.append({
                 "descricao": nome,
                 "tipo_servico": "exame",
@@ -568,13 +678,30 @@ def _extrair_servicos_formato_a(bloco: str) -> list[dict]:
                 "media_mensal": media,
                 "valor_unitario": float(unit.replace(".", "").replace(",", ".")) if unit else 0.0,
                 "valor_total": float(total.replace(".", "").replace(",", ".")),
-                "prazo_entrega_laudo_dias": int(re.search(r"\d+", prazo).group()) if re.search(r"\d+", prazo) else None,
+                "prazo_entrega_laudo_dias": int(prazo_dias.group()) if prazo_dias else None,
             })
         i += 1
 
     return servicos
 
 
+# Padrão: linha contendo Qtde Unidade ValorUnit ValorTotal
+_RE_B_LINHA_VALOR = re.compile(
+    r"^(\d+)\s+"
+    r"([A-Za-zÀ-ÿ][\w\sÀ-ÿ]{0,30})\s+"
+    r"([\d\.]+,\d{2})\s+"
+    r"([\d\.]+,\d{2})$"
+)
+_RE_B_NOME_SERVICO = re.compile(
+    r"(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[çc][ãa]o\s+pulmonar|SADT|Laudos?|Procedimentos?|[A-Z][\w\s]{3,40})",
+    re.IGNORECASE,
+)
+_RE_CONSULTA = re.compile(r"consult", re.IGNORECASE)
+
+# Cabeçalhos da tabela que não são nome de serviço
+_CABECALHOS_TABELA = {"especialidade", "serviço", "setor", "qtde", "unid", "valor"}
+
+
 def _extrair_servicos_formato_b(bloco: str) -> list[dict]:
     """
     Formato B: tabela genérica com colunas
@@ -583,21 +710,8 @@ def _extrair_servicos_formato_b(bloco: str) -> list[dict]:
     servicos = []
     linhas = [l.strip() for l in bloco.split("\n") if l.strip()]
 
-    # Padrão: linha contendo Qtde Unidade ValorUnit ValorTotal
-    pat_linha_valor = re.compile(
-        r"^(\d+)\s+"
-        r"([A-Za-z\u00c0-\u00ff][\w\s\u00c0-\u00ff]{0,30})\s+"
-        r"([\d\.]+,\d{2})\s+"
-        r"([\d\.]+,\d{2})$"
-    )
-
-    pat_nome_servico = re.compile(
-        r"(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[\u00e7c][\u00e3a]o\s+pulmonar|SADT|Laudos?|Procedimentos?|[A-Z][\w\s]{3,40})",
-        re.IGNORECASE
-    )
-
     for i, linha in enumerate(linhas):
-        m = pat_linha_valor.match(linha)
+        m = _RE_B_LINHA_VALOR.match(linha)
         if m:
             qtde = int(m.group(1))
             unid = _limpar(m.group(2))
@@ -606,14 +720,14 @@ def _extrair_servicos_formato_b(bloco: str) -> list[dict]:
 
             nome_servico = ""
             for k in range(max(0, i - 5), i):
-                mn = pat_nome_servico.search(linhas[k])
+                mn = _RE_B_NOME_SERVICO.search(linhas[k])
                 if mn:
                     cand = _limpar(mn.group(1))
-                    if cand.lower() not in {"especialidade", "serviço", "setor", "qtde", "unid", "valor"}:
+                    if cand.lower() not in _CABECALHOS_TABELA:
                         if len(cand) > 4:
                             nome_servico = cand
 
-            tipo = "consulta" if re.search(r"consult", unid, re.IGNORECASE) else "exame"
+            tipo = "consulta" if _RE_CONSULTA.search(unid) else "exame"
 
             servicos.append({
                 "descricao": nome_servico or f"Serviço {unid}",
@@ -629,22 +743,23 @@ def _extrair_servicos_formato_b(bloco: str) -> list[dict]:
     return servicos
 
 
+_RES_BLOCO_TABELA31 = tuple(re.compile(p, re.IGNORECASE | re.DOTALL) for p in (
+    r"tabela\s+abaixo[:\s]*(.+?)(?:Valor\s+[Ee]stimado\s+[Mm]ensal|3\.2)",
+    r"3\.1[\s\S]{0,100}?pagará[\s\S]{0,50}?tabela[\s\S]{0,20}?"
+    r"(.+?)(?:Valor\s+[Ee]stimado|3\.2)",
+))
+
+
 def _extrair_servicos_tabela31(texto: str) -> list[dict]:
     """
     Ponto de entrada unificado: localiza o bloco da tabela 3.1,
     detecta o formato e delega para o extrator correto.
     """
-    m_bloco = re.search(
-        r"tabela\s+abaixo[:\s]*(.+?)(?:Valor\s+[Ee]stimado\s+[Mm]ensal|3\.2)",
-        texto, re.IGNORECASE | re.DOTALL
-    )
-    if not m_bloco:
-        m_bloco = re.search(
-            r"3\.1[\s\S]{0,100}?pagará[\s\S]{0,50}?tabela[\s\S]{0,20}?"
-            r"(.+?)(?:Valor\s+[Ee]stimado|3\.2)",
-            texto, re.IGNORECASE | re.DOTALL
-        )
-    if not m_bloco:
+    for padrao in _RES_BLOCO_TABELA31:
+        m_bloco = padrao.search(texto)
+        if m_bloco:
+            break
+    else:
         return []
 
     bloco = m_bloco.group(1)
@@ -656,6 +771,52 @@ def _extrair_servicos_tabela31(texto: str) -> list[dict]:
         return _extrair_servicos_formato_b(bloco)
 
 
+# Seção 1.3 (ou 1.2) do Anexo 1
+_RES_SECAO_SERVICOS = tuple(re.compile(p, re.DOTALL | re.IGNORECASE) for p in (
+    r"1\.3[\s\S]{0,30}?Os\s+servi[çc]os.+?(?=\n\s*1\.[4-9]|\n\s*2\.|\n\s*V\.)",
+    r"1\.2[\s\S]{0,30}?Os\s+servi[çc]os.+?(?=\n\s*1\.[3-9]|\n\s*2\.|\n\s*V\.)",
+    r"1\.[23][\s\S]{0,30}Os\s+servi[çc]os.+?(?=\n\s*1\.[4-9]|\n\s*2\.|\n\s*V\.)",
+))
+_RE_ANEXO1_EXAME = re.compile(
+    r"(MAPA|HOLTER|Eletrocardiograma)"
+    r"[\s\S]{0,150}?"
+    r"(\d+|De\s+acordo\s+com\s+demanda[\s\S]{0,60}?(?=\d\s+dias|5\s+dias))"
+    r"[\s\S]{0,30}?"
+    r"(\d+\s+dias\s+[úu]teis)",
+    re.IGNORECASE,
+)
+_RE_SO_DIGITOS = re.compile(r"^\d+$")
+# Nomes de serviços conhecidos
+_RE_ANEXO1_NOME = re.compile(
+    r"(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[çc][ãa]o\s+pulmonar"
+    r"|SADT[^\n]{0,40}|Laudos?\s+[\w\s]{0,30}|Procedimentos?[\s\w]{0,30})",
+    re.IGNORECASE,
+)
+# Padrão de linha "QTDE UNIDADE" (sem valores monetários – esses ficam na seção 3.1)
+_RE_ANEXO1_QTDE_UNID = re.compile(
+    r"^(\d{1,4})\s+"
+    r"(Consulta|Laudo|Atendimento|Procedimento|[\w]+)"
+    r"\s*$",
+    re.IGNORECASE,
+)
+# Padrão alternativo: linha que termina com "| QTDE | UNIDADE"
+# Ex: "Pneumologia Pediátrica | Consultas | Ambulatório | ... | 48 | Consulta"
+_RE_ANEXO1_LINHA_TABELA = re.compile(
+    r"(\d{1,4})\s+(Consulta|Laudo|Atendimento|Procedimento|[\w]+)\s*$",
+    re.IGNORECASE,
+)
+_RE_ANEXO1_PRAZO = re.compile(
+    r"(\d+\s*\([\w\s]+\)\s*dias?\s*[úu]teis?|\d+\s+dias?\s+[úu]teis?)",
+    re.IGNORECASE,
+)
+_RE_ANEXO1_SERVICO_QTDE = re.compile(
+    r"(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[çc][ãa]o\s+pulmonar)"
+    r"[\s\S]{0,200}?"
+    r"(\d{1,4})\s+(Consulta|Laudo)",
+    re.IGNORECASE,
+)
+
+
 def _extrair_servicos_anexo1(texto: str) -> list[dict]:
     """
     Extrai os serviços do quadro do Anexo 1 (item 1.2 ou 1.3).
@@ -669,12 +830,8 @@ def _extrair_servicos_anexo1(texto: str) -> list[dict]:
 
     # Localiza o bloco da seção 1.3 (ou 1.2)
     bloco = ""
-    for pat_secao in [
-        r"1\.3[\s\S]{0,30}?Os\s+servi[\u00e7c]os.+?(?=\n\s*1\.[4-9]|\n\s*2\.|\n\s*V\.)",
-        r"1\.2[\s\S]{0,30}?Os\s+servi[\u00e7c]os.+?(?=\n\s*1\.[3-9]|\n\s*2\.|\n\s*V\.)",
-        r"1\.[23][\s\S]{0,30}Os\s+servi[\u00e7c]os.+?(?=\n\s*1\.[4-9]|\n\s*2\.|\n\s*V\.)",
-    ]:
-        m = re.search(pat_secao, texto, re.DOTALL | re.IGNORECASE)
+    for pat_secao in _RES_SECAO_SERVICOS:
+        m = pat_secao.search(texto)
         if m:
             bloco = m.group(0)
             break
@@ -686,19 +843,11 @@ def _extrair_servicos_anexo1(texto: str) -> list[dict]:
 
     # ── Formato A: MAPA / HOLTER / ECG ────────────────────────────────────
     if formato == "A":
-        padrao = re.compile(
-            r"(MAPA|HOLTER|Eletrocardiograma)"
-            r"[\s\S]{0,150}?"
-            r"(\d+|De\s+acordo\s+com\s+demanda[\s\S]{0,60}?(?=\d\s+dias|5\s+dias))"
-            r"[\s\S]{0,30}?"
-            r"(\d+\s+dias\s+[\u00fau]teis)",
-            re.IGNORECASE
-        )
-        for m in padrao.finditer(bloco):
+        for m in _RE_ANEXO1_EXAME.finditer(bloco):
             exame = m.group(1).strip()
             media_raw = _limpar(m.group(2))
             prazo = _limpar(m.group(3))
-            media = media_raw if re.match(r'^\d+$', media_raw) else "De acordo com demanda"
+            media = media_raw if _RE_SO_DIGITOS.match(media_raw) else "De acordo com demanda"
             servicos.append({"exame": exame, "media_mensal": media, "prazo_entrega": prazo})
         return servicos
 
@@ -714,43 +863,18 @@ def _extrair_servicos_anexo1(texto: str) -> list[dict]:
 
     linhas = [l.strip() for l in bloco.split("\n") if l.strip()]
 
-    # Nomes de serviços conhecidos
-    pat_nome = re.compile(
-        r"(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[\u00e7c][\u00e3a]o\s+pulmonar"
-        r"|SADT[^\n]{0,40}|Laudos?\s+[\w\s]{0,30}|Procedimentos?[\s\w]{0,30})",
-        re.IGNORECASE
-    )
-
-    # Padrão de linha "QTDE UNIDADE" (sem valores monetários – esses ficam na seção 3.1)
-    pat_qtde_unid = re.compile(
-        r"^(\d{1,4})\s+"
-        r"(Consulta|Laudo|Atendimento|Procedimento|[\w]+)"
-        r"\s*$",
-        re.IGNORECASE
-    )
-
-    # Padrão alternativo: linha que termina com "| QTDE | UNIDADE"
-    # Ex: "Pneumologia Pediátrica | Consultas | Ambulatório | ... | 48 | Consulta"
-    pat_linha_tabela = re.compile(
-        r"(\d{1,4})\s+(Consulta|Laudo|Atendimento|Procedimento|[\w]+)\s*$",
-        re.IGNORECASE
-    )
-
     # Prazo (busca no bloco inteiro da seção)
-    prazo_m = re.search(
-        r"(\d+\s*\([\w\s]+\)\s*dias?\s*[\u00fau]teis?|\d+\s+dias?\s+[\u00fau]teis?)",
-        bloco, re.IGNORECASE
-    )
+    prazo_m = _RE_ANEXO1_PRAZO.search(bloco)
     prazo_global = _limpar(prazo_m.group(1)) if prazo_m else ""
 
     # Varredura das linhas
     vistos = set()
     for i, linha in enumerate(linhas):
         # Tenta o padrão estrito (só qtde + unidade)
-        m_q = pat_qtde_unid.match(linha)
+        m_q = _RE_ANEXO1_QTDE_UNID.match(linha)
         if not m_q:
             # Tenta o padrão "qualquer linha que termine com qtde + unidade"
-            m_q = pat_linha_tabela.search(linha)
+            m_q = _RE_ANEXO1_LINHA_TABELA.search(linha)
 
         if m_q:
             qtde = m_q.group(1)
@@ -765,10 +889,10 @@ def _extrair_servicos_anexo1(texto: str) -> list[dict]:
             # Busca nome do serviço nas 8 linhas anteriores
             nome_servico = ""
             for k in range(max(0, i - 8), i + 1):
-                mn = pat_nome.search(linhas[k])
+                mn = _RE_ANEXO1_NOME.search(linhas[k])
                 if mn:
                     cand = _limpar(mn.group(1))
-                    if cand.lower() not in {"especialidade", "serviço", "setor", "qtde", "unid", "valor"}:
+                    if cand.lower() not in _CABECALHOS_TABELA:
                         if len(cand) > 4:
                             nome_servico = cand
 
@@ -782,12 +906,7 @@ def _extrair_servicos_anexo1(texto: str) -> list[dict]:
     # Fallback: se não encontrou nada via varredura de linhas,
     # tenta extrair diretamente das linhas que mencionam nome de serviço + número
     if not servicos:
-        for m_fn in re.finditer(
-            r"(Consultas?\s+Ambulatoriais?|Prova\s+de\s+fun[\u00e7c][\u00e3a]o\s+pulmonar)"
-            r"[\s\S]{0,200}?"
-            r"(\d{1,4})\s+(Consulta|Laudo)",
-            bloco, re.IGNORECASE
-        ):
+        for m_fn in _RE_ANEXO1_SERVICO_QTDE.finditer(bloco):
             servicos.append({
                 "exame": _limpar(m_fn.group(1)),
                 "media_mensal": m_fn.group(2),
@@ -802,53 +921,50 @@ def _extrair_servicos(texto: str) -> list[dict]:
     return _extrair_servicos_tabela31(texto)
 
 
+_RES_VALOR_MENSAL = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r"valor\s+(?:estimado\s+)?mensal\s+(?:estimado\s+)?(?:de\s+)?R\$\s*([\d\.]+,[\d]{2})",
+    r"Valor\s+estimado\s+mensal[\s\S]{0,30}?([\d\.]+,[\d]{2})",
+))
+_RE_VALOR_GLOBAL = re.compile(
+    r"valor\s+(?:global\s+)?estimado\s+de\s+R\$\s*([\d\.]+,[\d]{2})", re.IGNORECASE
+)
+
+
 def _extrair_valor_mensal(texto: str) -> float:
-    m = re.search(
-        r"valor\s+(?:estimado\s+)?mensal\s+(?:estimado\s+)?(?:de\s+)?R\$\s*([\d\.]+,[\d]{2})",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return float(m.group(1).replace(".", "").replace(",", "."))
-    m = re.search(
-        r"Valor\s+estimado\s+mensal[\s\S]{0,30}?([\d\.]+,[\d]{2})",
-        texto, re.IGNORECASE
-    )
-    if m:
-        return float(m.group(1).replace(".", "").replace(",", "."))
+    for padrao in _RES_VALOR_MENSAL:
+        m = padrao.search(texto)
+        if m:
+            return float(m.group(1).replace(".", "").replace(",", "."))
     return 0.0
 
 
 def _extrair_valor_global(texto: str) -> float:
-    m = re.search(
-        r"valor\s+(?:global\s+)?estimado\s+de\s+R\$\s*([\d\.]+,[\d]{2})",
-        texto, re.IGNORECASE
-    )
+    m = _RE_VALOR_GLOBAL.search(texto)
     if m:
         return float(m.group(1).replace(".", "").replace(",", "."))
     return 0.0
 
 
+_RE_PRAZO_MESES = re.compile(r"prazo\s+de\s+(\d+)\s*\([\w\s]+\)\s*meses", re.IGNORECASE)
+_RE_A_PARTIR_DE = re.compile(r"a\s+partir\s+de\s+(.{5,30}?)(?:,|\.|\\n|correspondente)", re.IGNORECASE)
+_RE_DATA_LOCAL = re.compile(r"S[ãa]o\s+Paulo,\s+(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})", re.IGNORECASE)
+
+
 def _extrair_vigencia(texto: str) -> tuple[date | None, date | None, int]:
     data_inicio = None
     data_fim = None
     meses = 0
 
-    m = re.search(r"prazo\s+de\s+(\d+)\s*\([\w\s]+\)\s*meses", texto, re.IGNORECASE)
+    m = _RE_PRAZO_MESES.search(texto)
     if m:
         meses = int(m.group(1))
 
-    m = re.search(
-        r"a\s+partir\s+de\s+(.{5,30}?)(?:,|\.|\\n|correspondente)",
-        texto, re.IGNORECASE
-    )
+    m = _RE_A_PARTIR_DE.search(texto)
     if m:
         data_inicio = _parse_data_pt(m.group(1))
 
     if not data_inicio:
-        m = re.search(
-            r"S[\u00e3a]o\s+Paulo,\s+(\d{1,2}\s+de\s+\w+\s+de\s+\d{4})",
-            texto, re.IGNORECASE
-        )
+        m = _RE_DATA_LOCAL.search(texto)
         if m:
             data_inicio = _parse_data_pt(m.group(1))
 
@@ -858,20 +974,23 @@ def _extrair_vigencia(texto: str) -> tuple[date | None, date | None, int]:
     return data_inicio, data_fim, meses
 
 
+_ESPECIALIDADES_CONHECIDAS = (
+    "Pneumologia Pediátrica", "Pneumologia Pediatrica",
+    "Cardiologia", "Oftalmologia", "Gastroenterologia",
+    "Ortopedia", "Neurologia", "Endocrinologia", "Dermatologia",
+    "Urologia", "Ginecologia", "Obstetrícia", "Reumatologia",
+    "Oncologia", "Hematologia", "Nefrologia", "Infectologia",
+    "Psiquiatria", "Pediatria", "Geriatria", "Cirurgia Geral",
+    "Otorrinolaringologia", "Proctologia", "Angiologia",
+    "Mastologia", "Cirurgia Vascular",
+)
+
+
 def _extrair_especialidade(texto: str) -> str:
-    especialidades_conhecidas = [
-        "Pneumologia Pedi\u00e1trica", "Pneumologia Pediatrica",
-        "Cardiologia", "Oftalmologia", "Gastroenterologia",
-        "Ortopedia", "Neurologia", "Endocrinologia", "Dermatologia",
-        "Urologia", "Ginecologia", "Obstetr\u00edcia", "Reumatologia",
-        "Oncologia", "Hematologia", "Nefrologia", "Infectologia",
-        "Psiquiatria", "Pediatria", "Geriatria", "Cirurgia Geral",
-        "Otorrinolaringologia", "Proctologia", "Angiologia",
-        "Mastologia", "Cirurgia Vascular",
-    ]
-    for esp in especialidades_conhecidas:
-        if esp.lower() in texto.lower():
-            return esp.replace("Pediatrica", "Pedi\u00e1trica")
+    texto_min = texto.lower()
+    for esp in _ESPECIALIDADES_CONHECIDAS:
+        if esp.lower() in texto_min:
+            return esp.replace("Pediatrica", "Pediátrica")
     return ""
 
 
@@ -879,8 +998,8 @@ def _extrair_especialidade(texto: str) -> str:
 # Função principal
 # ---------------------------------------------------------------------------
 
-def extrair_contrato(caminho_pdf) -> dict:
-    resultado = {
+def _resultado_vazio() -> dict:
+    return {
         "razao_social": "",
         "cnpj": "",
         "inscricao_municipal": "",
@@ -907,21 +1026,60 @@ def extrair_contrato(caminho_pdf) -> dict:
         "erro": None,
     }
 
-    try:
-        texto = _extrair_texto_pdf(caminho_pdf)
-    except Exception as e:
-        resultado["erro"] = f"Falha ao ler PDF: {e}"
-        return resultado
 
+def extrair_contrato(caminho_pdf, ao_progredir=None, sha256: str | None = None) -> dict:
+    """
+    Extrai os dados do contrato PDF. `ao_progredir(etapa)` é chamado no
+    início de cada etapa (valores de models.EtapaExtracao: "texto",
+    "widgets", "tabelas", "vigencia").
+
+    Com `sha256` (do conteúdo do PDF), o texto e o layout vêm do cache em
+    disco quando o arquivo já foi lido antes, e são gravados nele na
+    primeira leitura (ver cache_contratos).
+    """
+    etapa = ao_progredir or (lambda _: None)
+    resultado = _resultado_vazio()
+
+    doc = cache_contratos.abrir(caminho_pdf, sha256) if sha256 else DocumentoPDF(caminho_pdf)
+    with doc:
+        etapa("texto")
+        try:
+            texto = doc.texto
+        except Exception as e:
+            resultado["erro"] = f"Falha ao ler PDF: {e}"
+            return resultado
+
+        _extrair_campos(doc, texto, resultado, etapa)
+        if sha256:
+            cache_contratos.guardar(sha256, doc)
+
+    return resultado
+
+
+def extrair_do_texto(texto: str, indexar: bool = True) -> dict:
+    """
+    Campos do contrato a partir só do texto do pdfplumber, sem o layout do
+    PyMuPDF (o representante vem do fallback por regex). Com `indexar=False`
+    cada extrator varre o texto todo, como antes de SecoesContrato.
+    """
+    resultado = _resultado_vazio()
+    _extrair_campos(None, texto, resultado, lambda _: None, indexar)
+    return resultado
+
+
+def _extrair_campos(doc: DocumentoPDF | None, texto: str, resultado: dict, etapa,
+                    indexar: bool = True) -> None:
+    """Preenche `resultado` a partir do texto (pdfplumber) e do layout do documento."""
     try:
-        texto_anexo1 = _localizar_anexo1(texto)
+        secoes = SecoesContrato(texto, indexar)
+        texto_anexo1 = secoes.trecho_anexo1()
 
-        resultado["numero_processo"] = _extrair_numero_processo(texto)
-        resultado["razao_social"] = _extrair_razao_social(texto)
-        resultado["cnpj"] = _extrair_cnpj(texto)
-        resultado["inscricao_municipal"] = _extrair_inscricao_municipal(texto)
+        resultado["numero_processo"] = _na_secao(secoes, "preambulo", _extrair_numero_processo)
+        resultado["razao_social"] = _na_secao(secoes, "preambulo", _extrair_razao_social)
+        resultado["cnpj"] = _na_secao(secoes, "preambulo", _extrair_cnpj)
+        resultado["inscricao_municipal"] = _na_secao(secoes, "preambulo", _extrair_inscricao_municipal)
 
-        end = _extrair_endereco(texto)
+        end = _na_secao(secoes, "preambulo", _extrair_endereco)
         resultado["logradouro"] = end["logradouro"]
         resultado["numero"] = end["numero"]
         resultado["complemento"] = end["complemento"]
@@ -931,14 +1089,12 @@ def extrair_contrato(caminho_pdf) -> dict:
 
         resultado["objeto"] = _extrair_objeto(texto_anexo1)
         resultado["especialidade"] = _extrair_especialidade(texto)
-        resultado["valor_mensal"] = _extrair_valor_mensal(texto)
-        resultado["valor_global"] = _extrair_valor_global(texto)
-
-        resultado["servicos"] = _extrair_servicos_tabela31(texto)
-        resultado["servicos_contratados"] = _extrair_servicos_anexo1(texto_anexo1)
+        resultado["valor_mensal"] = _na_secao(secoes, "anexo1", _extrair_valor_mensal)
+        resultado["valor_global"] = _na_secao(secoes, "anexo1", _extrair_valor_global)
 
         # Representante técnico + testemunha: PyMuPDF primeiro
-        widgets = _extrair_widgets_docusign(caminho_pdf)
+        etapa("widgets")
+        widgets = _extrair_widgets_docusign(doc) if doc is not None else {}
         nome_rep = widgets.get("nome_contratado", "")
         cpf_rep = widgets.get("cpf_contratado", "")
         nome_test = widgets.get("nome_testemunha", "")
@@ -948,7 +1104,7 @@ def extrair_contrato(caminho_pdf) -> dict:
         # Usa quando PyMuPDF não retornou nada OU retornou nome com apenas 1 palavra
         # (widget de assinatura desenhada contém só o primeiro nome / apelido)
         if not nome_rep or len(nome_rep.split()) < 2:
-            nome_rep_fb, cpf_rep_fb = _extrair_representante_tecnico(texto)
+            nome_rep_fb, cpf_rep_fb = _na_secao(secoes, "assinatura", _extrair_representante_tecnico)
             if nome_rep_fb:
                 nome_rep = nome_rep_fb
             if cpf_rep_fb and not cpf_rep:
@@ -959,6 +1115,11 @@ def extrair_contrato(caminho_pdf) -> dict:
         resultado["nome_testemunha"] = nome_test
         resultado["cpf_testemunha"] = cpf_test
 
+        etapa("tabelas")
+        resultado["servicos"] = _na_secao(secoes, "anexo1", _extrair_servicos_tabela31)
+        resultado["servicos_contratados"] = _extrair_servicos_anexo1(texto_anexo1)
+
+        etapa("vigencia")
         data_inicio, data_fim, meses = _extrair_vigencia(texto_anexo1)
         resultado["data_assinatura"] = data_inicio
         resultado["data_fim"] = data_fim
@@ -966,5 +1127,3 @@ def extrair_contrato(caminho_pdf) -> dict:
 
     except Exception as e:
         resultado["erro"] = f"Erro durante extração: {e}"
-
-    return resultado
@@ -0,0 +1,128 @@
+"""
+Tabela de fatos mensais (ProducaoFato) usada pelos dashboards de indicadores.
+
+Para cada (mês, tipo de relatório) vale apenas o upload confirmado mais
+recente daquele mês. Sempre que um upload é confirmado (ou excluído) o
+ponteiro UploadVigente e os fatos do seu mês/tipo são reconstruídos a
+partir do upload vigente, dentro da mesma transação — os dashboards só
+precisam de consultas sobre UploadVigente e ProducaoFato, por mais
+uploads que existam no histórico.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from .models import (
+    UploadProducao, UploadVigente, ProducaoAgenda, ProducaoMedico, ProducaoFato,
+    StatusUpload,
+)
+from .producao_siresp import _CAMPOS_INT
+
+TAMANHO_LOTE = 1000
+
+
+def _proximo_mes(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def upload_vigente(mes: date, tipo: str):
+    """Upload vigente do mês/tipo (pelo ponteiro UploadVigente), ou None."""
+    vigente = (
+        UploadVigente.objects.filter(mes=mes.replace(day=1), tipo=tipo)
+        .select_related("upload").first()
+    )
+    return vigente.upload if vigente else None
+
+
+def atualizar_vigente(mes: date, tipo: str):
+    """
+    Recalcula o ponteiro de (mês, tipo) a partir dos uploads confirmados e
+    retorna o upload vigente (ou None, removendo o ponteiro).
+    """
+    mes = mes.replace(day=1)
+    upload = (
+        UploadProducao.objects.filter(
+            status=StatusUpload.CONFIRMADO,
+            tipo=tipo,
+            data_inicio_periodo__gte=mes,
+            data_inicio_periodo__lt=_proximo_mes(mes),
+        )
+        .order_by("-enviado_em", "-pk")
+        .first()
+    )
+    if upload is None:
+        UploadVigente.objects.filter(mes=mes, tipo=tipo).delete()
+    else:
+        UploadVigente.objects.update_or_create(mes=mes, tipo=tipo, defaults={"upload": upload})
+    return upload
+
+
+def _somar(destino: dict, valores) -> None:
+    for campo, valor in zip(_CAMPOS_INT, valores):
+        destino[campo] += valor or 0
+
+
+def reconstruir_fatos(mes: date, tipo: str) -> int:
+    """
+    Atualiza o upload vigente de (mês, tipo) e substitui os fatos pelos dele.
+    Deve ser chamada dentro de uma transação. Retorna o nº de fatos gravados.
+    """
+    mes = mes.replace(day=1)
+    ProducaoFato.objects.filter(mes=mes, tipo=tipo).delete()
+
+    upload = atualizar_vigente(mes, tipo)
+    if upload is None:
+        return 0
+
+    # Agendas/profissionais com a mesma chave normalizada (nome_chave) são somados
+    totais = defaultdict(lambda: dict.fromkeys(_CAMPOS_INT, 0))
+    medicos = {}  # profissional_chave → pk do Medico vinculado
+    for chave_agenda, *valores in (
+        ProducaoAgenda.objects.filter(upload=upload)
+        .values_list("nome_chave", *_CAMPOS_INT)
+    ):
+        _somar(totais[(chave_agenda, "")], valores)
+
+    for chave_agenda, chave_medico, medico_id, *valores in (
+        ProducaoMedico.objects.filter(agenda__upload=upload)
+        .exclude(nome_chave="")
+        .values_list("agenda__nome_chave", "nome_chave", "medico_id", *_CAMPOS_INT)
+        .iterator(chunk_size=TAMANHO_LOTE)
+    ):
+        _somar(totais[(chave_agenda, chave_medico)], valores)
+        if medico_id:
+            medicos[chave_medico] = medico_id
+
+    ProducaoFato.objects.bulk_create(
+        [
+            ProducaoFato(
+                mes=mes, tipo=tipo, upload=upload,
+                agenda_chave=agenda_chave, profissional_chave=profissional_chave,
+                medico_id=medicos.get(profissional_chave),
+                **valores,
+            )
+            for (agenda_chave, profissional_chave), valores in totais.items()
+        ],
+        batch_size=TAMANHO_LOTE,
+    )
+    return len(totais)
+
+
+def publicar_upload(upload: UploadProducao) -> int:
+    """Reconstrói os fatos do mês/tipo de um upload recém-confirmado."""
+    if not upload.data_inicio_periodo:
+        return 0
+    return reconstruir_fatos(upload.data_inicio_periodo, upload.tipo)
+
+
+def despublicar_upload(upload: UploadProducao) -> int:
+    """
+    Após a exclusão de um upload: se ele era o vigente (o ponteiro e os fatos
+    saíram junto, em cascata), o mês/tipo passa para o confirmado anterior.
+    """
+    if not upload.data_inicio_periodo:
+        return 0
+    mes = upload.data_inicio_periodo.replace(day=1)
+    if UploadVigente.objects.filter(mes=mes, tipo=upload.tipo).exists():
+        return 0
+    return reconstruir_fatos(mes, upload.tipo)
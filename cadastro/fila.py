@@ -0,0 +1,190 @@
+"""
+Fila de processamento em banco de dados.
+
+Uploads de produção SIRESP, extrações de contratos PDF e lotes de
+relatórios XLSX são gravados pelo request e processados depois por um ou
+mais workers:
+
+    python manage.py processar_fila
+
+Cada fila é descrita por um model, o campo de estado e os valores que
+representam "aguardando" / "processando" / "erro". A reivindicação de uma
+linha é um UPDATE condicional (WHERE pk = ? AND estado = aguardando): só
+o worker cujo UPDATE afetar a linha fica com o trabalho, o que torna seguro
+rodar vários workers em paralelo sobre SQLite ou PostgreSQL.
+
+O progresso de um trabalho que grava tudo numa única transação (a
+importação SIRESP) não fica visível no banco antes do commit; enquanto
+isso ele é publicado no cache do Django (ver Fila.atualizar_progresso),
+de onde a tela de acompanhamento o lê. Com worker separado, isso exige um
+backend de cache compartilhado entre processos (CACHE_BACKEND file/redis).
+"""
+
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    UploadProducao, ContratoUpload, LoteRelatorio, StatusUpload, StatusProcessamento,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Fila:
+    """Descrição de uma fila: de onde ler, como reivindicar e o que executar."""
+
+    def __init__(self, nome, model, campo, aguardando, processando, erro,
+                 executar, campo_erro):
+        self.nome = nome
+        self.model = model
+        self.campo = campo
+        self.aguardando = aguardando
+        self.processando = processando
+        self.erro = erro
+        self.executar = executar
+        self.campo_erro = campo_erro
+
+    def __str__(self):
+        return self.nome
+
+    # ── Reivindicação ────────────────────────────────────────────────────────
+    def reivindicar(self, worker: str, pk=None):
+        """
+        Reivindica a linha aguardando mais antiga (ou a linha `pk`, se
+        informada); retorna o pk reivindicado ou None.
+        """
+        if pk is not None:
+            candidatos = [pk]
+        else:
+            candidatos = (
+                self.model.objects.filter(**{self.campo: self.aguardando})
+                .order_by("pk")
+                .values_list("pk", flat=True)[:10]
+            )
+        for pk in candidatos:
+            n = self.model.objects.filter(
+                pk=pk, **{self.campo: self.aguardando},
+            ).update(**{
+                self.campo: self.processando,
+                "processando_desde": timezone.now(),
+                "worker": worker,
+                "progresso": 0,
+            })
+            if n:
+                cache.delete(self._chave_progresso(pk))
+                return pk
+        return None
+
+    def liberar_travados(self, limite: timedelta) -> int:
+        """Devolve à fila linhas cujo worker morreu durante o processamento."""
+        return self.model.objects.filter(**{
+            self.campo: self.processando,
+            "processando_desde__lt": timezone.now() - limite,
+        }).update(**{self.campo: self.aguardando, "worker": "", "progresso": 0})
+
+    # ── Execução ─────────────────────────────────────────────────────────────
+    def _chave_progresso(self, pk) -> str:
+        return f"fila:{self.nome}:{pk}:progresso"
+
+    def atualizar_progresso(self, pk, pct: int) -> None:
+        """
+        Grava o progresso na linha. Dentro de uma transação o UPDATE só
+        apareceria no commit: o valor vai para o cache (progresso_em_cache).
+        """
+        if transaction.get_connection().in_atomic_block:
+            cache.set(self._chave_progresso(pk), pct, timeout=24 * 3600)
+        else:
+            self.model.objects.filter(pk=pk).update(progresso=pct)
+
+    def progresso_em_cache(self, pks) -> dict:
+        """{ pk: progresso } publicado no cache pelos trabalhos em andamento."""
+        chaves = {self._chave_progresso(pk): pk for pk in pks}
+        return {chaves[c]: pct for c, pct in cache.get_many(list(chaves)).items()}
+
+    def processar(self, pk):
+        """
+        Executa o trabalho e devolve o retorno do executor; exceções marcam
+        a linha com erro e são propagadas.
+        """
+        try:
+            return self.executar(pk, ao_progredir=lambda pct: self.atualizar_progresso(pk, pct))
+        except Exception as exc:
+            self.model.objects.filter(pk=pk).update(**{
+                self.campo: self.erro,
+                self.campo_erro: str(exc),
+            })
+            raise
+        finally:
+            cache.delete(self._chave_progresso(pk))
+
+
+def _processar_producao(pk, ao_progredir=None):
+    from .importacao_siresp import processar_por_tipo
+    return processar_por_tipo(pk, ao_progredir=ao_progredir)
+
+
+def _processar_contrato(pk, ao_progredir=None):
+    from .importacao_contrato import processar_contrato
+    return processar_contrato(pk, ao_progredir=ao_progredir)
+
+
+def _processar_lote_relatorios(pk, ao_progredir=None):
+    from .relatorio_lote import processar_lote
+    return processar_lote(pk, ao_progredir=ao_progredir)
+
+
+FILAS = {
+    "producao": Fila(
+        "producao", UploadProducao, "status",
+        aguardando=StatusUpload.PENDENTE,
+        processando=StatusUpload.PROCESSANDO,
+        erro=StatusUpload.ERRO,
+        executar=_processar_producao,
+        campo_erro="erro_processamento",
+    ),
+    "contratos": Fila(
+        "contratos", ContratoUpload, "processamento",
+        aguardando=StatusProcessamento.AGUARDANDO,
+        processando=StatusProcessamento.PROCESSANDO,
+        erro=StatusProcessamento.ERRO,
+        executar=_processar_contrato,
+        campo_erro="erro_extracao",
+    ),
+    "relatorios": Fila(
+        "relatorios", LoteRelatorio, "processamento",
+        aguardando=StatusProcessamento.AGUARDANDO,
+        processando=StatusProcessamento.PROCESSANDO,
+        erro=StatusProcessamento.ERRO,
+        executar=_processar_lote_relatorios,
+        campo_erro="erro",
+    ),
+}
+
+
+def identificador_worker() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enfileirar(nome_fila: str, pk) -> None:
+    """
+    Coloca uma linha na fila. Com settings.FILA_SINCRONA=True (sem worker
+    rodando, ex.: desenvolvimento) o trabalho é executado imediatamente.
+    """
+    fila = FILAS[nome_fila]
+    fila.model.objects.filter(pk=pk).update(**{
+        fila.campo: fila.aguardando, "progresso": 0, "worker": "",
+    })
+    if getattr(settings, "FILA_SINCRONA", False):
+        if fila.reivindicar(identificador_worker(), pk=pk) is not None:
+            try:
+                fila.processar(pk)
+            except Exception:
+                # A mensagem já foi gravada na própria linha; o traceback vai para o log
+                logger.exception("Fila %s: falha ao processar #%s", nome_fila, pk)
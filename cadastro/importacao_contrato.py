@@ -0,0 +1,129 @@
+"""
+Importação de contratos — aplica o resultado de extrator.extrair_contrato()
+a um ContratoUpload.
+
+Usado tanto pela view de upload quanto pelo worker da fila de
+processamento (cadastro.fila).
+"""
+
+from .extrator import extrair_contrato
+from .models import ContratoUpload, EtapaExtracao, StatusImportacao, StatusProcessamento
+
+# Progresso (%) gravado ao iniciar cada etapa; a leitura do texto é a mais lenta
+PROGRESSO_ETAPAS = {
+    EtapaExtracao.TEXTO: 10,
+    EtapaExtracao.WIDGETS: 60,
+    EtapaExtracao.TABELAS: 75,
+    EtapaExtracao.VIGENCIA: 90,
+}
+
+
+def _title_case_nome(nome: str) -> str:
+    """Converte nome em MAIÚSCULAS para Title Case, preservando partículas."""
+    if not nome:
+        return nome
+    particulas = {"de", "da", "do", "das", "dos", "e", "em", "na", "no", "nas", "nos"}
+    palavras = nome.strip().split()
+    resultado = []
+    for i, p in enumerate(palavras):
+        lower = p.lower()
+        if i > 0 and lower in particulas:
+            resultado.append(lower)
+        else:
+            resultado.append(p.capitalize())
+    return " ".join(resultado)
+
+
+def aplicar_dados_extraidos(contrato: ContratoUpload, dados: dict) -> None:
+    """Copia os campos extraídos para o model (sem salvar)."""
+    contrato.razao_social_extraida    = dados["razao_social"]
+    contrato.cnpj_extraido            = dados["cnpj"]
+    contrato.objeto_extraido          = dados["objeto"]
+    contrato.servicos_extraidos       = dados["servicos"]
+    contrato.especialidade_extraida   = dados["especialidade"]
+    contrato.data_inicio_extraida     = dados["data_assinatura"]
+    contrato.data_fim_extraida        = dados["data_fim"]
+    contrato.meses_vigencia_extraidos = dados["meses_vigencia"]
+    contrato.valor_mensal_extraido    = dados["valor_mensal"]
+    contrato.valor_global_extraido    = dados["valor_global"]
+    contrato.numero_processo_extraido = dados["numero_processo"]
+    contrato.erro_extracao            = dados["erro"] or ""
+
+    if dados["erro"]:
+        contrato.status = StatusImportacao.ERRO
+
+
+def dados_extras(dados: dict) -> dict:
+    """Campos extraídos que não possuem coluna própria no ContratoUpload."""
+    return {
+        "nome_representante":   _title_case_nome(dados.get("nome_representante", "")),
+        "cpf_representante":    dados.get("cpf_representante", ""),
+        "inscricao_municipal":  dados.get("inscricao_municipal", ""),
+        "logradouro":           dados.get("logradouro", ""),
+        "numero":               dados.get("numero", ""),
+        "complemento":          dados.get("complemento", ""),
+        "bairro":               dados.get("bairro", ""),
+        "cep":                  dados.get("cep", ""),
+        "cidade":               dados.get("cidade", ""),
+        "servicos_contratados": dados.get("servicos_contratados", []),
+    }
+
+
+# Colunas gravadas a partir de uma extração (aplicar_dados_extraidos + dados_extras)
+CAMPOS_EXTRAIDOS = [
+    "razao_social_extraida", "cnpj_extraido", "objeto_extraido", "servicos_extraidos",
+    "especialidade_extraida", "data_inicio_extraida", "data_fim_extraida",
+    "meses_vigencia_extraidos", "valor_mensal_extraido", "valor_global_extraido",
+    "numero_processo_extraido", "erro_extracao", "dados_extras",
+]
+
+
+def _valores_extraidos(contrato: ContratoUpload) -> list:
+    # to_python: o Decimal lido do banco e o float do extrator comparam pelo valor
+    campos = [contrato._meta.get_field(nome) for nome in CAMPOS_EXTRAIDOS]
+    return [campo.to_python(getattr(contrato, campo.attname)) for campo in campos]
+
+
+def reaplicar_dados_extraidos(contrato: ContratoUpload, dados: dict) -> bool:
+    """
+    Atualiza um ContratoUpload já processado com uma nova extração (sem
+    salvar) e diz se algum campo extraído mudou. Contratos confirmados ou
+    ignorados mantêm o status; os que estavam com erro voltam a pendentes
+    de revisão se a nova extração der certo.
+    """
+    antes = _valores_extraidos(contrato)
+    status = contrato.status
+    aplicar_dados_extraidos(contrato, dados)
+    contrato.dados_extras = dados_extras(dados)
+    if status in (StatusImportacao.CONFIRMADO, StatusImportacao.IGNORADO):
+        contrato.status = status
+    elif status == StatusImportacao.ERRO and not dados["erro"]:
+        contrato.status = StatusImportacao.PENDENTE
+    return _valores_extraidos(contrato) != antes
+
+
+def processar_contrato(contrato_id: int, ao_progredir=None) -> dict:
+    """
+    Executa a extração do PDF de um ContratoUpload e grava o resultado,
+    inclusive os dados extras usados pela tela de revisão. A etapa em
+    andamento e o progresso são gravados a cada etapa do extrator.
+    Retorna o dicionário completo devolvido por extrair_contrato().
+    """
+    contrato = ContratoUpload.objects.get(pk=contrato_id)
+
+    def nova_etapa(etapa):
+        ContratoUpload.objects.filter(pk=contrato_id).update(etapa=etapa)
+        if ao_progredir:
+            ao_progredir(PROGRESSO_ETAPAS[etapa])
+
+    dados = extrair_contrato(
+        contrato.arquivo.path, ao_progredir=nova_etapa, sha256=contrato.sha256 or None,
+    )
+
+    aplicar_dados_extraidos(contrato, dados)
+    contrato.dados_extras = dados_extras(dados)
+    contrato.processamento = StatusProcessamento.CONCLUIDO
+    contrato.progresso = 100
+    contrato.etapa = ""
+    contrato.save()
+    return dados
@@ -0,0 +1,225 @@
+"""
+Importação SIRESP — motor de gravação compartilhado pelos parsers de
+Consultas (producao_siresp.py) e Cirurgias/Exames (producao_siresp_exames.py).
+
+Fluxo, dentro de um único transaction.atomic():
+  1. Apaga os dados anteriores do upload.
+  2. Consome as linhas da planilha sob demanda; agendas e médicos são
+     acumulados e gravados com bulk_create a cada TAMANHO_LOTE registros,
+     de modo que a memória usada não cresce com o tamanho do arquivo.
+  3. Atualiza os totais/status do UploadProducao e reconstrói os fatos
+     mensais (ProducaoFato) do seu mês/tipo — ver fatos.py.
+
+Se qualquer etapa falhar, a transação é desfeita por inteiro — nenhum mês
+fica gravado pela metade.
+"""
+
+import time
+from typing import Callable, Iterable, Optional
+
+from django.db import transaction
+
+from .models import (
+    UploadProducao, ProducaoAgenda, ProducaoMedico,
+    StatusUpload, TipoRelatorioProducao,
+)
+from .fatos import publicar_upload
+from .normalizacao import normalizar_nome
+from .vinculo_medicos import mapa_medicos
+from .producao_siresp import (
+    _eh_total_geral, _preencher_campos_numericos, _CAMPOS_INT, _CAMPOS_FLOAT,
+)
+
+# Quantidade de registros por INSERT no bulk_create
+TAMANHO_LOTE = 500
+
+
+class _GravadorLotes:
+    """
+    Acumula as instâncias (não salvas) de ProducaoAgenda / ProducaoMedico e
+    as grava a cada TAMANHO_LOTE registros.
+
+    Agendas repetidas no mesmo arquivo apontam para a mesma linha
+    (equivalente ao get_or_create anterior): os valores numéricos da última
+    ocorrência prevalecem e os médicos seguintes ficam vinculados a ela.
+    Depois de gravada, de cada agenda só o pk fica guardado.
+
+    Cada médico já sai vinculado ao cadastro (FK `medico`) por um
+    dicionário em memória com as chaves dos médicos ativos.
+
+    `ao_descarregar()`, se informado, é chamado depois de cada lote gravado.
+    """
+
+    def __init__(self, upload, ao_descarregar=None):
+        self.upload = upload
+        self._ao_descarregar = ao_descarregar
+        self.total_medicos = 0
+        self._gravadas = {}        # nome_agenda → pk
+        self._pendentes = {}       # nome_agenda → ProducaoAgenda ainda não gravada
+        self._medicos = []
+        self._mapa_medicos = mapa_medicos()
+
+    def agenda(self, nome: str, dados: dict) -> ProducaoAgenda:
+        agenda_obj = self._pendentes.get(nome)
+        if agenda_obj is None:
+            # pk preenchido quando a agenda reaparece depois de gravada
+            agenda_obj = ProducaoAgenda(
+                pk=self._gravadas.get(nome), upload=self.upload,
+                nome_agenda=nome, nome_chave=normalizar_nome(nome),
+            )
+            self._pendentes[nome] = agenda_obj
+        _preencher_campos_numericos(agenda_obj, dados)
+        self._talvez_descarregar()
+        return agenda_obj
+
+    def medico(self, agenda_obj: ProducaoAgenda, nome: str, dados: dict) -> None:
+        # bulk_create não chama save(): a chave normalizada é preenchida aqui
+        chave = normalizar_nome(nome)
+        medico_obj = ProducaoMedico(
+            agenda=agenda_obj, nome_medico=nome, nome_chave=chave,
+            medico_id=self._mapa_medicos.get(chave),
+        )
+        _preencher_campos_numericos(medico_obj, dados)
+        self._medicos.append(medico_obj)
+        self._talvez_descarregar()
+
+    def _talvez_descarregar(self) -> None:
+        if len(self._medicos) + len(self._pendentes) >= TAMANHO_LOTE:
+            self.descarregar()
+
+    def descarregar(self) -> None:
+        """Grava o que estiver pendente (agendas antes dos médicos)."""
+        novas = [ag for ag in self._pendentes.values() if ag.pk is None]
+        reabertas = [ag for ag in self._pendentes.values() if ag.pk is not None]
+        if novas:
+            _gravar_agendas(self.upload, novas)
+        if reabertas:
+            ProducaoAgenda.objects.bulk_update(
+                reabertas, fields=_CAMPOS_INT + _CAMPOS_FLOAT, batch_size=TAMANHO_LOTE,
+            )
+        for ag in self._pendentes.values():
+            self._gravadas[ag.nome_agenda] = ag.pk
+        self._pendentes = {}
+
+        if self._medicos:
+            # O bulk_create preenche agenda_id a partir das agendas já gravadas
+            ProducaoMedico.objects.bulk_create(self._medicos, batch_size=TAMANHO_LOTE)
+            self.total_medicos += len(self._medicos)
+            self._medicos = []
+
+        if self._ao_descarregar:
+            self._ao_descarregar()
+
+
+def _gravar_agendas(upload, agendas):
+    """bulk_create das agendas garantindo que todas retornem com pk."""
+    ProducaoAgenda.objects.bulk_create(agendas, batch_size=TAMANHO_LOTE)
+    if any(ag.pk is None for ag in agendas):
+        # Backends sem RETURNING no INSERT em lote: recupera os pks pelo nome
+        pks = dict(
+            ProducaoAgenda.objects.filter(upload=upload)
+            .values_list("nome_agenda", "pk")
+        )
+        for ag in agendas:
+            ag.pk = pks[ag.nome_agenda]
+
+
+def _progresso_da_leitura(arquivo, ao_progredir):
+    """
+    Callback do gravador que informa a `ao_progredir` a posição de leitura
+    em `arquivo`, de 10% (arquivo aberto) a 90% (lido até o fim).
+    """
+    tamanho = getattr(arquivo, "size", 0) if arquivo is not None else 0
+    if not ao_progredir or not tamanho:
+        return None
+    ultimo = None
+
+    def informar():
+        nonlocal ultimo
+        pct = 10 + int(80 * min(arquivo.tell() / tamanho, 1))
+        if pct != ultimo:
+            ultimo = pct
+            ao_progredir(pct)
+    return informar
+
+
+def importar_linhas(
+    upload: UploadProducao,
+    linhas: Iterable[dict],
+    coluna_nome: str,
+    eh_agenda: Callable[[str], bool],
+    eh_profissional: Callable[[str], bool],
+    ao_progredir: Optional[Callable[[int], None]] = None,
+    arquivo=None,
+) -> dict:
+    """
+    Persiste as linhas de uma planilha SIRESP já aberta no UploadProducao.
+
+    `linhas` é consumido uma única vez e sob demanda (pode ser um gerador
+    lendo direto do arquivo). O upload deve chegar com o período
+    (data_inicio/fim_periodo) preenchido pelo parser; ao final ele é salvo
+    como CONFIRMADO na mesma transação.
+
+    `ao_progredir(pct)`, se informado, é chamado a cada lote gravado, com a
+    posição de leitura em `arquivo` (o arquivo aberto de onde vêm as linhas)
+    convertida para 10–90%. Como tudo corre dentro da transação, a fila
+    publica esses valores fora do banco (ver fila.Fila.atualizar_progresso).
+
+    Retorna um dicionário com as estatísticas da importação:
+      total_agendas, total_medicos, linhas, segundos, linhas_por_segundo
+    """
+    inicio = time.perf_counter()
+    total_agendas = 0
+    n_linhas = 0
+
+    with transaction.atomic():
+        upload.agendas.all().delete()
+        gravador = _GravadorLotes(upload, _progresso_da_leitura(arquivo, ao_progredir))
+        agenda_obj: Optional[ProducaoAgenda] = None
+
+        for dados in linhas:
+            n_linhas += 1
+            col_a = str(dados.get(coluna_nome, "")).strip()
+            if not col_a:
+                continue
+
+            if _eh_total_geral(col_a):
+                break
+
+            if eh_agenda(col_a):
+                agenda_obj = gravador.agenda(col_a, dados)
+                total_agendas += 1
+
+            elif eh_profissional(col_a) and agenda_obj is not None:
+                gravador.medico(agenda_obj, col_a, dados)
+
+        gravador.descarregar()
+
+        upload.total_agendas = total_agendas
+        upload.total_medicos = gravador.total_medicos
+        upload.status = StatusUpload.CONFIRMADO
+        upload.erro_processamento = ""
+        upload.progresso = 100
+        upload.save()
+
+        # Tabela de fatos dos dashboards: este upload passa a ser o vigente do mês
+        publicar_upload(upload)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "total_agendas": total_agendas,
+        "total_medicos": gravador.total_medicos,
+        "linhas": n_linhas,
+        "segundos": segundos,
+        "linhas_por_segundo": n_linhas / segundos if segundos > 0 else 0.0,
+    }
+
+
+def processar_por_tipo(upload_id: int, ao_progredir=None) -> dict:
+    """Despacha o UploadProducao para o parser do seu tipo de relatório."""
+    tipo = UploadProducao.objects.values_list("tipo", flat=True).get(pk=upload_id)
+    if tipo == TipoRelatorioProducao.CIRURGIA_EXAME:
+        from .producao_siresp_exames import processar_upload_exames as _processar
+    else:
+        from .producao_siresp import processar_upload as _processar
+    return _processar(upload_id, ao_progredir=ao_progredir)
@@ -0,0 +1,80 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cadastro.documento_pdf import DocumentoPDF
+from cadastro.extrator import extrair_do_texto
+
+
+def _medir(textos: list, indexar: bool, repeticoes: int):
+    """Extrai todos os textos `repeticoes` vezes; devolve (resultados, ms por contrato)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultados = [extrair_do_texto(texto, indexar) for texto in textos]
+    return resultados, (time.perf_counter() - inicio) * 1e3 / repeticoes / len(textos)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede as regex da extração de contratos sobre um diretório de PDFs: "
+        "cada extrator varrendo o texto todo, como antes do índice, x só a sua "
+        "seção (SecoesContrato), e lista os campos que mudam entre os modos "
+        "(valores e tabela 3.1 citados antes do Anexo 1 deixam de prevalecer)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("diretorio", help="Diretório com os contratos PDF.")
+        parser.add_argument("--recursivo", action="store_true", help="Inclui subdiretórios.")
+        parser.add_argument("--repeticoes", type=int, default=20,
+                            help="Passadas sobre o corpus em cada modo (padrão: 20).")
+
+    def handle(self, *args, **opts):
+        diretorio = Path(opts["diretorio"])
+        if not diretorio.is_dir():
+            raise CommandError(f"Diretório não encontrado: {diretorio}")
+        padrao = "**/*" if opts["recursivo"] else "*"
+        arquivos = sorted(p for p in diretorio.glob(padrao) if p.is_file() and p.suffix.lower() == ".pdf")
+        if not arquivos:
+            raise CommandError(f"Nenhum PDF em {diretorio}.")
+
+        # ── Texto do pdfplumber, lido uma vez (fora da medição) ───────────────
+        textos, nomes = [], []
+        inicio = time.perf_counter()
+        for caminho in arquivos:
+            try:
+                with DocumentoPDF(caminho) as doc:
+                    textos.append(doc.texto)
+            except Exception as exc:
+                self.stdout.write(self.style.WARNING(f"{caminho.name}: ignorado ({exc})"))
+                continue
+            nomes.append(caminho.relative_to(diretorio))
+        if not textos:
+            raise CommandError("Nenhum PDF legível.")
+        leitura = (time.perf_counter() - inicio) * 1e3 / len(textos)
+
+        self.stdout.write(
+            f"{len(textos)} contrato(s), {sum(map(len, textos)) // len(textos)} caracteres em média; "
+            f"leitura do PDF (pdfplumber): {leitura:.1f} ms por contrato."
+        )
+        self.stdout.write(f"{'modo':>12}{'ms/contrato':>13}")
+        medidos = {}
+        for modo, indexar in (("texto todo", False), ("seções", True)):
+            medidos[modo] = _medir(textos, indexar, opts["repeticoes"])
+            self.stdout.write(f"{modo:>12}{medidos[modo][1]:>13.3f}")
+        antes, depois = medidos["texto todo"][1], medidos["seções"][1]
+        self.stdout.write(f"{'aceleração':>12}{antes / depois:>12.1f}x")
+
+        divergentes = [
+            (nome, [campo for campo in a if a[campo] != b[campo]])
+            for nome, a, b in zip(nomes, medidos["texto todo"][0], medidos["seções"][0])
+            if a != b
+        ]
+        if divergentes:
+            self.stdout.write(self.style.WARNING(
+                f"{len(divergentes)} contrato(s) com campos diferentes (confira se vêm do Anexo 1):"
+            ))
+            for nome, campos in divergentes:
+                self.stdout.write(f"  {nome}: {', '.join(campos)}")
+        else:
+            self.stdout.write(self.style.SUCCESS("Campos extraídos idênticos nos dois modos."))
@@ -0,0 +1,260 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from cadastro.models import (
+    UploadProducao, ProducaoAgenda, ProducaoMedico, ProducaoFato, Medico,
+    StatusUpload, TipoRelatorioProducao,
+)
+from hipertensao.models import Paciente, Afericao, AvaliacaoPrevent
+
+# Índices avaliados (removidos e recriados dentro da transação)
+INDICES = {
+    UploadProducao: ("upload_vigencia_idx", "upload_tipo_envio_idx"),
+    ProducaoMedico: ("prodmedico_medico_chave_idx",),
+    ProducaoFato: ("fato_medico_mes_idx",),
+    Afericao: ("afericao_paciente_data_idx",),
+    AvaliacaoPrevent: ("prevent_paciente_data_idx",),
+}
+
+
+@contextmanager
+def _datas_informadas(*campos):
+    """Desliga o auto_now_add dos campos para gravar datas espalhadas no tempo."""
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+def _semear(opts, rnd):
+    """Popula (sem sinais) um banco sintético do tamanho pedido."""
+    from django.contrib.auth import get_user_model
+
+    agora = timezone.now()
+    hora = timedelta(hours=1)
+    meses = [date(2020 + i // 12, i % 12 + 1, 1) for i in range(opts["meses"])]
+
+    uploads = UploadProducao.objects.bulk_create([
+        UploadProducao(
+            nome_arquivo=f"bench_{i}.xls",
+            tipo=rnd.choice(TipoRelatorioProducao.values),
+            status=rnd.choice([StatusUpload.CONFIRMADO] * 3 + [StatusUpload.ERRO]),
+            data_inicio_periodo=rnd.choice(meses),
+            enviado_em=agora - timedelta(minutes=i),
+        )
+        for i in range(opts["uploads"])
+    ])
+
+    medicos = Medico.objects.bulk_create([
+        Medico(nome_completo=f"Medico Bench {i}", nome_chave=f"MEDICO BENCH {i}", cpf=f"9{i:010d}")
+        for i in range(opts["medicos"])
+    ])
+
+    agendas = ProducaoAgenda.objects.bulk_create([
+        ProducaoAgenda(upload=u, nome_agenda=f"Agenda {a}", nome_chave=f"AGENDA {a}")
+        for u in uploads[: opts["uploads"] // 4] for a in range(20)
+    ], batch_size=1000)
+    ProducaoMedico.objects.bulk_create([
+        ProducaoMedico(
+            agenda=ag, nome_medico=f"PROFISSIONAL {n}", nome_chave=f"PROFISSIONAL {n}",
+            medico=rnd.choice(medicos) if rnd.random() < 0.8 else None,
+            agend_totais=rnd.randint(0, 500),
+        )
+        for ag in agendas for n in rnd.sample(range(opts["medicos"] * 2), 10)
+    ], batch_size=1000)
+
+    ProducaoFato.objects.bulk_create([
+        ProducaoFato(
+            mes=mes, tipo=TipoRelatorioProducao.CONSULTA, upload=uploads[0],
+            agenda_chave=f"AGENDA {a}", profissional_chave=f"MEDICO BENCH {m.pk}",
+            medico=m, agend_totais=rnd.randint(0, 500),
+        )
+        for mes in meses for a in range(20) for m in rnd.sample(medicos, min(30, len(medicos)))
+    ], batch_size=1000)
+
+    Usuario = get_user_model()
+    usuario = Usuario.objects.create(
+        username="bench_indices", email="bench_indices@exemplo.com",
+        nome_completo="Bench", cpf="999.999.999-99",
+    )
+    pacientes = Paciente.objects.bulk_create([
+        Paciente(nome=f"Paciente {i}", cpf=f"bench-{i}", sexo="F", etnia="Parda",
+                 data_nascimento=date(1960, 1, 1))
+        for i in range(opts["pacientes"])
+    ], batch_size=1000)
+    Afericao.objects.bulk_create([
+        Afericao(paciente=p, usuario=usuario, data_afericao=agora - rnd.randint(0, 20000) * hora,
+                 pressao_sistolica=rnd.randint(100, 180), pressao_diastolica=rnd.randint(60, 110))
+        for p in pacientes for _ in range(opts["leituras"])
+    ], batch_size=1000)
+    AvaliacaoPrevent.objects.bulk_create([
+        AvaliacaoPrevent(paciente=p, data_avaliacao=agora - rnd.randint(0, 20000) * hora,
+                         idade=60, sexo="F", colesterol_total=200, hdl=50,
+                         pressao_sistolica=140, tfg=90, risco_10_anos=rnd.uniform(1, 30),
+                         risco_30_anos=rnd.uniform(5, 60))
+        for p in pacientes for _ in range(opts["leituras"] // 4 or 1)
+    ], batch_size=1000)
+    return meses, [m.pk for m in medicos], [p.pk for p in pacientes]
+
+
+def _consultas(meses, pks_medicos, pks_pacientes):
+    """{ nome: (queryset representativo para o EXPLAIN, função que executa a carga) }."""
+    mes = meses[len(meses) // 2]
+    amostra = pks_pacientes[:200]
+
+    def vigente():
+        return (
+            UploadProducao.objects.filter(
+                status=StatusUpload.CONFIRMADO, tipo=TipoRelatorioProducao.CONSULTA,
+                data_inicio_periodo__gte=mes, data_inicio_periodo__lt=mes + timedelta(days=31),
+            ).order_by("-enviado_em")[:1]
+        )
+
+    def envios():
+        return UploadProducao.objects.filter(tipo=TipoRelatorioProducao.CONSULTA).order_by("-enviado_em")[:20]
+
+    def agenda():
+        upload = ProducaoAgenda.objects.values_list("upload_id", flat=True).first()
+        return ProducaoAgenda.objects.filter(upload_id=upload, nome_agenda="Agenda 7")
+
+    def nao_resolvidos():
+        return (
+            ProducaoMedico.objects.filter(medico__isnull=True).exclude(nome_chave="")
+            .values("nome_chave").annotate(linhas=Count("pk"), agend_totais=Sum("agend_totais"))
+            .order_by("-agend_totais", "nome_chave")
+        )
+
+    def fatos_medicos():
+        return (
+            ProducaoFato.objects.filter(mes__gte=meses[0], mes__lte=meses[-1], medico_id__in=pks_medicos[:15])
+            .values("agenda_chave", "mes").annotate(total=Sum("agend_totais"))
+        )
+
+    def ultima_afericao(pk=amostra[0]):
+        return Afericao.objects.filter(paciente_id=pk).order_by("-data_afericao")[:1]
+
+    def monitoramento():
+        ultimo = AvaliacaoPrevent.objects.filter(
+            paciente=OuterRef("pk")
+        ).order_by("-data_avaliacao").values("risco_10_anos")[:1]
+        return Paciente.objects.filter(ativo=True).annotate(
+            score_prevent=Coalesce(Subquery(ultimo), Value(0.0), output_field=FloatField())
+        )
+
+    return {
+        "upload vigente do mês": (vigente(), lambda: list(vigente())),
+        "últimos envios por tipo": (envios(), lambda: list(envios())),
+        # Controle: o plano não muda (unique_together); a diferença é ruído
+        "agenda por (upload, nome)": (agenda(), lambda: list(agenda())),
+        "profissionais não resolvidos": (nao_resolvidos(), lambda: list(nao_resolvidos())),
+        "fatos dos médicos (dashboard)": (fatos_medicos(), lambda: list(fatos_medicos())),
+        "última aferição (200 pacientes)": (
+            ultima_afericao(), lambda: [list(ultima_afericao(pk)) for pk in amostra],
+        ),
+        "score PREVENT mais recente": (monitoramento(), lambda: list(monitoramento())),
+    }
+
+
+def _medir(consultas, repeticoes):
+    resultado = {}
+    for nome, (qs, executar) in consultas.items():
+        executar()  # aquece o cache de páginas do banco
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            executar()
+            tempos.append(time.perf_counter() - inicio)
+        resultado[nome] = (min(tempos), qs.explain())
+    return resultado
+
+
+def _analisar():
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _alternar_indices(criar: bool):
+    """
+    Cria ou remove os INDICES por SQL direto: o schema editor do SQLite não
+    pode ser usado dentro de transaction.atomic().
+    """
+    editor = connection.schema_editor()
+    with connection.cursor() as cursor:
+        for model, nomes in INDICES.items():
+            for indice in model._meta.indexes:
+                if indice.name in nomes:
+                    sql = indice.create_sql(model, editor) if criar else indice.remove_sql(model, editor)
+                    cursor.execute(str(sql))
+    _analisar()
+
+
+def _melhor(*medicoes):
+    """Menor tempo de cada consulta entre várias medições (com o último plano)."""
+    return {
+        nome: (min(m[nome][0] for m in medicoes), medicoes[-1][nome][1])
+        for nome in medicoes[0]
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede as consultas mais frequentes (produção, uploads, pacientes) com e "
+        "sem os índices compostos, num banco sintético criado dentro de uma transação que é "
+        "desfeita ao final: mostra tempos e planos de execução. Os índices são "
+        "medidos antes de removidos e de novo depois de recriados, para não "
+        "favorecer nenhuma ordem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uploads", type=int, default=2000, help="Uploads de produção (padrão: 2000).")
+        parser.add_argument("--meses", type=int, default=36, help="Meses com fatos (padrão: 36).")
+        parser.add_argument("--medicos", type=int, default=150, help="Médicos cadastrados (padrão: 150).")
+        parser.add_argument("--pacientes", type=int, default=3000, help="Pacientes (padrão: 3000).")
+        parser.add_argument("--leituras", type=int, default=20,
+                            help="Aferições por paciente (padrão: 20; PREVENT = 1/4 disso).")
+        parser.add_argument("--repeticoes", type=int, default=5, help="Execuções por consulta (padrão: 5).")
+        parser.add_argument("--planos", action="store_true", help="Mostra os planos de execução.")
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(42)
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            with _datas_informadas(
+                UploadProducao._meta.get_field("enviado_em"),
+                Afericao._meta.get_field("data_afericao"),
+                AvaliacaoPrevent._meta.get_field("data_avaliacao"),
+            ):
+                consultas = _consultas(*_semear(opts, rnd))
+            _analisar()
+            self.stdout.write(f"Banco sintético criado em {time.perf_counter() - inicio:.1f}s")
+
+            com_indices = _medir(consultas, opts["repeticoes"])
+            _alternar_indices(criar=False)
+            antes = _medir(consultas, opts["repeticoes"])
+            _alternar_indices(criar=True)
+            depois = _melhor(com_indices, _medir(consultas, opts["repeticoes"]))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'consulta':<34}{'sem índice ms':>15}{'com índice ms':>15}{'ganho':>8}")
+        for nome in consultas:
+            t_antes, t_depois = antes[nome][0], depois[nome][0]
+            self.stdout.write(
+                f"{nome:<34}{t_antes * 1000:>15.2f}{t_depois * 1000:>15.2f}"
+                f"{t_antes / t_depois if t_depois else 0:>7.1f}x"
+            )
+            if opts["planos"]:
+                self.stdout.write(f"  antes:  {antes[nome][1]}".replace("\n", "\n          "))
+                self.stdout.write(f"  depois: {depois[nome][1]}".replace("\n", "\n          "))
+        self.stdout.write(self.style.SUCCESS("Transação desfeita: nenhum dado foi gravado."))
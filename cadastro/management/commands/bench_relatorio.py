@@ -0,0 +1,123 @@
+import io
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from django.core.management.base import BaseCommand
+from openpyxl import load_workbook
+
+from cadastro import relatorio_producao
+from cadastro.relatorio_producao import criar_relatorio, _gerar_periodo
+
+# Helpers de estilo memorizados (lru_cache) no gerador atual
+HELPERS_ESTILO = ("_font", "_fill", "_align", "_border")
+
+
+def gerar_servicos(n_servicos: int, mes_ini: int, ano_ini: int) -> list:
+    """Serviços sintéticos com produção em ~60% dos dias do período."""
+    rnd = random.Random(42)
+    dias = _gerar_periodo(mes_ini, ano_ini)
+    return [
+        {
+            "descricao": f"Serviço {i} - Consulta Especializada",
+            "cod": i + 1,
+            "agenda": f"Agenda {i}",
+            "estimativa": rnd.randint(50, 500),
+            "valor_unit": round(rnd.uniform(20, 300), 2),
+            "producao": {(d, m): rnd.randint(1, 40) for d, m, _, _ in dias if rnd.random() < 0.6},
+        }
+        for i in range(n_servicos)
+    ]
+
+
+@contextmanager
+def _estilos_por_celula():
+    """
+    Troca os helpers memorizados pelas funções originais (__wrapped__): como
+    no gerador anterior, cada célula constrói fonte, preenchimento,
+    alinhamento e borda novos.
+    """
+    originais = {nome: getattr(relatorio_producao, nome) for nome in HELPERS_ESTILO}
+    for nome, helper in originais.items():
+        setattr(relatorio_producao, nome, helper.__wrapped__)
+    try:
+        yield
+    finally:
+        for nome, helper in originais.items():
+            setattr(relatorio_producao, nome, helper)
+
+
+def _gerar(servicos, mes_ini, ano_ini, nomeados):
+    """
+    Monta e salva o workbook; devolve (bytes, segundos, pico de memória).
+    Sem `nomeados`, reproduz o gerador anterior: estilos atribuídos e
+    construídos célula a célula.
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    with nullcontext() if nomeados else _estilos_por_celula():
+        wb = criar_relatorio(
+            mes_ini=mes_ini, ano_ini=ano_ini, nome_empresa="Empresa Benchmark",
+            especialidade="Cardiologia", servicos=servicos,
+            prestador_nome="Dr. Benchmark", crm="123456", estilos_nomeados=nomeados,
+        )
+    buf = io.BytesIO()
+    wb.save(buf)
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return buf.getvalue(), segundos, pico
+
+
+def _aparencia(conteudo: bytes):
+    """Valores, mesclagens e estilo efetivo de cada célula (o que o usuário vê)."""
+    ws = load_workbook(io.BytesIO(conteudo)).active
+    celulas = {
+        c.coordinate: (c.value, repr(c.font), repr(c.fill), repr(c.border),
+                       repr(c.alignment), c.number_format)
+        for linha in ws.iter_rows() for c in linha
+    }
+    dimensoes = (
+        {k: d.width for k, d in ws.column_dimensions.items()},
+        {k: d.height for k, d in ws.row_dimensions.items()},
+    )
+    return celulas, sorted(str(r) for r in ws.merged_cells.ranges), dimensoes, ws.freeze_panes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a geração do relatório XLSX com estilos construídos e "
+        "atribuídos célula a célula (o gerador anterior) e com estilos nomeados (tempo, memória, tamanho do arquivo e "
+        "igualdade visual das planilhas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servicos", type=int, nargs="+", default=[10, 50, 200],
+                            help="Quantidades de serviços a medir (padrão: 10 50 200).")
+        parser.add_argument("--mes", type=int, default=1, help="Mês inicial (padrão: 1).")
+        parser.add_argument("--ano", type=int, default=2026, help="Ano inicial (padrão: 2026).")
+
+    def handle(self, *args, **opts):
+        self.stdout.write(
+            f"{'serviços':>9}{'modo':>12}{'segundos':>10}{'pico MB':>9}{'arquivo KB':>12}"
+        )
+        divergencias = []
+        for n in opts["servicos"]:
+            servicos = gerar_servicos(n, opts["mes"], opts["ano"])
+            resultados = {}
+            for modo, nomeados in (("por célula", False), ("nomeados", True)):
+                conteudo, segundos, pico = _gerar(servicos, opts["mes"], opts["ano"], nomeados)
+                resultados[modo] = (conteudo, segundos)
+                self.stdout.write(
+                    f"{n:>9}{modo:>12}{segundos:>10.2f}{pico / 1e6:>9.1f}{len(conteudo) / 1e3:>12.0f}"
+                )
+            antes, depois = resultados["por célula"][1], resultados["nomeados"][1]
+            self.stdout.write(f"{'':>9}{'aceleração':>12}{antes / depois:>9.1f}x")
+            if _aparencia(resultados["por célula"][0]) != _aparencia(resultados["nomeados"][0]):
+                divergencias.append(n)
+
+        if divergencias:
+            self.stdout.write(self.style.ERROR(f"Planilhas diferentes para {divergencias} serviços!"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Valores, estilos efetivos e mesclagens idênticos nos dois modos."))
@@ -0,0 +1,273 @@
+import io
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cadastro.models import COLUNAS_SIRESP, COLUNAS_SIRESP_EXAMES
+from cadastro.producao_siresp import _SheetHtml, _safe_float
+from cadastro.producao_siresp_exames import _SheetHtmlExames
+
+
+class _SheetHtmlPandas:
+    """
+    Implementação anterior de _SheetHtml, sobre pandas.read_html().
+    Saiu do módulo de produção; fica aqui como referência do benchmark.
+
+    O pandas.read_html() localiza a maior tabela do documento e itera
+    suas linhas a partir da linha 10 (índice 9 após os 4 cabeçalhos
+    hierárquicos do SIRESP).
+
+    O campo de período é extraído a partir do texto de metadados presente
+    nas tabelas menores que precedem a tabela principal.
+    """
+
+    # O SIRESP usa 4 linhas de cabeçalho hierárquico (colspan/rowspan)
+    # antes dos dados propriamente ditos.
+    _N_CABECALHOS = 4
+
+    def __init__(self, conteudo: bytes):
+        import pandas as pd
+
+        html = conteudo.decode("iso-8859-1", errors="replace")
+        # thousands='.' e decimal=',' tratam a formatação numérica brasileira:
+        # "1.234" → 1234  e  "95,51" → 95.51
+        self._tables = pd.read_html(
+            io.StringIO(html),
+            header=None,
+            thousands=".",
+            decimal=",",
+        )
+        self._tabela_principal = self._identificar_tabela_principal()
+        self.n_colunas = len(COLUNAS_SIRESP)
+
+    def _identificar_tabela_principal(self):
+        """Retorna o DataFrame com mais linhas — é sempre a tabela de dados."""
+        if not self._tables:
+            raise ValueError("Nenhuma tabela HTML encontrada no arquivo.")
+        return max(self._tables, key=len)
+
+    def cell_b2(self) -> str:
+        """
+        Extrai o texto de período varrendendo todas as tabelas de metadados.
+        O SIRESP grava o período num campo como:
+          "Unidade Executante:AME X  Período:01-04-2026a30-04-2026  ..."
+        """
+        for table in self._tables:
+            for valor in table.values.flatten():
+                if isinstance(valor, str) and "Período:" in valor:
+                    return valor
+        return ""
+
+    def iter_linhas(self):
+        """
+        Itera as linhas de dados (a partir da linha 10, ou seja, após os
+        4 cabeçalhos hierárquicos do SIRESP) retornando dicionários com
+        os nomes de COLUNAS_SIRESP como chaves.
+        """
+        import pandas as pd
+
+        df = self._tabela_principal.iloc[self._N_CABECALHOS:].reset_index(drop=True)
+        n = min(self.n_colunas, df.shape[1])
+        for _, row in df.iterrows():
+            dados = {}
+            for col_idx in range(n):
+                nome = COLUNAS_SIRESP[col_idx]
+                val = row.iloc[col_idx]
+                if pd.isna(val):
+                    val = ""
+                elif not isinstance(val, str):
+                    val = str(val)
+                dados[nome] = val
+            yield dados
+
+
+class _SheetHtmlExamesPandas:
+    """
+    Implementação anterior de _SheetHtmlExames, sobre pandas.read_html().
+    Saiu do módulo de produção; fica aqui como referência do benchmark.
+
+    Diferença crítica em relação ao relatório de Consultas:
+      - Apenas 3 linhas de cabeçalho hierárquico (vs. 4 em Consultas)
+      - Dados começam na linha de índice 3 (após pular os 3 cabeçalhos)
+    """
+
+    _N_CABECALHOS = 3
+
+    def __init__(self, conteudo: bytes):
+        import pandas as pd
+
+        html = conteudo.decode("iso-8859-1", errors="replace")
+        self._tables = pd.read_html(
+            io.StringIO(html),
+            header=None,
+            thousands=".",
+            decimal=",",
+        )
+        self._tabela_principal = max(self._tables, key=len)
+        self.n_colunas = len(COLUNAS_SIRESP_EXAMES)
+
+    def cell_b2(self) -> str:
+        """Varre as tabelas de metadados em busca do campo 'Período:'."""
+        for table in self._tables:
+            for valor in table.values.flatten():
+                if isinstance(valor, str) and "Período:" in valor:
+                    return valor
+        return ""
+
+    def iter_linhas(self):
+        """Itera os dados após os 3 cabeçalhos hierárquicos do SIRESP."""
+        import pandas as pd
+
+        df = self._tabela_principal.iloc[self._N_CABECALHOS:].reset_index(drop=True)
+        n = min(self.n_colunas, df.shape[1])
+        for _, row in df.iterrows():
+            dados = {}
+            for col_idx in range(n):
+                nome = COLUNAS_SIRESP_EXAMES[col_idx]
+                val = row.iloc[col_idx]
+                if pd.isna(val):
+                    val = ""
+                elif not isinstance(val, str):
+                    val = str(val)
+                dados[nome] = val
+            yield dados
+
+
+
+def _numero_br(valor: float, decimais: int) -> str:
+    """Formata como o SIRESP: '1.234' ou '95,51'."""
+    texto = f"{valor:,.{decimais}f}"
+    return texto.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def gerar_html(n_agendas: int, n_medicos: int, colunas, n_cabecalhos: int) -> bytes:
+    """
+    Monta um HTML no formato das exportações SIRESP: tabelas de metadados
+    com o período, seguidas da tabela principal com cabeçalho hierárquico
+    (colspan/rowspan), agendas, profissionais e o rodapé "Total Geral".
+    """
+    rnd = random.Random(42)
+    n = len(colunas)
+    partes = [
+        "<html><head><meta http-equiv='Content-Type' content='text/html; charset=ISO-8859-1'>"
+        "</head><body>",
+        "<table><tr><td>Relatório de Produção</td></tr></table>",
+        "<table><tr><td>Unidade Executante:AME Teste&nbsp;&nbsp;"
+        "Período:01-04-2026a30-04-2026</td></tr></table>",
+        "<table border='1'>",
+        f"<tr><td rowspan='{n_cabecalhos}'>Especialidade</td>"
+        f"<td rowspan='{n_cabecalhos}'>Vagas Ofertadas</td>"
+        f"<td colspan='{n - 2}'>Agendamentos</td></tr>",
+    ]
+    for _ in range(n_cabecalhos - 1):
+        partes.append("<tr>" + "".join(f"<td>Qtd</td><td>%</td>" for _ in range((n - 2) // 2))
+                      + ("<td>Qtd</td>" if (n - 2) % 2 else "") + "</tr>")
+
+    def linha(nome):
+        celulas = [nome]
+        for i in range(1, n):
+            if colunas[i].endswith("_pct"):
+                celulas.append(_numero_br(rnd.uniform(0, 100), 2))
+            else:
+                celulas.append(_numero_br(rnd.randint(0, 5000), 0))
+        return "<tr>" + "".join(f"<td>{c}</td>" for c in celulas) + "</tr>"
+
+    for a in range(n_agendas):
+        partes.append(linha(f"Clínica Número {a} - Ambulatório"))
+        for m in range(n_medicos):
+            partes.append(linha(f"PROFISSIONAL {a} JOSÉ DA CONCEIÇÃO {m}"))
+    partes.append(linha("Total Geral"))
+    partes.append("</table></body></html>")
+    return "\n".join(partes).encode("iso-8859-1")
+
+
+def _chave(dados: dict, colunas):
+    """Valores comparáveis entre os dois leitores (texto da coluna A + números)."""
+    return (str(dados.get(colunas[0], "")).strip(),) + tuple(
+        round(_safe_float(dados.get(c, "")), 4) for c in colunas[1:]
+    )
+
+
+def _ler(fabrica):
+    sheet = fabrica()
+    return sheet.cell_b2(), list(sheet.iter_linhas())
+
+
+def _medir(fabrica):
+    """Tempo (sem tracemalloc, que distorce a medida) e pico de memória."""
+    inicio = time.perf_counter()
+    periodo, linhas = _ler(fabrica)
+    segundos = time.perf_counter() - inicio
+
+    # Pico de memória do leitor em si: as linhas são consumidas e descartadas
+    tracemalloc.start()
+    sheet = fabrica()
+    sheet.cell_b2()
+    for _ in sheet.iter_linhas():
+        pass
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return periodo, linhas, segundos, pico
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o leitor incremental de HTML do SIRESP com a implementação "
+        "anterior baseada em pandas.read_html (tempo, pico de memória e "
+        "igualdade das linhas lidas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--arquivo", help="Exportação SIRESP (.xls HTML) real a ser usada.")
+        parser.add_argument(
+            "--tipo", choices=["consulta", "exame"], default="consulta",
+            help="Layout do relatório (padrão: consulta).",
+        )
+        parser.add_argument("--agendas", type=int, default=150,
+                            help="Agendas do arquivo sintético (padrão: 150).")
+        parser.add_argument("--medicos", type=int, default=25,
+                            help="Profissionais por agenda no arquivo sintético (padrão: 25).")
+
+    def handle(self, *args, **opts):
+        if opts["tipo"] == "exame":
+            colunas, leitor, referencia = COLUNAS_SIRESP_EXAMES, _SheetHtmlExames, _SheetHtmlExamesPandas
+        else:
+            colunas, leitor, referencia = COLUNAS_SIRESP, _SheetHtml, _SheetHtmlPandas
+
+        if opts["arquivo"]:
+            try:
+                with open(opts["arquivo"], "rb") as f:
+                    conteudo = f.read()
+            except OSError as exc:
+                raise CommandError(str(exc))
+        else:
+            conteudo = gerar_html(opts["agendas"], opts["medicos"], colunas, referencia._N_CABECALHOS)
+
+        self.stdout.write(f"Arquivo: {len(conteudo) / 1e6:.1f} MB")
+
+        try:
+            p_ref, l_ref, s_ref, m_ref = _medir(lambda: referencia(conteudo))
+        except ImportError as exc:
+            raise CommandError(f"pandas/lxml indisponível para a referência: {exc}")
+        p_inc, l_inc, s_inc, m_inc = _medir(lambda: leitor(io.BytesIO(conteudo)))
+
+        self.stdout.write(f"{'leitor':<14}{'linhas':>10}{'segundos':>12}{'linhas/s':>12}{'pico MB':>10}")
+        for nome, linhas, seg, pico in (
+            ("pandas", l_ref, s_ref, m_ref),
+            ("incremental", l_inc, s_inc, m_inc),
+        ):
+            self.stdout.write(
+                f"{nome:<14}{len(linhas):>10}{seg:>12.3f}{len(linhas) / seg:>12.0f}{pico / 1e6:>10.1f}"
+            )
+        self.stdout.write(f"Aceleração: {s_ref / s_inc:.1f}x")
+
+        iguais = (
+            p_ref == p_inc
+            and [_chave(d, colunas) for d in l_ref] == [_chave(d, colunas) for d in l_inc]
+        )
+        if iguais:
+            self.stdout.write(self.style.SUCCESS("Período e linhas idênticos nos dois leitores."))
+        else:
+            self.stdout.write(self.style.ERROR("Divergência entre os leitores!"))
@@ -0,0 +1,69 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cadastro.models import Prestador
+from cadastro.relatorio_lote import gerar_lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera o relatório XLSX de produção de todos os prestadores ativos (ou "
+        "dos selecionados) para um período, em paralelo num pool de processos, "
+        "num único arquivo ZIP."
+    )
+
+    def add_arguments(self, parser):
+        hoje = date.today()
+        parser.add_argument("--mes", type=int, default=hoje.month, help="Mês inicial (padrão: mês atual).")
+        parser.add_argument("--ano", type=int, default=hoje.year, help="Ano inicial (padrão: ano atual).")
+        parser.add_argument("--prestadores", type=int, nargs="+",
+                            help="PKs dos prestadores (padrão: todos os ativos).")
+        parser.add_argument("--especialidade", type=int, help="Só prestadores desta especialidade (pk).")
+        parser.add_argument("--processos", type=int,
+                            help="Processos em paralelo (padrão: nº de CPUs; 1 = sem pool).")
+        parser.add_argument("--saida", help="Arquivo ZIP de saída (padrão: relatorios_MMAAAA.zip).")
+        parser.add_argument("--sem-cache", action="store_true",
+                            help="Gera todos os relatórios, ignorando o cache em disco.")
+
+    def handle(self, *args, **opts):
+        mes, ano = opts["mes"], opts["ano"]
+        if not 1 <= mes <= 12:
+            raise CommandError("--mes deve estar entre 1 e 12.")
+
+        prestadores = Prestador.objects.filter(ativo=True)
+        if opts["prestadores"]:
+            prestadores = prestadores.filter(pk__in=opts["prestadores"])
+        if opts["especialidade"]:
+            prestadores = prestadores.filter(especialidades=opts["especialidade"]).distinct()
+        if not prestadores.exists():
+            raise CommandError("Nenhum prestador ativo para os filtros informados.")
+
+        saida = opts["saida"] or f"relatorios_{mes:02d}{ano}.zip"
+
+        def progresso(tempo, feitos, total):
+            origem = "cache" if tempo.do_cache else f"{tempo.segundos:.2f}s"
+            self.stdout.write(f"[{feitos}/{total}] {tempo.prestador} — {origem}")
+
+        inicio = time.perf_counter()
+        tempos = gerar_lote(
+            saida, prestadores, mes, ano,
+            processos=opts["processos"], usar_cache=not opts["sem_cache"], ao_concluir=progresso,
+        )
+        total = time.perf_counter() - inicio
+
+        self.stdout.write("")
+        self.stdout.write(f"{'segundos':>9}{'KB':>8}  arquivo")
+        for tempo in sorted(tempos, key=lambda t: -t.segundos):
+            self.stdout.write(f"{tempo.segundos:>9.2f}{tempo.tamanho / 1e3:>8.0f}  {tempo.arquivo}")
+
+        soma = sum(t.segundos for t in tempos)
+        self.stdout.write(
+            f"{len(tempos)} relatório(s), {sum(t.do_cache for t in tempos)} do cache: "
+            f"soma {soma:.2f}s, média {soma / len(tempos):.2f}s, "
+            f"máximo {max(t.segundos for t in tempos):.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{saida} gravado em {total:.2f}s (paralelismo efetivo {soma / total:.1f}x)."
+        ))
@@ -0,0 +1,156 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.arquivos import calcular_sha256
+
+from cadastro.extrator import extrair_contrato
+from cadastro.importacao_contrato import aplicar_dados_extraidos, dados_extras
+from cadastro.models import ContratoUpload, StatusProcessamento
+
+
+def _ja_importados(hashes) -> set:
+    """Hashes que já têm ContratoUpload (consultados em blocos de 500)."""
+    hashes = list(hashes)
+    vistos = set()
+    for i in range(0, len(hashes), 500):
+        vistos.update(
+            ContratoUpload.objects.filter(sha256__in=hashes[i:i + 500])
+            .values_list("sha256", flat=True)
+        )
+    return vistos
+
+
+def _novo_contrato(caminho: Path, sha256: str, dados: dict) -> ContratoUpload:
+    """ContratoUpload já extraído, sem salvar e ainda sem o PDF (ver _gravar)."""
+    contrato = ContratoUpload(
+        nome_arquivo=caminho.name, sha256=sha256,
+        processamento=StatusProcessamento.CONCLUIDO, progresso=100,
+    )
+    aplicar_dados_extraidos(contrato, dados)
+    contrato.dados_extras = dados_extras(dados)
+    return contrato
+
+
+def _gravar(lote: list) -> None:
+    """
+    Copia para o storage os PDFs do bloco [(contrato, caminho), …] e grava
+    os ContratoUpload numa transação. Se a gravação falhar ou for
+    interrompida, as cópias são apagadas: nada do bloco fica para trás, e
+    ele é refeito na próxima execução.
+    """
+    copiados = []
+    try:
+        with transaction.atomic():
+            for contrato, caminho in lote:
+                with open(caminho, "rb") as f:
+                    contrato.arquivo.save(caminho.name, File(f), save=False)
+                copiados.append(contrato.arquivo)
+            ContratoUpload.objects.bulk_create([contrato for contrato, _ in lote])
+    except BaseException:
+        for arquivo in copiados:
+            arquivo.delete(save=False)
+        raise
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa em lote os contratos PDF de um diretório: extrai os dados em "
+        "paralelo num pool de processos e grava os ContratoUpload em blocos. "
+        "PDFs já importados (mesmo SHA-256) são pulados, então o comando pode "
+        "ser repetido para retomar uma importação interrompida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("diretorio", help="Diretório com os PDFs.")
+        parser.add_argument("--recursivo", action="store_true", help="Inclui subdiretórios.")
+        parser.add_argument("--processos", type=int,
+                            help="Processos de extração em paralelo (padrão: nº de CPUs).")
+        parser.add_argument("--lote", type=int, default=25,
+                            help="Contratos gravados por transação (padrão: 25).")
+
+    def handle(self, *args, **opts):
+        diretorio = Path(opts["diretorio"])
+        if not diretorio.is_dir():
+            raise CommandError(f"Diretório não encontrado: {diretorio}")
+
+        padrao = "**/*" if opts["recursivo"] else "*"
+        arquivos = sorted(p for p in diretorio.glob(padrao) if p.is_file() and p.suffix.lower() == ".pdf")
+        if not arquivos:
+            raise CommandError(f"Nenhum PDF em {diretorio}.")
+
+        # ── Deduplicação pelo conteúdo ───────────────────────────────────────
+        por_hash = {}
+        for caminho in arquivos:
+            with open(caminho, "rb") as f:
+                por_hash.setdefault(calcular_sha256(f), caminho)
+        ja_vistos = _ja_importados(por_hash)
+        pendentes = [(sha, caminho) for sha, caminho in por_hash.items() if sha not in ja_vistos]
+
+        self.stdout.write(
+            f"{len(arquivos)} PDF(s): {len(arquivos) - len(por_hash)} repetido(s) no diretório, "
+            f"{len(ja_vistos)} já importado(s), {len(pendentes)} a extrair."
+        )
+        if not pendentes:
+            return
+
+        processos = max(1, min(opts["processos"] or os.cpu_count() or 1, len(pendentes)))
+        inicio = time.perf_counter()
+        lote, gravados, erros, interrompido = [], 0, [], False
+        total_bytes = 0
+
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            futuros = {
+                pool.submit(extrair_contrato, str(caminho), sha256=sha): (sha, caminho)
+                for sha, caminho in pendentes
+            }
+            try:
+                for n, futuro in enumerate(as_completed(futuros), 1):
+                    sha, caminho = futuros[futuro]
+                    try:
+                        dados = futuro.result()
+                    except Exception as exc:
+                        # Sem linha gravada: o arquivo volta a ser tentado na próxima execução
+                        erros.append((caminho, f"falha no processo de extração: {exc}"))
+                        continue
+
+                    lote.append((_novo_contrato(caminho, sha, dados), caminho))
+                    total_bytes += caminho.stat().st_size
+                    if dados["erro"]:
+                        erros.append((caminho, dados["erro"]))
+                    if len(lote) >= opts["lote"]:
+                        _gravar(lote)
+                        gravados += len(lote)
+                        lote = []
+                        self.stdout.write(f"[{n}/{len(pendentes)}] {gravados} contrato(s) gravado(s)")
+            except KeyboardInterrupt:
+                interrompido = True
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        if lote:
+            _gravar(lote)
+            gravados += len(lote)
+        segundos = time.perf_counter() - inicio
+
+        # ── Resumo ───────────────────────────────────────────────────────────
+        self.stdout.write("")
+        self.stdout.write(
+            f"{gravados} contrato(s) gravado(s) em {segundos:.1f}s com {processos} processo(s): "
+            f"{gravados / segundos:.2f} PDF/s, {total_bytes / 1e6 / segundos:.2f} MB/s, "
+            f"{segundos / gravados if gravados else 0:.2f}s por PDF."
+        )
+        if erros:
+            self.stdout.write(self.style.WARNING(f"{len(erros)} arquivo(s) com erro:"))
+            for caminho, erro in sorted(erros):
+                self.stdout.write(f"  {caminho.relative_to(diretorio)}: {erro}")
+        if interrompido:
+            self.stdout.write(self.style.WARNING(
+                "Interrompido: rode o comando de novo para continuar de onde parou."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Importação concluída."))
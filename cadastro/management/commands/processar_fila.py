@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from cadastro.fila import FILAS, identificador_worker
+
+# Segundos entre verificações de itens travados (worker morto) durante o laço
+INTERVALO_LIBERACAO = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da fila de processamento: importa uploads de produção SIRESP, "
+        "extrai contratos PDF e gera os lotes de relatórios pedidos pelas "
+        "telas do sistema. Vários workers podem rodar ao mesmo tempo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--filas", nargs="+", choices=sorted(FILAS), default=sorted(FILAS),
+            help="Filas atendidas por este worker (padrão: todas).",
+        )
+        parser.add_argument(
+            "--intervalo", type=float, default=2.0,
+            help="Segundos de espera quando não há trabalho (padrão: 2).",
+        )
+        parser.add_argument(
+            "--travado-apos", type=int, default=60,
+            help="Minutos após os quais um item 'em processamento' volta à fila (padrão: 60).",
+        )
+        parser.add_argument(
+            "--uma-vez", action="store_true",
+            help="Processa o que estiver pendente e encerra.",
+        )
+
+    def handle(self, *args, **opts):
+        worker = identificador_worker()
+        filas = [FILAS[nome] for nome in opts["filas"]]
+        limite_travado = timedelta(minutes=opts["travado_apos"])
+
+        self.stdout.write(f"Worker {worker} atendendo: {', '.join(map(str, filas))}")
+
+        proxima_liberacao = 0.0
+        try:
+            while True:
+                # Itens de workers que morreram voltam à fila sem esperar um reinício
+                if time.monotonic() >= proxima_liberacao:
+                    self._liberar_travados(filas, limite_travado)
+                    proxima_liberacao = time.monotonic() + INTERVALO_LIBERACAO
+
+                trabalhou = False
+                for fila in filas:
+                    pk = fila.reivindicar(worker)
+                    if pk is None:
+                        continue
+                    trabalhou = True
+                    inicio = time.perf_counter()
+                    try:
+                        resultado = fila.processar(pk)
+                    except Exception as exc:
+                        self.stderr.write(self.style.ERROR(f"[{fila}] #{pk} falhou: {exc}"))
+                        continue
+
+                    msg = f"[{fila}] #{pk} concluído em {time.perf_counter() - inicio:.1f}s"
+                    if isinstance(resultado, dict) and "linhas_por_segundo" in resultado:
+                        msg += (
+                            f" — {resultado['total_agendas']} agenda(s), "
+                            f"{resultado['total_medicos']} médico(s), "
+                            f"{resultado['linhas_por_segundo']:.0f} linhas/s"
+                        )
+                    self.stdout.write(self.style.SUCCESS(msg))
+
+                if not trabalhou:
+                    if opts["uma_vez"]:
+                        break
+                    time.sleep(opts["intervalo"])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker encerrado.")
+
+    def _liberar_travados(self, filas, limite):
+        for fila in filas:
+            n = fila.liberar_travados(limite)
+            if n:
+                self.stdout.write(self.style.WARNING(f"[{fila}] {n} item(ns) travado(s) devolvido(s) à fila"))
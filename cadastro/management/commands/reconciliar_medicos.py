@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cadastro.reconciliacao import (
+    ACEITO, AMBIGUO, SEM_CANDIDATO,
+    gravar_aceitos, indice_medicos_ativos, nomes_nao_resolvidos, reconciliar,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcilia os nomes de profissionais da produção SIRESP sem médico "
+        "vinculado com o cadastro de médicos (tokens/trigramas), gravando "
+        "como alias os casos inequívocos. Os ambíguos ficam para a tela de "
+        "revisão."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--simular", action="store_true",
+            help="Apenas mostra o resultado, sem gravar aliases.",
+        )
+        parser.add_argument(
+            "--detalhar", action="store_true",
+            help="Lista cada nome com seus candidatos.",
+        )
+
+    def handle(self, *args, **opts):
+        inicio = time.perf_counter()
+        indice = indice_medicos_ativos()
+        pendentes = nomes_nao_resolvidos()
+        resultado = reconciliar([nome for nome, _, _ in pendentes], indice)
+        segundos = time.perf_counter() - inicio
+
+        contagem = {ACEITO: 0, AMBIGUO: 0, SEM_CANDIDATO: 0}
+        for situacao, _ in resultado.values():
+            contagem[situacao] += 1
+
+        if opts["detalhar"]:
+            for nome, linhas, _ in pendentes:
+                situacao, candidatos = resultado[nome]
+                texto = ", ".join(f"#{pk} ({pontos:.2f})" for pk, pontos in candidatos[:3]) or "—"
+                self.stdout.write(f"[{situacao:<13}] {nome} ({linhas} linhas): {texto}")
+
+        self.stdout.write(
+            f"{len(indice)} médicos ativos indexados, {len(pendentes)} nomes sem vínculo "
+            f"avaliados em {segundos:.2f}s"
+        )
+        self.stdout.write(
+            f"Aceitos: {contagem[ACEITO]}  Ambíguos: {contagem[AMBIGUO]}  "
+            f"Sem candidato: {contagem[SEM_CANDIDATO]}"
+        )
+
+        if opts["simular"]:
+            self.stdout.write("Simulação: nenhum alias gravado.")
+            return
+        criados = gravar_aceitos(resultado)
+        self.stdout.write(self.style.SUCCESS(
+            f"{criados} alias(es) gravado(s) em {time.perf_counter() - inicio:.2f}s."
+        ))
@@ -0,0 +1,135 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.arquivos import calcular_sha256
+
+from cadastro import cache_contratos
+from cadastro.extrator import extrair_contrato
+from cadastro.importacao_contrato import CAMPOS_EXTRAIDOS, reaplicar_dados_extraidos
+from cadastro.models import ContratoUpload, StatusImportacao, StatusProcessamento
+
+
+def _extrair(tarefas, processos: int):
+    """Gera (contrato, dados ou exceção) na ordem de conclusão."""
+    if processos == 1:
+        for contrato in tarefas:
+            try:
+                yield contrato, extrair_contrato(contrato.arquivo.path, sha256=contrato.sha256)
+            except Exception as exc:
+                yield contrato, exc
+        return
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        futuros = {
+            pool.submit(extrair_contrato, contrato.arquivo.path, sha256=contrato.sha256): contrato
+            for contrato in tarefas
+        }
+        try:
+            for futuro in as_completed(futuros):
+                try:
+                    yield futuros[futuro], futuro.result()
+                except Exception as exc:
+                    yield futuros[futuro], exc
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _gravar(contratos: list) -> None:
+    with transaction.atomic():
+        ContratoUpload.objects.bulk_update(contratos, CAMPOS_EXTRAIDOS + ["status", "sha256"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Reextrai os dados de todos os contratos enviados (ou dos selecionados) "
+        "com as regras atuais do extrator. O texto e o layout de cada PDF vêm do "
+        "cache em disco (cache_contratos) quando ele já foi lido antes, então "
+        "normalmente só as regex rodam; os PDFs fora do cache são lidos em "
+        "paralelo e entram nele. Contratos na fila de processamento são pulados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pks", type=int, nargs="+", help="PKs dos contratos (padrão: todos).")
+        parser.add_argument("--status", nargs="+", choices=StatusImportacao.values,
+                            help="Só contratos nestes status.")
+        parser.add_argument("--processos", type=int,
+                            help="Processos em paralelo (padrão: nº de CPUs se houver PDF fora "
+                                 "do cache; 1 = sem pool).")
+        parser.add_argument("--lote", type=int, default=100,
+                            help="Contratos gravados por transação (padrão: 100).")
+
+    def handle(self, *args, **opts):
+        contratos = ContratoUpload.objects.exclude(
+            processamento__in=[StatusProcessamento.AGUARDANDO, StatusProcessamento.PROCESSANDO],
+        ).order_by("pk")
+        if opts["pks"]:
+            contratos = contratos.filter(pk__in=opts["pks"])
+        if opts["status"]:
+            contratos = contratos.filter(status__in=opts["status"])
+
+        # ── PDFs no disco; contratos antigos sem hash ganham o SHA-256 ───────
+        tarefas, erros = [], []
+        for contrato in contratos:
+            if not contrato.arquivo or not os.path.exists(contrato.arquivo.path):
+                erros.append((contrato, "PDF não encontrado"))
+                continue
+            if not contrato.sha256:
+                with contrato.arquivo.open("rb") as f:
+                    contrato.sha256 = calcular_sha256(f)
+            tarefas.append(contrato)
+        if not tarefas:
+            raise CommandError("Nenhum contrato para reextrair.")
+
+        no_cache = sum(cache_contratos.caminho_cache(c.sha256).exists() for c in tarefas)
+        self.stdout.write(
+            f"{len(tarefas)} contrato(s): {no_cache} com texto no cache, "
+            f"{len(tarefas) - no_cache} a ler do PDF."
+        )
+
+        padrao = (os.cpu_count() or 1) if no_cache < len(tarefas) else 1
+        processos = max(1, min(opts["processos"] or padrao, len(tarefas)))
+        inicio = time.perf_counter()
+        lote, gravados, alterados, interrompido = [], 0, 0, False
+
+        try:
+            for n, (contrato, dados) in enumerate(_extrair(tarefas, processos), 1):
+                if isinstance(dados, Exception):
+                    # Sem gravação: o contrato fica como estava
+                    erros.append((contrato, f"falha na extração: {dados}"))
+                    continue
+                alterados += reaplicar_dados_extraidos(contrato, dados)
+                if dados["erro"]:
+                    erros.append((contrato, dados["erro"]))
+                lote.append(contrato)
+                if len(lote) >= opts["lote"]:
+                    _gravar(lote)
+                    gravados += len(lote)
+                    lote = []
+                    self.stdout.write(f"[{n}/{len(tarefas)}] {gravados} contrato(s) gravado(s)")
+        except KeyboardInterrupt:
+            interrompido = True
+
+        if lote:
+            _gravar(lote)
+            gravados += len(lote)
+        segundos = time.perf_counter() - inicio
+
+        # ── Resumo ───────────────────────────────────────────────────────────
+        self.stdout.write("")
+        self.stdout.write(
+            f"{gravados} contrato(s) reextraído(s) em {segundos:.1f}s com {processos} processo(s) "
+            f"({gravados / segundos if segundos else 0:.1f}/s); {alterados} com dados alterados."
+        )
+        if erros:
+            self.stdout.write(self.style.WARNING(f"{len(erros)} contrato(s) com erro:"))
+            for contrato, erro in sorted(erros, key=lambda e: e[0].pk):
+                self.stdout.write(f"  #{contrato.pk} {contrato.nome_arquivo}: {erro}")
+        if interrompido:
+            self.stdout.write(self.style.WARNING("Interrompido: os contratos já gravados ficam reextraídos."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Reextração concluída."))
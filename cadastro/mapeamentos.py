@@ -0,0 +1,64 @@
+"""
+Índice dos mapeamentos de agenda (AgendaMapeamento) de um prestador.
+
+Os mapeamentos de todos os serviços do prestador são carregados numa única
+consulta e agrupados por serviço, com o nome original da agenda (para
+exibição) e a chave normalizada (para casar com a produção). É usado pelo
+dashboard por prestador, pela tela de mapeamentos e pelo relatório XLSX —
+nenhum deles consulta AgendaMapeamento serviço a serviço.
+
+Serviço sem mapeamento usa a própria descrição como nome de agenda.
+"""
+
+from collections import defaultdict
+from typing import NamedTuple
+
+from .models import AgendaMapeamento
+from .normalizacao import normalizar_nome
+
+
+class AgendaMapeada(NamedTuple):
+    pk: int
+    nome_agenda: str
+    nome_chave: str
+
+
+class IndiceMapeamentos:
+
+    def __init__(self, mapeamentos):
+        """`mapeamentos`: iterável de (servico_id, pk, nome_agenda, nome_chave)."""
+        self._por_servico = defaultdict(list)
+        for servico_id, pk, nome, chave in mapeamentos:
+            self._por_servico[servico_id].append(AgendaMapeada(pk, nome, chave))
+
+    @classmethod
+    def do_prestador(cls, prestador) -> "IndiceMapeamentos":
+        return cls(
+            AgendaMapeamento.objects.filter(servico__prestador=prestador)
+            .order_by("servico_id", "nome_agenda")
+            .values_list("servico_id", "pk", "nome_agenda", "nome_chave")
+        )
+
+    @classmethod
+    def dos_prestadores(cls, prestadores) -> "IndiceMapeamentos":
+        """Mapeamentos de vários prestadores (queryset ou lista de pks) de uma vez."""
+        return cls(
+            AgendaMapeamento.objects.filter(servico__prestador__in=prestadores)
+            .order_by("servico_id", "nome_agenda")
+            .values_list("servico_id", "pk", "nome_agenda", "nome_chave")
+        )
+
+    def mapeamentos(self, servico) -> list:
+        """[AgendaMapeada, …] do serviço, em ordem de nome (vazia se não mapeado)."""
+        return self._por_servico.get(servico.pk, [])
+
+    def tem_mapeamento(self, servico) -> bool:
+        return bool(self._por_servico.get(servico.pk))
+
+    def nomes_agenda(self, servico) -> list:
+        """Nomes originais das agendas do serviço (ou a descrição)."""
+        return [m.nome_agenda for m in self.mapeamentos(servico)] or [servico.descricao]
+
+    def chaves_agenda(self, servico) -> list:
+        """Chaves normalizadas das agendas do serviço (ou da descrição)."""
+        return [m.nome_chave for m in self.mapeamentos(servico)] or [normalizar_nome(servico.descricao)]
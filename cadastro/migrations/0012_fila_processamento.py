@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0011_alter_medico_cep_alter_medico_cpf_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contratoupload',
+            name='processamento',
+            field=models.CharField(choices=[('aguardando', 'Aguardando processamento'), ('processando', 'Em processamento'), ('concluido', 'Concluído'), ('erro', 'Erro no processamento')], default='concluido', max_length=20, verbose_name='Processamento'),
+        ),
+        migrations.AddField(
+            model_name='contratoupload',
+            name='processando_desde',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processando desde'),
+        ),
+        migrations.AddField(
+            model_name='contratoupload',
+            name='progresso',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)'),
+        ),
+        migrations.AddField(
+            model_name='contratoupload',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Worker'),
+        ),
+        migrations.AddField(
+            model_name='uploadproducao',
+            name='processando_desde',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processando desde'),
+        ),
+        migrations.AddField(
+            model_name='uploadproducao',
+            name='progresso',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)'),
+        ),
+        migrations.AddField(
+            model_name='uploadproducao',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Worker'),
+        ),
+        migrations.AlterField(
+            model_name='contratoupload',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente de revisão'), ('processando', 'Em processamento'), ('confirmado', 'Confirmado e cadastrado'), ('erro', 'Erro na extração'), ('ignorado', 'Ignorado')], default='pendente', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='uploadproducao',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente de revisão'), ('processando', 'Em processamento'), ('confirmado', 'Confirmado e cadastrado'), ('erro', 'Erro na extração'), ('ignorado', 'Ignorado')], default='pendente', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:47
+
+from django.db import migrations, models
+
+
+def calcular_hashes(apps, schema_editor):
+    """Preenche o SHA-256 dos uploads cujo arquivo ainda está no storage."""
+    from core.arquivos import calcular_sha256
+
+    UploadProducao = apps.get_model("cadastro", "UploadProducao")
+    for upload in UploadProducao.objects.filter(sha256="").exclude(arquivo=""):
+        try:
+            with upload.arquivo.open("rb") as f:
+                upload.sha256 = calcular_sha256(f)
+        except (FileNotFoundError, OSError):
+            continue
+        upload.save(update_fields=["sha256"])
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0012_fila_processamento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadproducao',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='SHA-256'),
+        ),
+        migrations.RunPython(calcular_hashes, noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+CAMPOS = (
+    "vagas_ofertadas", "agend_totais", "agend_bolsao", "nao_distribuidas",
+    "cota", "extra", "total_geral", "presencial", "teleconsulta",
+    "agend_totais_2", "recepcao_ausente", "recepcao_dispensado",
+    "recepcao_desistente", "recepcao_nao_informado", "alta",
+)
+
+
+def popular_fatos(apps, schema_editor):
+    """Gera os fatos a partir do upload confirmado mais recente de cada mês/tipo."""
+    from collections import defaultdict
+
+    UploadProducao = apps.get_model("cadastro", "UploadProducao")
+    ProducaoAgenda = apps.get_model("cadastro", "ProducaoAgenda")
+    ProducaoMedico = apps.get_model("cadastro", "ProducaoMedico")
+    ProducaoFato   = apps.get_model("cadastro", "ProducaoFato")
+
+    vigentes = {}
+    for u in UploadProducao.objects.filter(
+        status="confirmado", data_inicio_periodo__isnull=False,
+    ).order_by("enviado_em", "pk"):
+        vigentes[(u.data_inicio_periodo.replace(day=1), u.tipo)] = u
+
+    def chave(nome):
+        return (nome or "").strip().upper()
+
+    for (mes, tipo), upload in vigentes.items():
+        totais = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+        for nome_agenda, *valores in ProducaoAgenda.objects.filter(
+            upload=upload,
+        ).values_list("nome_agenda", *CAMPOS):
+            alvo = totais[(chave(nome_agenda), "")]
+            for campo, valor in zip(CAMPOS, valores):
+                alvo[campo] += valor or 0
+        for nome_agenda, nome_medico, *valores in ProducaoMedico.objects.filter(
+            agenda__upload=upload,
+        ).values_list("agenda__nome_agenda", "nome_medico", *CAMPOS):
+            if not chave(nome_medico):
+                continue
+            alvo = totais[(chave(nome_agenda), chave(nome_medico))]
+            for campo, valor in zip(CAMPOS, valores):
+                alvo[campo] += valor or 0
+
+        ProducaoFato.objects.bulk_create([
+            ProducaoFato(
+                mes=mes, tipo=tipo, upload=upload,
+                agenda_chave=agenda_chave, profissional_chave=profissional_chave,
+                **valores,
+            )
+            for (agenda_chave, profissional_chave), valores in totais.items()
+        ], batch_size=1000)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0013_upload_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProducaoFato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês de Referência')),
+                ('tipo', models.CharField(choices=[('consulta', 'Consultas'), ('cirurgia_exame', 'Cirurgias / Exames')], max_length=20)),
+                ('agenda_chave', models.CharField(max_length=200, verbose_name='Agenda (normalizada)')),
+                ('profissional_chave', models.CharField(blank=True, max_length=200, verbose_name='Profissional (normalizado)')),
+                ('vagas_ofertadas', models.IntegerField(default=0)),
+                ('agend_totais', models.IntegerField(default=0)),
+                ('agend_bolsao', models.IntegerField(default=0)),
+                ('nao_distribuidas', models.IntegerField(default=0)),
+                ('cota', models.IntegerField(default=0)),
+                ('extra', models.IntegerField(default=0)),
+                ('total_geral', models.IntegerField(default=0)),
+                ('presencial', models.IntegerField(default=0)),
+                ('teleconsulta', models.IntegerField(default=0)),
+                ('agend_totais_2', models.IntegerField(default=0)),
+                ('recepcao_ausente', models.IntegerField(default=0)),
+                ('recepcao_dispensado', models.IntegerField(default=0)),
+                ('recepcao_desistente', models.IntegerField(default=0)),
+                ('recepcao_nao_informado', models.IntegerField(default=0)),
+                ('alta', models.IntegerField(default=0)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fatos', to='cadastro.uploadproducao')),
+            ],
+            options={
+                'verbose_name': 'Fato de Produção Mensal',
+                'verbose_name_plural': 'Fatos de Produção Mensal',
+                'indexes': [models.Index(fields=['mes', 'profissional_chave'], name='fato_mes_profissional_idx')],
+                'unique_together': {('mes', 'tipo', 'agenda_chave', 'profissional_chave')},
+            },
+        ),
+        migrations.RunPython(popular_fatos, noop),
+    ]
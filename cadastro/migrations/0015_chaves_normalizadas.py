@@ -0,0 +1,104 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+CAMPOS = (
+    "vagas_ofertadas", "agend_totais", "agend_bolsao", "nao_distribuidas",
+    "cota", "extra", "total_geral", "presencial", "teleconsulta",
+    "agend_totais_2", "recepcao_ausente", "recepcao_dispensado",
+    "recepcao_desistente", "recepcao_nao_informado", "alta",
+)
+
+
+def preencher_chaves(apps, schema_editor):
+    """Calcula nome_chave dos registros existentes e refaz os fatos com as novas chaves."""
+    from collections import defaultdict
+    from cadastro.normalizacao import normalizar_nome
+
+    for modelo, campo in (
+        ("ProducaoAgenda", "nome_agenda"),
+        ("ProducaoMedico", "nome_medico"),
+        ("Medico", "nome_completo"),
+        ("AgendaMapeamento", "nome_agenda"),
+    ):
+        Model = apps.get_model("cadastro", modelo)
+        lote = []
+        for obj in Model.objects.only("pk", campo).iterator(chunk_size=1000):
+            obj.nome_chave = normalizar_nome(getattr(obj, campo))
+            lote.append(obj)
+            if len(lote) >= 1000:
+                Model.objects.bulk_update(lote, ["nome_chave"])
+                lote = []
+        if lote:
+            Model.objects.bulk_update(lote, ["nome_chave"])
+
+    # Chaves antigas (só strip/upper) podem se fundir agora: refaz os fatos
+    ProducaoAgenda = apps.get_model("cadastro", "ProducaoAgenda")
+    ProducaoMedico = apps.get_model("cadastro", "ProducaoMedico")
+    ProducaoFato   = apps.get_model("cadastro", "ProducaoFato")
+
+    vigentes = {
+        (mes, tipo): upload_id
+        for mes, tipo, upload_id in ProducaoFato.objects.order_by()
+        .values_list("mes", "tipo", "upload_id").distinct()
+    }
+    ProducaoFato.objects.all().delete()
+
+    for (mes, tipo), upload_id in vigentes.items():
+        totais = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+        for chave_agenda, *valores in ProducaoAgenda.objects.filter(
+            upload_id=upload_id,
+        ).values_list("nome_chave", *CAMPOS):
+            alvo = totais[(chave_agenda, "")]
+            for campo, valor in zip(CAMPOS, valores):
+                alvo[campo] += valor or 0
+        for chave_agenda, chave_medico, *valores in ProducaoMedico.objects.filter(
+            agenda__upload_id=upload_id,
+        ).exclude(nome_chave="").values_list("agenda__nome_chave", "nome_chave", *CAMPOS):
+            alvo = totais[(chave_agenda, chave_medico)]
+            for campo, valor in zip(CAMPOS, valores):
+                alvo[campo] += valor or 0
+
+        ProducaoFato.objects.bulk_create([
+            ProducaoFato(
+                mes=mes, tipo=tipo, upload_id=upload_id,
+                agenda_chave=agenda_chave, profissional_chave=profissional_chave,
+                **valores,
+            )
+            for (agenda_chave, profissional_chave), valores in totais.items()
+        ], batch_size=1000)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0014_producao_fato'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agendamapeamento',
+            name='nome_chave',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Nome normalizado usado para casar com a produção do SIRESP', max_length=200, verbose_name='Chave do Nome'),
+        ),
+        migrations.AddField(
+            model_name='medico',
+            name='nome_chave',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Nome normalizado usado para casar com a produção do SIRESP', max_length=300, verbose_name='Chave do Nome'),
+        ),
+        migrations.AddField(
+            model_name='producaoagenda',
+            name='nome_chave',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Nome normalizado (sem acentos, espaços simples, maiúsculas)', max_length=200, verbose_name='Chave do Nome'),
+        ),
+        migrations.AddField(
+            model_name='producaomedico',
+            name='nome_chave',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Nome normalizado (sem acentos, espaços simples, maiúsculas)', max_length=200, verbose_name='Chave do Nome'),
+        ),
+        migrations.RunPython(preencher_chaves, noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def vincular_medicos(apps, schema_editor):
+    """Resolve o FK `medico` das linhas já importadas pela chave normalizada."""
+    Medico         = apps.get_model("cadastro", "Medico")
+    ProducaoMedico = apps.get_model("cadastro", "ProducaoMedico")
+    ProducaoFato   = apps.get_model("cadastro", "ProducaoFato")
+
+    mapa = dict(
+        Medico.objects.filter(ativo=True).exclude(nome_chave="")
+        .order_by("-pk").values_list("nome_chave", "pk")
+    )
+    for chave, medico_id in mapa.items():
+        ProducaoMedico.objects.filter(nome_chave=chave).update(medico_id=medico_id)
+        ProducaoFato.objects.filter(profissional_chave=chave).update(medico_id=medico_id)
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0015_chaves_normalizadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producaofato',
+            name='medico',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fatos', to='cadastro.medico', verbose_name='Médico Cadastrado'),
+        ),
+        migrations.AddField(
+            model_name='producaomedico',
+            name='medico',
+            field=models.ForeignKey(blank=True, help_text='Resolvido pela chave do nome na importação (ver cadastro.vinculo_medicos)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='producoes', to='cadastro.medico', verbose_name='Médico Cadastrado'),
+        ),
+        migrations.RunPython(vincular_medicos, noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0016_vinculo_producao_medico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AliasMedico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome_chave', models.CharField(max_length=200, unique=True, verbose_name='Nome no SIRESP (normalizado)')),
+                ('origem', models.CharField(choices=[('automatica', 'Reconciliação automática'), ('manual', 'Revisão manual')], default='automatica', max_length=20, verbose_name='Origem')),
+                ('pontuacao', models.FloatField(default=0, verbose_name='Pontuação')),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='cadastro.medico', verbose_name='Médico')),
+            ],
+            options={
+                'verbose_name': 'Alias de Médico',
+                'verbose_name_plural': 'Aliases de Médicos',
+                'ordering': ['nome_chave'],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def preencher_vigentes(apps, schema_editor):
+    """Aponta cada (mês, tipo) para o upload confirmado mais recente."""
+    UploadProducao = apps.get_model("cadastro", "UploadProducao")
+    UploadVigente = apps.get_model("cadastro", "UploadVigente")
+
+    vigentes = {}
+    for pk, tipo, inicio in (
+        UploadProducao.objects.filter(status="confirmado", data_inicio_periodo__isnull=False)
+        .order_by("enviado_em", "pk")
+        .values_list("pk", "tipo", "data_inicio_periodo")
+    ):
+        # Em ordem crescente de envio: o último de cada mês sobrescreve os demais
+        vigentes[(inicio.replace(day=1), tipo)] = pk
+
+    UploadVigente.objects.bulk_create([
+        UploadVigente(mes=mes, tipo=tipo, upload_id=pk)
+        for (mes, tipo), pk in vigentes.items()
+    ])
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0018_versao_dados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadVigente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês de Referência')),
+                ('tipo', models.CharField(choices=[('consulta', 'Consultas'), ('cirurgia_exame', 'Cirurgias / Exames')], max_length=20)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vigencias', to='cadastro.uploadproducao')),
+            ],
+            options={
+                'verbose_name': 'Upload Vigente do Mês',
+                'verbose_name_plural': 'Uploads Vigentes por Mês',
+                'ordering': ['mes', 'tipo'],
+                'unique_together': {('mes', 'tipo')},
+            },
+        ),
+        migrations.RunPython(preencher_vigentes, noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0019_upload_vigente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producaofato',
+            index=models.Index(fields=['medico', 'mes', 'agenda_chave'], name='fato_medico_mes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producaomedico',
+            index=models.Index(fields=['medico', 'nome_chave', 'agend_totais'], name='prodmedico_medico_chave_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadproducao',
+            index=models.Index(fields=['status', 'tipo', 'data_inicio_periodo', '-enviado_em'], name='upload_vigencia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadproducao',
+            index=models.Index(fields=['tipo', '-enviado_em'], name='upload_tipo_envio_idx'),
+        ),
+    ]
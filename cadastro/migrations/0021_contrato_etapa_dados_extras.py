@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0020_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contratoupload',
+            name='dados_extras',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Dados extras (extraídos)'),
+        ),
+        migrations.AddField(
+            model_name='contratoupload',
+            name='etapa',
+            field=models.CharField(blank=True, choices=[('texto', 'Leitura do texto'), ('widgets', 'Assinaturas DocuSign'), ('tabelas', 'Tabelas de serviços'), ('vigencia', 'Vigência')], max_length=20, verbose_name='Etapa da extração'),
+        ),
+    ]
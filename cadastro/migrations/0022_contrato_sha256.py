@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+def calcular_hashes(apps, schema_editor):
+    """Preenche o SHA-256 dos contratos cujo PDF ainda está no storage."""
+    from core.arquivos import calcular_sha256
+
+    ContratoUpload = apps.get_model("cadastro", "ContratoUpload")
+    for contrato in ContratoUpload.objects.filter(sha256="").exclude(arquivo=""):
+        try:
+            with contrato.arquivo.open("rb") as f:
+                contrato.sha256 = calcular_sha256(f)
+        except (FileNotFoundError, OSError):
+            continue
+        contrato.save(update_fields=["sha256"])
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0021_contrato_etapa_dados_extras'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contratoupload',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='SHA-256'),
+        ),
+        migrations.RunPython(calcular_hashes, noop),
+    ]
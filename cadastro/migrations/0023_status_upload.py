@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0022_contrato_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contratoupload',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente de revisão'), ('confirmado', 'Confirmado e cadastrado'), ('erro', 'Erro na extração'), ('ignorado', 'Ignorado')], default='pendente', max_length=20, verbose_name='Status'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastro', '0023_status_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes_ini', models.PositiveSmallIntegerField(verbose_name='Mês inicial')),
+                ('ano_ini', models.PositiveSmallIntegerField(verbose_name='Ano inicial')),
+                ('prestadores', models.JSONField(default=list, verbose_name='Prestadores (pks)')),
+                ('arquivo', models.FileField(blank=True, upload_to='relatorios_lote/%Y/%m/', verbose_name='Arquivo ZIP')),
+                ('total_relatorios', models.PositiveIntegerField(default=0, verbose_name='Relatórios gerados')),
+                ('solicitado_em', models.DateTimeField(auto_now_add=True)),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('processamento', models.CharField(choices=[('aguardando', 'Aguardando processamento'), ('processando', 'Em processamento'), ('concluido', 'Concluído'), ('erro', 'Erro no processamento')], default='aguardando', max_length=20, verbose_name='Processamento')),
+                ('progresso', models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')),
+                ('processando_desde', models.DateTimeField(blank=True, null=True, verbose_name='Processando desde')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+            ],
+            options={
+                'verbose_name': 'Lote de Relatórios',
+                'verbose_name_plural': 'Lotes de Relatórios',
+                'ordering': ['-solicitado_em'],
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.validators import RegexValidator
 
+from .normalizacao import normalizar_nome
+
 
 class Especialidade(models.Model):
     nome = models.CharField(max_length=200, unique=True)
@@ -144,11 +146,29 @@ class StatusImportacao(models.TextChoices):
     IGNORADO = "ignorado", "Ignorado"
 
 
+class StatusProcessamento(models.TextChoices):
+    """Estado da extração de um ContratoUpload na fila de processamento."""
+    AGUARDANDO = "aguardando", "Aguardando processamento"
+    PROCESSANDO = "processando", "Em processamento"
+    CONCLUIDO = "concluido", "Concluído"
+    ERRO = "erro", "Erro no processamento"
+
+
+class EtapaExtracao(models.TextChoices):
+    """Etapa em que está a extração de um ContratoUpload (ver extrator.extrair_contrato)."""
+    TEXTO = "texto", "Leitura do texto"
+    WIDGETS = "widgets", "Assinaturas DocuSign"
+    TABELAS = "tabelas", "Tabelas de serviços"
+    VIGENCIA = "vigencia", "Vigência"
+
+
 class ContratoUpload(models.Model):
     """Armazena um PDF de contrato enviado e os dados extraídos automaticamente."""
     arquivo = models.FileField("Arquivo PDF", upload_to="contratos_pdf/%Y/%m/")
     nome_arquivo = models.CharField(max_length=255, editable=False)
     enviado_em = models.DateTimeField(auto_now_add=True)
+    # Hash do conteúdo: a importação em lote (import_contratos) pula PDFs já vistos
+    sha256 = models.CharField("SHA-256", max_length=64, blank=True, db_index=True)
 
     # Dados extraídos
     razao_social_extraida = models.CharField("Razão Social (extraída)", max_length=300, blank=True)
@@ -163,6 +183,9 @@ class ContratoUpload(models.Model):
     valor_global_extraido = models.DecimalField("Valor Global (extraído)", max_digits=14, decimal_places=2, default=0)
     numero_processo_extraido = models.CharField("Nº do Processo (extraído)", max_length=50, blank=True)
     erro_extracao = models.TextField("Erro de Extração", blank=True)
+    # Campos extraídos sem coluna própria (endereço, representante, Anexo 1 —
+    # ver importacao_contrato.dados_extras), lidos pela tela de revisão
+    dados_extras = models.JSONField("Dados extras (extraídos)", default=dict, blank=True)
 
     # Vínculo com prestador após confirmação
     prestador = models.ForeignKey(
@@ -176,6 +199,17 @@ class ContratoUpload(models.Model):
         default=StatusImportacao.PENDENTE
     )
 
+    # Fila de processamento (extração executada pelo worker `processar_fila`)
+    processamento = models.CharField(
+        "Processamento", max_length=20,
+        choices=StatusProcessamento.choices,
+        default=StatusProcessamento.CONCLUIDO,
+    )
+    progresso = models.PositiveSmallIntegerField("Progresso (%)", default=0)
+    etapa = models.CharField("Etapa da extração", max_length=20, choices=EtapaExtracao.choices, blank=True)
+    processando_desde = models.DateTimeField("Processando desde", null=True, blank=True)
+    worker = models.CharField("Worker", max_length=100, blank=True)
+
     class Meta:
         verbose_name = "Contrato Importado"
         verbose_name_plural = "Contratos Importados"
@@ -199,6 +233,15 @@ class TipoRelatorioProducao(models.TextChoices):
     CIRURGIA_EXAME = "cirurgia_exame", "Cirurgias / Exames"
 
 
+class StatusUpload(models.TextChoices):
+    """Estado de um UploadProducao; PENDENTE/PROCESSANDO são os da fila de processamento."""
+    PENDENTE = "pendente", "Pendente de revisão"
+    PROCESSANDO = "processando", "Em processamento"
+    CONFIRMADO = "confirmado", "Confirmado e cadastrado"
+    ERRO = "erro", "Erro na extração"
+    IGNORADO = "ignorado", "Ignorado"
+
+
 class UploadProducao(models.Model):
     """Registro de cada arquivo XLS do SIRESP enviado para importação."""
     arquivo = models.FileField("Arquivo XLS", upload_to="producao_xls/%Y/%m/")
@@ -215,17 +258,34 @@ class UploadProducao(models.Model):
     status = models.CharField(
         "Status",
         max_length=20,
-        choices=StatusImportacao.choices,
-        default=StatusImportacao.PENDENTE,
+        choices=StatusUpload.choices,
+        default=StatusUpload.PENDENTE,
     )
     erro_processamento = models.TextField("Erro de Processamento", blank=True)
     total_agendas = models.PositiveIntegerField("Total de Agendas", default=0)
     total_medicos = models.PositiveIntegerField("Total de Registros de Médicos", default=0)
 
+    # Fila de processamento: o upload fica PENDENTE até um worker reivindicá-lo
+    progresso = models.PositiveSmallIntegerField("Progresso (%)", default=0)
+    processando_desde = models.DateTimeField("Processando desde", null=True, blank=True)
+    worker = models.CharField("Worker", max_length=100, blank=True)
+
+    # SHA-256 do conteúdo: reenvios do mesmo arquivo reaproveitam o resultado
+    sha256 = models.CharField("SHA-256", max_length=64, blank=True, db_index=True)
+
     class Meta:
         verbose_name = "Upload de Produção"
         verbose_name_plural = "Uploads de Produção"
         ordering = ["-enviado_em"]
+        indexes = [
+            # Upload vigente do mês (fatos.atualizar_vigente)
+            models.Index(
+                fields=["status", "tipo", "data_inicio_periodo", "-enviado_em"],
+                name="upload_vigencia_idx",
+            ),
+            # Últimos envios de cada tipo (tela de upload)
+            models.Index(fields=["tipo", "-enviado_em"], name="upload_tipo_envio_idx"),
+        ]
 
     def __str__(self):
         return f"{self.nome_arquivo} ({self.get_tipo_display()}) — {self.get_status_display()}"
@@ -314,6 +374,10 @@ class ProducaoAgenda(models.Model):
         UploadProducao, on_delete=models.CASCADE, related_name="agendas"
     )
     nome_agenda = models.CharField("Nome da Agenda", max_length=200)
+    nome_chave = models.CharField(
+        "Chave do Nome", max_length=200, blank=True, editable=False, db_index=True,
+        help_text="Nome normalizado (sem acentos, espaços simples, maiúsculas)",
+    )
 
     vagas_ofertadas = models.IntegerField(default=0)
     agend_totais = models.IntegerField(default=0)
@@ -353,6 +417,10 @@ class ProducaoAgenda(models.Model):
     def __str__(self):
         return f"{self.nome_agenda} — {self.upload}"
 
+    def save(self, *args, **kwargs):
+        self.nome_chave = normalizar_nome(self.nome_agenda)
+        super().save(*args, **kwargs)
+
 
 class ProducaoMedico(models.Model):
     """Produção individual de um médico dentro de uma agenda em um período."""
@@ -360,6 +428,18 @@ class ProducaoMedico(models.Model):
         ProducaoAgenda, on_delete=models.CASCADE, related_name="medicos"
     )
     nome_medico = models.CharField("Nome do Médico", max_length=200)
+    nome_chave = models.CharField(
+        "Chave do Nome", max_length=200, blank=True, editable=False, db_index=True,
+        help_text="Nome normalizado (sem acentos, espaços simples, maiúsculas)",
+    )
+    medico = models.ForeignKey(
+        "Medico",
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="producoes",
+        verbose_name="Médico Cadastrado",
+        help_text="Resolvido pela chave do nome na importação (ver cadastro.vinculo_medicos)",
+    )
 
     vagas_ofertadas = models.IntegerField(default=0)
     agend_totais = models.IntegerField(default=0)
@@ -394,16 +474,132 @@ class ProducaoMedico(models.Model):
         verbose_name = "Produção por Médico"
         verbose_name_plural = "Produções por Médico"
         ordering = ["nome_medico"]
+        indexes = [
+            # Nomes sem médico vinculado, agrupados (reconciliacao.nomes_nao_resolvidos)
+            models.Index(
+                fields=["medico", "nome_chave", "agend_totais"], name="prodmedico_medico_chave_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nome_medico} — {self.agenda.nome_agenda}"
 
+    def save(self, *args, **kwargs):
+        self.nome_chave = normalizar_nome(self.nome_medico)
+        super().save(*args, **kwargs)
+
+
+class ProducaoFato(models.Model):
+    """
+    Fato mensal pré-agregado, lido pelos dashboards de indicadores.
+
+    Cada (mês, tipo de relatório) guarda apenas os dados do upload
+    confirmado mais recente daquele mês (ver cadastro.fatos). Há uma linha
+    por agenda com `profissional_chave` vazio (totais da agenda) e uma por
+    profissional dentro da agenda.
+    """
+    mes = models.DateField("Mês de Referência")  # sempre o dia 1
+    tipo = models.CharField(max_length=20, choices=TipoRelatorioProducao.choices)
+    upload = models.ForeignKey(
+        UploadProducao, on_delete=models.CASCADE, related_name="fatos"
+    )
+    agenda_chave = models.CharField("Agenda (normalizada)", max_length=200)
+    profissional_chave = models.CharField("Profissional (normalizado)", max_length=200, blank=True)
+    medico = models.ForeignKey(
+        "Medico",
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="fatos",
+        verbose_name="Médico Cadastrado",
+    )
+
+    vagas_ofertadas = models.IntegerField(default=0)
+    agend_totais = models.IntegerField(default=0)
+    agend_bolsao = models.IntegerField(default=0)
+    nao_distribuidas = models.IntegerField(default=0)
+    cota = models.IntegerField(default=0)
+    extra = models.IntegerField(default=0)
+    total_geral = models.IntegerField(default=0)
+    presencial = models.IntegerField(default=0)
+    teleconsulta = models.IntegerField(default=0)
+    agend_totais_2 = models.IntegerField(default=0)
+    recepcao_ausente = models.IntegerField(default=0)
+    recepcao_dispensado = models.IntegerField(default=0)
+    recepcao_desistente = models.IntegerField(default=0)
+    recepcao_nao_informado = models.IntegerField(default=0)
+    alta = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Fato de Produção Mensal"
+        verbose_name_plural = "Fatos de Produção Mensal"
+        unique_together = [("mes", "tipo", "agenda_chave", "profissional_chave")]
+        indexes = [
+            models.Index(fields=["mes", "profissional_chave"], name="fato_mes_profissional_idx"),
+            # Filtro por médicos do prestador/especialidade (consultas_producao)
+            models.Index(fields=["medico", "mes", "agenda_chave"], name="fato_medico_mes_idx"),
+        ]
+
+    def __str__(self):
+        quem = self.profissional_chave or "(total da agenda)"
+        return f"{self.mes:%m/%Y} — {self.agenda_chave} — {quem}"
+
+
+class UploadVigente(models.Model):
+    """
+    Upload vigente de cada (mês, tipo de relatório): o confirmado mais recente.
+
+    Mantido por cadastro.fatos junto com os fatos do mês (na confirmação e
+    na exclusão de uploads), para que seletores de mês e a resolução do
+    período não precisem varrer o histórico de uploads.
+    """
+    mes = models.DateField("Mês de Referência")  # sempre o dia 1
+    tipo = models.CharField(max_length=20, choices=TipoRelatorioProducao.choices)
+    upload = models.ForeignKey(
+        UploadProducao, on_delete=models.CASCADE, related_name="vigencias"
+    )
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Upload Vigente do Mês"
+        verbose_name_plural = "Uploads Vigentes por Mês"
+        unique_together = [("mes", "tipo")]
+        ordering = ["mes", "tipo"]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} ({self.get_tipo_display()}) — {self.upload.nome_arquivo}"
+
+
+class VersaoDados(models.Model):
+    """
+    Contador da versão dos dados usados pelos dashboards de indicadores.
+
+    É incrementado (por sinais, ver signals.py) sempre que um upload muda
+    de status ou um prestador, especialidade, mapeamento ou médico é
+    editado; a versão faz parte da chave do cache dos dashboards, então
+    nada precisa ser apagado do cache.
+    Fica no banco para valer entre os processos web e os workers da fila.
+    """
+    chave = models.CharField(max_length=50, unique=True)
+    versao = models.PositiveBigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versão dos Dados"
+        verbose_name_plural = "Versões dos Dados"
+
+    def __str__(self):
+        return f"{self.chave} v{self.versao}"
+
 
 class Medico(models.Model):
     """Cadastro individual de médico credenciado no AME Caraguatatuba."""
 
     # ── Dados pessoais ──────────────────────────────────────────────────────
     nome_completo = models.CharField("Nome Completo", max_length=300)
+    nome_chave = models.CharField(
+        "Chave do Nome", max_length=300, blank=True, editable=False, db_index=True,
+        help_text="Nome normalizado usado para casar com a produção do SIRESP",
+    )
     cpf = models.CharField(
         "CPF",
         max_length=20,
@@ -462,6 +658,10 @@ class Medico(models.Model):
     def __str__(self):
         return f"{self.nome_completo} — CRM {self.crm}" if self.crm else self.nome_completo
 
+    def save(self, *args, **kwargs):
+        self.nome_chave = normalizar_nome(self.nome_completo)
+        super().save(*args, **kwargs)
+
     @property
     def endereco_completo(self):
         partes = []
@@ -479,6 +679,40 @@ class Medico(models.Model):
         return ", ".join(partes)
 
 
+class OrigemAlias(models.TextChoices):
+    AUTOMATICA = "automatica", "Reconciliação automática"
+    MANUAL     = "manual",     "Revisão manual"
+
+
+class AliasMedico(models.Model):
+    """
+    Grafia alternativa (já normalizada) com que um médico aparece na
+    produção do SIRESP — abreviações, nomes do meio omitidos etc.
+    Aceita pela reconciliação (cadastro.reconciliacao) ou na revisão manual.
+    """
+    nome_chave = models.CharField("Nome no SIRESP (normalizado)", max_length=200, unique=True)
+    medico = models.ForeignKey(
+        Medico,
+        on_delete=models.CASCADE,
+        related_name="aliases",
+        verbose_name="Médico",
+    )
+    origem = models.CharField(
+        "Origem", max_length=20,
+        choices=OrigemAlias.choices, default=OrigemAlias.AUTOMATICA,
+    )
+    pontuacao = models.FloatField("Pontuação", default=0)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Alias de Médico"
+        verbose_name_plural = "Aliases de Médicos"
+        ordering = ["nome_chave"]
+
+    def __str__(self):
+        return f"{self.nome_chave} → {self.medico.nome_completo}"
+
+
 class AgendaMapeamento(models.Model):
     """
     Tabela de correspondência entre um ServicoContratado e os nomes
@@ -501,6 +735,10 @@ class AgendaMapeamento(models.Model):
         max_length=200,
         help_text="Nome exato como aparece no relatório do SIRESP (P05 Produção x Profissional)",
     )
+    nome_chave = models.CharField(
+        "Chave do Nome", max_length=200, blank=True, editable=False, db_index=True,
+        help_text="Nome normalizado usado para casar com a produção do SIRESP",
+    )
 
     class Meta:
         verbose_name = "Mapeamento de Agenda"
@@ -510,3 +748,49 @@ class AgendaMapeamento(models.Model):
 
     def __str__(self):
         return f"{self.servico.descricao} → {self.nome_agenda}"
+
+    def save(self, *args, **kwargs):
+        self.nome_chave = normalizar_nome(self.nome_agenda)
+        super().save(*args, **kwargs)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Módulo: Relatórios em lote
+# ─────────────────────────────────────────────────────────────────────────────
+
+class LoteRelatorio(models.Model):
+    """
+    Pedido de ZIP com os relatórios XLSX de vários prestadores, gerado pelo
+    worker da fila (`processar_fila`) e baixado depois pela tela de espera.
+    Os prestadores são fixados no pedido para que o ZIP não dependa de
+    cadastros alterados enquanto aguarda.
+    """
+    mes_ini = models.PositiveSmallIntegerField("Mês inicial")
+    ano_ini = models.PositiveSmallIntegerField("Ano inicial")
+    prestadores = models.JSONField("Prestadores (pks)", default=list)
+    arquivo = models.FileField("Arquivo ZIP", upload_to="relatorios_lote/%Y/%m/", blank=True)
+    total_relatorios = models.PositiveIntegerField("Relatórios gerados", default=0)
+    solicitado_em = models.DateTimeField(auto_now_add=True)
+    erro = models.TextField("Erro", blank=True)
+
+    # Fila de processamento (ver fila.py)
+    processamento = models.CharField(
+        "Processamento", max_length=20,
+        choices=StatusProcessamento.choices,
+        default=StatusProcessamento.AGUARDANDO,
+    )
+    progresso = models.PositiveSmallIntegerField("Progresso (%)", default=0)
+    processando_desde = models.DateTimeField("Processando desde", null=True, blank=True)
+    worker = models.CharField("Worker", max_length=100, blank=True)
+
+    class Meta:
+        verbose_name = "Lote de Relatórios"
+        verbose_name_plural = "Lotes de Relatórios"
+        ordering = ["-solicitado_em"]
+
+    def __str__(self):
+        return f"Lote {self.mes_ini:02d}/{self.ano_ini} ({self.get_processamento_display()})"
+
+    @property
+    def nome_download(self) -> str:
+        return f"relatorios_{self.mes_ini:02d}{self.ano_ini}.zip"
@@ -0,0 +1,24 @@
+"""
+Normalização de nomes de agendas e profissionais.
+
+Os relatórios do SIRESP e o cadastro nem sempre escrevem o mesmo nome da
+mesma forma ("José  da Conceição" / "JOSE DA CONCEICAO"). A chave
+normalizada remove acentos, junta espaços repetidos e passa para
+maiúsculas; é gravada nas colunas `nome_chave` (indexadas) para que as
+comparações aconteçam no banco.
+"""
+
+import re
+import unicodedata
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_nome(nome: str) -> str:
+    """'  José  da Conceição ' → 'JOSE DA CONCEICAO'."""
+    if not nome:
+        return ""
+    sem_acento = "".join(
+        c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c)
+    )
+    return _ESPACOS.sub(" ", sem_acento).strip().upper()
@@ -13,9 +13,9 @@ Regras de identificação na coluna A:
   - Demais linhas de total/subtotal/rodapé → ignoradas
 
 Formatos suportados:
-  .xlsx / .xlsm  → openpyxl
+  .xlsx / .xlsm  → openpyxl (read-only, lido em streaming do arquivo)
   .xls  (legado binário)  → xlrd  (pip install "xlrd==1.2.0")
-  .xls  (HTML disfarçado) → pandas.read_html()
+  .xls  (HTML disfarçado) → siresp_html (leitura incremental, sem pandas)
     O SIRESP exporta arquivos .xls que são, na verdade, documentos HTML
     completos (ISO-8859-1). Esses arquivos NÃO possuem a assinatura binária
     OLE2/BIFF e são detectados pelo prefixo "<" (tag HTML) no conteúdo.
@@ -28,19 +28,15 @@ o Django já consumiu o stream ao gravar no disco. Por isso usamos
 upload.arquivo.open("rb") para reler do storage após o save.
 """
 
-import io
 import re
 from datetime import date, datetime
 from typing import Optional
 
 import openpyxl
-import pandas as pd
 import xlrd
 
-from .models import (
-    UploadProducao, ProducaoAgenda, ProducaoMedico,
-    StatusImportacao, COLUNAS_SIRESP,
-)
+from .models import UploadProducao, COLUNAS_SIRESP
+from .siresp_html import LeitorTabelaSiresp
 
 # Assinatura binária do formato XLS legado (BIFF/OLE2 Compound Document)
 _XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
@@ -178,23 +174,26 @@ def _eh_medico(texto: str) -> bool:
     return all(c.isupper() for c in letras)
 
 
+# Campos numéricos comuns a ProducaoAgenda e ProducaoMedico
+_CAMPOS_INT = (
+    "vagas_ofertadas", "agend_totais", "agend_bolsao", "nao_distribuidas",
+    "cota", "extra", "total_geral", "presencial", "teleconsulta",
+    "agend_totais_2", "recepcao_ausente", "recepcao_dispensado",
+    "recepcao_desistente", "recepcao_nao_informado", "alta",
+)
+_CAMPOS_FLOAT = (
+    "agend_totais_pct", "agend_bolsao_pct", "nao_distribuidas_pct",
+    "cota_pct", "extra_pct", "presencial_pct", "teleconsulta_pct",
+    "agend_totais_2_pct", "recepcao_ausente_pct", "recepcao_dispensado_pct",
+    "recepcao_desistente_pct", "recepcao_nao_informado_pct", "alta_pct",
+)
+
+
 def _preencher_campos_numericos(obj, dados: dict):
-    campos_int = [
-        "vagas_ofertadas", "agend_totais", "agend_bolsao", "nao_distribuidas",
-        "cota", "extra", "total_geral", "presencial", "teleconsulta",
-        "agend_totais_2", "recepcao_ausente", "recepcao_dispensado",
-        "recepcao_desistente", "recepcao_nao_informado", "alta",
-    ]
-    campos_float = [
-        "agend_totais_pct", "agend_bolsao_pct", "nao_distribuidas_pct",
-        "cota_pct", "extra_pct", "presencial_pct", "teleconsulta_pct",
-        "agend_totais_2_pct", "recepcao_ausente_pct", "recepcao_dispensado_pct",
-        "recepcao_desistente_pct", "recepcao_nao_informado_pct", "alta_pct",
-    ]
-    for campo in campos_int:
+    for campo in _CAMPOS_INT:
         if campo in dados:
             setattr(obj, campo, _safe_int(dados[campo]))
-    for campo in campos_float:
+    for campo in _CAMPOS_FLOAT:
         if campo in dados:
             setattr(obj, campo, _safe_float(dados[campo]))
 
@@ -204,22 +203,29 @@ def _preencher_campos_numericos(obj, dados: dict):
 # ---------------------------------------------------------------------------
 
 class _SheetXlsx:
-    """Wrapper sobre openpyxl worksheet."""
+    """
+    Wrapper sobre openpyxl worksheet aberta em modo read-only.
+
+    As linhas são lidas do arquivo sob demanda (iter_rows com
+    values_only=True), sem carregar a planilha inteira na memória.
+    """
 
     def __init__(self, ws):
         self._ws = ws
         self.n_colunas = len(COLUNAS_SIRESP)
 
     def cell_b2(self) -> str:
-        val = self._ws["B2"].value
-        return str(val).strip() if val is not None else ""
+        # Em modo read-only, ws["B2"] percorreria a planilha a cada acesso
+        for (val,) in self._ws.iter_rows(min_row=2, max_row=2, min_col=2, max_col=2,
+                                         values_only=True):
+            return str(val).strip() if val is not None else ""
+        return ""
 
     def iter_linhas(self):
-        for row in self._ws.iter_rows(min_row=10, max_col=self.n_colunas):
+        for row in self._ws.iter_rows(min_row=10, max_col=self.n_colunas, values_only=True):
             dados = {}
-            for col_idx, cell in enumerate(row[:self.n_colunas]):
+            for col_idx, val in enumerate(row[:self.n_colunas]):
                 nome = COLUNAS_SIRESP[col_idx]
-                val = cell.value
                 if val is None:
                     val = ""
                 elif isinstance(val, str):
@@ -257,9 +263,10 @@ class _SheetHtml:
     Wrapper para arquivos .xls exportados pelo SIRESP que são, na verdade,
     documentos HTML (ISO-8859-1) disfarçados de XLS.
 
-    O pandas.read_html() localiza a maior tabela do documento e itera
-    suas linhas a partir da linha 10 (índice 9 após os 4 cabeçalhos
-    hierárquicos do SIRESP).
+    O HTML é lido em streaming por siresp_html.LeitorTabelaSiresp: a
+    tabela principal é localizada pelo cabeçalho ("Vagas Ofertadas…") e
+    suas linhas são entregues a partir da linha 10 (após os 4 cabeçalhos
+    hierárquicos do SIRESP), sem carregar o documento na memória.
 
     O campo de período é extraído a partir do texto de metadados presente
     nas tabelas menores que precedem a tabela principal.
@@ -269,73 +276,56 @@ class _SheetHtml:
     # antes dos dados propriamente ditos.
     _N_CABECALHOS = 4
 
-    def __init__(self, conteudo: bytes):
-        html = conteudo.decode("iso-8859-1", errors="replace")
-        # thousands='.' e decimal=',' tratam a formatação numérica brasileira:
-        # "1.234" → 1234  e  "95,51" → 95.51
-        self._tables = pd.read_html(
-            io.StringIO(html),
-            header=None,
-            thousands=".",
-            decimal=",",
-        )
-        self._tabela_principal = self._identificar_tabela_principal()
+    def __init__(self, f):
+        self._leitor = LeitorTabelaSiresp(f, COLUNAS_SIRESP, self._N_CABECALHOS)
         self.n_colunas = len(COLUNAS_SIRESP)
 
-    def _identificar_tabela_principal(self) -> pd.DataFrame:
-        """Retorna o DataFrame com mais linhas — é sempre a tabela de dados."""
-        if not self._tables:
-            raise ValueError("Nenhuma tabela HTML encontrada no arquivo.")
-        return max(self._tables, key=len)
-
     def cell_b2(self) -> str:
         """
-        Extrai o texto de período varrendendo todas as tabelas de metadados.
         O SIRESP grava o período num campo como:
           "Unidade Executante:AME X  Período:01-04-2026a30-04-2026  ..."
         """
-        for table in self._tables:
-            for valor in table.values.flatten():
-                if isinstance(valor, str) and "Período:" in valor:
-                    return valor
-        return ""
+        return self._leitor.texto_periodo()
 
     def iter_linhas(self):
-        """
-        Itera as linhas de dados (a partir da linha 10, ou seja, após os
-        4 cabeçalhos hierárquicos do SIRESP) retornando dicionários com
-        os nomes de COLUNAS_SIRESP como chaves.
-        """
-        df = self._tabela_principal.iloc[self._N_CABECALHOS:].reset_index(drop=True)
-        n = min(self.n_colunas, df.shape[1])
-        for _, row in df.iterrows():
-            dados = {}
-            for col_idx in range(n):
-                nome = COLUNAS_SIRESP[col_idx]
-                val = row.iloc[col_idx]
-                if pd.isna(val):
-                    val = ""
-                elif not isinstance(val, str):
-                    val = str(val)
-                dados[nome] = val
-            yield dados
+        return self._leitor.iter_linhas()
+
 
+def _detectar_formato(f) -> str:
+    """
+    Lê os primeiros bytes do arquivo e devolve "html", "xls" ou "xlsx".
+    O ponteiro do arquivo é reposicionado no início.
+    """
+    cabecalho = f.read(len(_XLS_MAGIC))
+    f.seek(0)
+    if cabecalho[:1] == _HTML_MAGIC:
+        return "html"
+    if cabecalho == _XLS_MAGIC:
+        return "xls"
+    return "xlsx"
 
-def _abrir_sheet(conteudo: bytes):
+
+def _abrir_sheet(f):
     """
     Detecta o formato pelo cabeçalho do arquivo e retorna o wrapper correto.
 
       HTML (SIRESP): primeiro byte == "<"           → _SheetHtml
       XLS   (BIFF) : primeiros 8 bytes == _XLS_MAGIC → _SheetXls
       Qualquer outro caso (ZIP/OOXML)               → _SheetXlsx
+
+    `f` é o arquivo binário aberto do storage. O XLSX é lido em modo
+    read-only direto do arquivo, que deve permanecer aberto enquanto as
+    linhas forem consumidas, assim como o HTML; o XLS legado é carregado
+    inteiro.
     """
-    if conteudo[:1] == _HTML_MAGIC:
-        return _SheetHtml(conteudo)
-    elif conteudo[:8] == _XLS_MAGIC:
-        wb = xlrd.open_workbook(file_contents=conteudo)
+    formato = _detectar_formato(f)
+    if formato == "html":
+        return _SheetHtml(f)
+    elif formato == "xls":
+        wb = xlrd.open_workbook(file_contents=f.read())
         return _SheetXls(wb.sheets()[0])
     else:
-        wb = openpyxl.load_workbook(filename=io.BytesIO(conteudo), data_only=True)
+        wb = openpyxl.load_workbook(filename=f, read_only=True, data_only=True)
         return _SheetXlsx(wb.active)
 
 
@@ -343,65 +333,44 @@ def _abrir_sheet(conteudo: bytes):
 # Função principal
 # ---------------------------------------------------------------------------
 
-def processar_upload(upload_id: int) -> None:
+def processar_upload(upload_id: int, ao_progredir=None) -> dict:
     """
     Lê o arquivo (XLS ou XLSX) associado ao UploadProducao e persiste
     ProducaoAgenda + ProducaoMedico no banco.
 
+    A gravação é feita por importacao_siresp.importar_linhas(): as linhas
+    são consumidas sob demanda e gravadas em lotes numa única transação,
+    com memória limitada independentemente do tamanho da planilha.
+    Retorna as estatísticas da importação (inclui linhas/s).
+
     IMPORTANTE: usa upload.arquivo.open("rb") para reler o arquivo do
     storage após upload.save(), evitando o problema de stream já consumido.
     """
+    from .importacao_siresp import importar_linhas
+
     upload = UploadProducao.objects.get(pk=upload_id)
 
     # Reabre o arquivo do disco/storage (o stream original já foi consumido
-    # pelo Django ao fazer upload.save() na view)
+    # pelo Django ao fazer upload.save() na view). O arquivo fica aberto
+    # durante toda a importação: as linhas do XLSX são lidas sob demanda.
     with upload.arquivo.open("rb") as f:
-        conteudo = f.read()
-
-    sheet = _abrir_sheet(conteudo)
-
-    # — Extrai período da célula B2 —
-    match = _PERIODO_RE.search(sheet.cell_b2())
-    if match:
-        upload.data_inicio_periodo = _parse_date(match.group(1))
-        upload.data_fim_periodo = _parse_date(match.group(2))
-
-    # — Limpa dados anteriores deste upload —
-    upload.agendas.all().delete()
-
-    # — Percorre as linhas a partir da linha 10 —
-    agenda_obj: Optional[ProducaoAgenda] = None
-    total_agendas = 0
-    total_medicos = 0
-
-    for dados in sheet.iter_linhas():
-        col_a = str(dados.get(COLUNAS_SIRESP[0], "")).strip()
-        if not col_a:
-            continue
-
-        if _eh_total_geral(col_a):
-            break
-
-        if _eh_agenda(col_a):
-            agenda_obj, _ = ProducaoAgenda.objects.get_or_create(
-                upload=upload,
-                nome_agenda=col_a,
-            )
-            _preencher_campos_numericos(agenda_obj, dados)
-            agenda_obj.save()
-            total_agendas += 1
-
-        elif _eh_medico(col_a) and agenda_obj is not None:
-            medico_obj = ProducaoMedico(
-                agenda=agenda_obj,
-                nome_medico=col_a,
-            )
-            _preencher_campos_numericos(medico_obj, dados)
-            medico_obj.save()
-            total_medicos += 1
-
-    upload.total_agendas = total_agendas
-    upload.total_medicos = total_medicos
-    upload.status = StatusImportacao.CONFIRMADO
-    upload.erro_processamento = ""
-    upload.save()
+        sheet = _abrir_sheet(f)
+        if ao_progredir:
+            ao_progredir(10)
+
+        # — Extrai período da célula B2 —
+        match = _PERIODO_RE.search(sheet.cell_b2())
+        if match:
+            upload.data_inicio_periodo = _parse_date(match.group(1))
+            upload.data_fim_periodo = _parse_date(match.group(2))
+
+        # — Percorre as linhas a partir da linha 10, gravando em lotes —
+        return importar_linhas(
+            upload,
+            sheet.iter_linhas(),
+            coluna_nome=COLUNAS_SIRESP[0],
+            eh_agenda=_eh_agenda,
+            eh_profissional=_eh_medico,
+            ao_progredir=ao_progredir,
+            arquivo=f,
+        )
@@ -15,30 +15,23 @@ Diferenças em relação ao relatório de Consultas (producao_siresp.py):
   - No formato HTML (SIRESP): apenas 3 linhas de cabeçalho (vs. 4 no relatório de Consultas)
 
 Formatos suportados:
-  .xlsx / .xlsm         → openpyxl
+  .xlsx / .xlsm         → openpyxl (read-only, lido em streaming do arquivo)
   .xls (legado binário) → xlrd
-  .xls (HTML disfarçado)→ pandas.read_html()
+  .xls (HTML disfarçado)→ siresp_html (leitura incremental, sem pandas)
     O SIRESP exporta arquivos .xls que são HTML puro (ISO-8859-1).
     Detectados pelo primeiro byte '<' (0x3C).
 
 Detecção automática por cabeçalho do arquivo, não pela extensão.
 """
 
-import io
 import re
-from typing import Optional
-
 import openpyxl
-import pandas as pd
 import xlrd
 
-from .models import (
-    UploadProducao, ProducaoAgenda, ProducaoMedico,
-    StatusImportacao, COLUNAS_SIRESP_EXAMES,
-)
+from .models import UploadProducao, COLUNAS_SIRESP_EXAMES
+from .siresp_html import LeitorTabelaSiresp
 from .producao_siresp import (
-    _XLS_MAGIC, _HTML_MAGIC, _PERIODO_RE, _parse_date,
-    _safe_int, _safe_float, _eh_total_geral, _preencher_campos_numericos,
+    _PERIODO_RE, _parse_date, _eh_total_geral, _detectar_formato,
 )
 
 # ---------------------------------------------------------------------------
@@ -184,22 +177,23 @@ def _eh_profissional_exame(texto: str) -> bool:
 # ---------------------------------------------------------------------------
 
 class _SheetXlsxExames:
-    """Wrapper sobre openpyxl worksheet para o relatório de Exames."""
+    """Wrapper sobre openpyxl worksheet (modo read-only) para o relatório de Exames."""
 
     def __init__(self, ws):
         self._ws = ws
         self.n_colunas = len(COLUNAS_SIRESP_EXAMES)
 
     def cell_b2(self) -> str:
-        val = self._ws["B2"].value
-        return str(val).strip() if val is not None else ""
+        for (val,) in self._ws.iter_rows(min_row=2, max_row=2, min_col=2, max_col=2,
+                                         values_only=True):
+            return str(val).strip() if val is not None else ""
+        return ""
 
     def iter_linhas(self):
-        for row in self._ws.iter_rows(min_row=9, max_col=self.n_colunas):
+        for row in self._ws.iter_rows(min_row=9, max_col=self.n_colunas, values_only=True):
             dados = {}
-            for col_idx, cell in enumerate(row[:self.n_colunas]):
+            for col_idx, val in enumerate(row[:self.n_colunas]):
                 nome = COLUNAS_SIRESP_EXAMES[col_idx]
-                val = cell.value
                 if val is None:
                     val = ""
                 elif isinstance(val, str):
@@ -235,7 +229,8 @@ class _SheetXlsExames:
 class _SheetHtmlExames:
     """
     Wrapper para arquivos .xls de Cirurgias/Exames exportados pelo SIRESP
-    que são documentos HTML (ISO-8859-1) disfarçados de XLS.
+    que são documentos HTML (ISO-8859-1) disfarçados de XLS, lidos em
+    streaming por siresp_html.LeitorTabelaSiresp.
 
     Diferença crítica em relação ao relatório de Consultas:
       - Apenas 3 linhas de cabeçalho hierárquico (vs. 4 em Consultas)
@@ -244,57 +239,37 @@ class _SheetHtmlExames:
 
     _N_CABECALHOS = 3
 
-    def __init__(self, conteudo: bytes):
-        html = conteudo.decode("iso-8859-1", errors="replace")
-        self._tables = pd.read_html(
-            io.StringIO(html),
-            header=None,
-            thousands=".",
-            decimal=",",
-        )
-        self._tabela_principal = max(self._tables, key=len)
+    def __init__(self, f):
+        self._leitor = LeitorTabelaSiresp(f, COLUNAS_SIRESP_EXAMES, self._N_CABECALHOS)
         self.n_colunas = len(COLUNAS_SIRESP_EXAMES)
 
     def cell_b2(self) -> str:
         """Varre as tabelas de metadados em busca do campo 'Período:'."""
-        for table in self._tables:
-            for valor in table.values.flatten():
-                if isinstance(valor, str) and "Período:" in valor:
-                    return valor
-        return ""
+        return self._leitor.texto_periodo()
 
     def iter_linhas(self):
-        """Itera os dados após os 3 cabeçalhos hierárquicos do SIRESP."""
-        df = self._tabela_principal.iloc[self._N_CABECALHOS:].reset_index(drop=True)
-        n = min(self.n_colunas, df.shape[1])
-        for _, row in df.iterrows():
-            dados = {}
-            for col_idx in range(n):
-                nome = COLUNAS_SIRESP_EXAMES[col_idx]
-                val = row.iloc[col_idx]
-                if pd.isna(val):
-                    val = ""
-                elif not isinstance(val, str):
-                    val = str(val)
-                dados[nome] = val
-            yield dados
+        return self._leitor.iter_linhas()
 
 
-def _abrir_sheet_exames(conteudo: bytes):
+def _abrir_sheet_exames(f):
     """
     Detecta o formato pelo cabeçalho do arquivo e retorna o wrapper correto.
 
       HTML (SIRESP): primeiro byte == '<'            → _SheetHtmlExames
       XLS   (BIFF) : primeiros 8 bytes == _XLS_MAGIC → _SheetXlsExames
       Qualquer outro caso (ZIP/OOXML)               → _SheetXlsxExames
+
+    Como em producao_siresp._abrir_sheet, o XLSX é lido em streaming do
+    arquivo `f`, que deve continuar aberto durante a iteração.
     """
-    if conteudo[:1] == _HTML_MAGIC:
-        return _SheetHtmlExames(conteudo)
-    elif conteudo[:8] == _XLS_MAGIC:
-        wb = xlrd.open_workbook(file_contents=conteudo)
+    formato = _detectar_formato(f)
+    if formato == "html":
+        return _SheetHtmlExames(f)
+    elif formato == "xls":
+        wb = xlrd.open_workbook(file_contents=f.read())
         return _SheetXlsExames(wb.sheets()[0])
     else:
-        wb = openpyxl.load_workbook(filename=io.BytesIO(conteudo), data_only=True)
+        wb = openpyxl.load_workbook(filename=f, read_only=True, data_only=True)
         return _SheetXlsxExames(wb.active)
 
 
@@ -302,60 +277,35 @@ def _abrir_sheet_exames(conteudo: bytes):
 # Função principal
 # ---------------------------------------------------------------------------
 
-def processar_upload_exames(upload_id: int) -> None:
+def processar_upload_exames(upload_id: int, ao_progredir=None) -> dict:
     """
     Lê o arquivo XLS/XLSX de Cirurgias/Exames e persiste
     ProducaoAgenda + ProducaoMedico no banco.
 
     Agendas são identificadas pelo conjunto fixo AGENDAS_SIRESP_EXAMES;
     profissionais são as demais linhas em MAIÚSCULAS entre duas agendas.
+    A gravação em lote/transacional fica a cargo de importar_linhas().
     """
+    from .importacao_siresp import importar_linhas
+
     upload = UploadProducao.objects.get(pk=upload_id)
 
     with upload.arquivo.open("rb") as f:
-        conteudo = f.read()
-
-    sheet = _abrir_sheet_exames(conteudo)
-
-    match = _PERIODO_RE.search(sheet.cell_b2())
-    if match:
-        upload.data_inicio_periodo = _parse_date(match.group(1))
-        upload.data_fim_periodo = _parse_date(match.group(2))
-
-    upload.agendas.all().delete()
-
-    agenda_obj: Optional[ProducaoAgenda] = None
-    total_agendas = 0
-    total_medicos = 0
-
-    for dados in sheet.iter_linhas():
-        col_a = str(dados.get(COLUNAS_SIRESP_EXAMES[0], "")).strip()
-        if not col_a:
-            continue
-
-        if _eh_total_geral(col_a):
-            break
-
-        if _eh_agenda_exame(col_a):
-            agenda_obj, _ = ProducaoAgenda.objects.get_or_create(
-                upload=upload,
-                nome_agenda=col_a,
-            )
-            _preencher_campos_numericos(agenda_obj, dados)
-            agenda_obj.save()
-            total_agendas += 1
-
-        elif _eh_profissional_exame(col_a) and agenda_obj is not None:
-            medico_obj = ProducaoMedico(
-                agenda=agenda_obj,
-                nome_medico=col_a,
-            )
-            _preencher_campos_numericos(medico_obj, dados)
-            medico_obj.save()
-            total_medicos += 1
-
-    upload.total_agendas = total_agendas
-    upload.total_medicos = total_medicos
-    upload.status = StatusImportacao.CONFIRMADO
-    upload.erro_processamento = ""
-    upload.save()
+        sheet = _abrir_sheet_exames(f)
+        if ao_progredir:
+            ao_progredir(10)
+
+        match = _PERIODO_RE.search(sheet.cell_b2())
+        if match:
+            upload.data_inicio_periodo = _parse_date(match.group(1))
+            upload.data_fim_periodo = _parse_date(match.group(2))
+
+        return importar_linhas(
+            upload,
+            sheet.iter_linhas(),
+            coluna_nome=COLUNAS_SIRESP_EXAMES[0],
+            eh_agenda=_eh_agenda_exame,
+            eh_profissional=_eh_profissional_exame,
+            ao_progredir=ao_progredir,
+            arquivo=f,
+        )
@@ -0,0 +1,272 @@
+"""
+Reconciliação aproximada entre nomes da produção SIRESP e médicos cadastrados.
+
+O SIRESP imprime os profissionais em maiúsculas, com abreviações
+("J. A. SILVA", "MARIA APARECIDA S OLIVEIRA") e nomes do meio omitidos, e
+muitas linhas não casam com nenhum Medico pela chave exata. Este módulo:
+
+  - monta uma única vez, em memória, um índice invertido de trigramas dos
+    tokens dos nomes cadastrados (IndiceMedicos); cada nome consultado só
+    é pontuado contra os poucos médicos com mais trigramas raros em comum
+    (trigramas de nomes muito frequentes pesam menos, como num IDF);
+  - pontua cada candidato de 0 a 1 (pontuar): tokens iguais valem 1,
+    iniciais e prefixos ("ANT" / "ANTONIO") valem menos, tokens parecidos
+    são comparados por trigramas; o primeiro e o último nome pesam mais;
+  - classifica o resultado (reconciliar): aceito automaticamente quando o
+    melhor candidato é forte e bem separado do segundo, ambíguo (para
+    revisão manual) quando há candidatos plausíveis, ou sem candidato.
+
+Os aliases aceitos ficam em AliasMedico e entram no vínculo da produção
+(ver vinculo_medicos.mapa_medicos).
+"""
+
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .cache_indicadores import incrementar_versao
+from .models import Medico, ProducaoMedico, AliasMedico, OrigemAlias
+from .vinculo_medicos import resolver_chaves
+
+# Partículas ignoradas na comparação
+_PARTICULAS = {"DA", "DE", "DO", "DAS", "DOS", "E", "D"}
+
+_TOKEN = re.compile(r"[A-Z0-9]+")
+
+# Limiares de classificação
+LIMIAR_ACEITE = 0.85     # pontuação mínima para aceitar sozinho
+MARGEM_ACEITE = 0.10     # distância mínima para o segundo colocado
+LIMIAR_REVISAO = 0.55    # abaixo disso o candidato é descartado
+
+# Quantos candidatos (pelos trigramas em comum) são pontuados por nome
+MAX_CANDIDATOS = 30
+
+# Trigramas presentes em mais de ~20% dos nomes (log(1/0,2)) não votam
+PESO_MINIMO_TRIGRAMA = math.log(5)
+
+
+def tokens(chave: str) -> list:
+    """Tokens de uma chave normalizada, sem partículas."""
+    return [t for t in _TOKEN.findall(chave) if t not in _PARTICULAS]
+
+
+def trigramas(texto: str) -> set:
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _similaridade(a: set, b: set) -> float:
+    """Coeficiente de Dice entre dois conjuntos de trigramas."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _peso_token(consulta: str, candidato: str, tri_consulta: set, tri_candidato: set) -> float:
+    """Quanto um token da consulta equivale a um token do candidato."""
+    if consulta == candidato:
+        return 1.0
+    if len(consulta) == 1:
+        return 0.8 if candidato.startswith(consulta) else 0.0
+    if len(consulta) >= 3 and candidato.startswith(consulta):
+        return 0.85
+    sim = _similaridade(tri_consulta, tri_candidato)
+    return sim if sim >= 0.5 else 0.0
+
+
+@dataclass
+class _NomeIndexado:
+    pk: int
+    chave: str
+    tokens: list
+    trigramas: list = field(default_factory=list)   # trigramas de cada token
+
+
+def pontuar(consulta: _NomeIndexado, candidato: _NomeIndexado, cache=None) -> float:
+    """
+    Pontuação (0 a 1) de `candidato` para o nome `consulta`.
+
+    Cada token da consulta é casado, em ordem, com o melhor token ainda
+    livre do candidato. Primeiro e último nomes pesam o dobro, e o último
+    deve casar com o sobrenome final do candidato; tokens do candidato sem
+    correspondência (nomes do meio omitidos) custam pouco.
+    `cache` (dict) reaproveita comparações de tokens entre candidatos.
+    """
+    if not consulta.tokens or not candidato.tokens:
+        return 0.0
+    livres = list(range(len(candidato.tokens)))
+    n = len(consulta.tokens)
+    soma = pesos = 0.0
+    for i, (tok, tri) in enumerate(zip(consulta.tokens, consulta.trigramas)):
+        peso = 2.0 if i in (0, n - 1) else 1.0
+        melhor, melhor_j = 0.0, None
+        for j in livres:
+            par = (tok, candidato.tokens[j])
+            valor = cache.get(par) if cache is not None else None
+            if valor is None:
+                valor = _peso_token(tok, candidato.tokens[j], tri, candidato.trigramas[j])
+                if cache is not None:
+                    cache[par] = valor
+            # No último token, empates ficam com a posição mais à direita
+            if valor > melhor or (valor and valor == melhor and i == n - 1):
+                melhor, melhor_j = valor, j
+        if melhor_j is not None:
+            livres.remove(melhor_j)
+        soma += peso * melhor
+        pesos += peso
+    cobertura = soma / pesos
+    # O SIRESP omite nomes do meio, não o sobrenome final
+    if melhor_j != len(candidato.tokens) - 1:
+        cobertura *= 0.85
+    # Penalidade leve pelos tokens do candidato que ficaram sem par
+    sobra = len(livres) / len(candidato.tokens)
+    return round(cobertura * (1 - 0.15 * sobra), 4)
+
+
+class IndiceMedicos:
+    """
+    Índices em memória sobre os nomes (chaves normalizadas) dos médicos.
+
+    `nomes` é um iterável de (pk, nome_chave). Os candidatos de uma
+    consulta são os MAX_CANDIDATOS médicos com maior soma dos pesos dos
+    trigramas em comum; só eles são pontuados.
+    """
+
+    def __init__(self, nomes):
+        self._nomes = {}
+        por_trigrama = defaultdict(set)
+        for pk, chave in nomes:
+            item = self._indexar(pk, chave)
+            if not item.tokens:
+                continue
+            self._nomes[pk] = item
+            for tris in item.trigramas:
+                for tri in tris:
+                    por_trigrama[tri].add(pk)
+        # Peso de cada trigrama ~ log(N / frequência): raros discriminam mais
+        total = len(self._nomes) + 1
+        self._por_trigrama = {
+            tri: (math.log(total / len(pks)), tuple(pks)) for tri, pks in por_trigrama.items()
+        }
+
+    @staticmethod
+    def _indexar(pk, chave) -> _NomeIndexado:
+        toks = tokens(chave)
+        return _NomeIndexado(pk=pk, chave=chave, tokens=toks, trigramas=[trigramas(t) for t in toks])
+
+    def __len__(self):
+        return len(self._nomes)
+
+    def candidatos(self, chave: str) -> list:
+        """[(pk, pontuação), …] em ordem decrescente, acima de LIMIAR_REVISAO."""
+        consulta = self._indexar(None, chave)
+        if not consulta.tokens:
+            return []
+
+        # Trigramas muito comuns (peso baixo) custam caro e quase não
+        # discriminam: ficam de fora, a menos que só haja deles
+        postagens = [self._por_trigrama[t] for t in set().union(*consulta.trigramas)
+                     if t in self._por_trigrama]
+        raros = [p for p in postagens if p[0] >= PESO_MINIMO_TRIGRAMA] or postagens
+        votos = defaultdict(float)
+        for peso, pks in raros:
+            for pk in pks:
+                votos[pk] += peso
+        finalistas = sorted(votos, key=votos.get, reverse=True)[:MAX_CANDIDATOS]
+
+        cache = {}
+        resultado = []
+        for pk in finalistas:
+            pontos = pontuar(consulta, self._nomes[pk], cache)
+            if pontos >= LIMIAR_REVISAO:
+                resultado.append((pk, pontos))
+        resultado.sort(key=lambda c: (-c[1], c[0]))
+        return resultado
+
+
+# ── Classificação ────────────────────────────────────────────────────────────
+
+ACEITO = "aceito"
+AMBIGUO = "ambiguo"
+SEM_CANDIDATO = "sem_candidato"
+
+
+def classificar(candidatos: list) -> str:
+    if not candidatos:
+        return SEM_CANDIDATO
+    melhor = candidatos[0][1]
+    segundo = candidatos[1][1] if len(candidatos) > 1 else 0.0
+    if melhor >= LIMIAR_ACEITE and melhor - segundo >= MARGEM_ACEITE:
+        return ACEITO
+    return AMBIGUO
+
+
+def indice_medicos_ativos() -> IndiceMedicos:
+    return IndiceMedicos(
+        Medico.objects.filter(ativo=True).exclude(nome_chave="")
+        .values_list("pk", "nome_chave")
+    )
+
+
+def nomes_nao_resolvidos():
+    """
+    [(nome_chave, linhas, agend_totais), …] dos profissionais da produção
+    ainda sem médico vinculado, dos de maior volume para os de menor.
+    """
+    return list(
+        ProducaoMedico.objects.filter(medico__isnull=True)
+        .exclude(nome_chave="")
+        .values("nome_chave")
+        .annotate(linhas=Count("pk"), agend_totais=Sum("agend_totais"))
+        .order_by("-agend_totais", "nome_chave")
+        .values_list("nome_chave", "linhas", "agend_totais")
+    )
+
+
+def reconciliar(nomes, indice: IndiceMedicos) -> dict:
+    """
+    Classifica cada nome: { nome_chave: (situação, [(pk, pontuação), …]) }.
+    Não grava nada — ver gravar_aceitos().
+    """
+    resultado = {}
+    for nome in nomes:
+        candidatos = indice.candidatos(nome)
+        resultado[nome] = (classificar(candidatos), candidatos)
+    return resultado
+
+
+def gravar_aceitos(resultado: dict) -> int:
+    """
+    Cria os AliasMedico dos nomes aceitos que ainda não têm alias e
+    re-vincula a produção desses nomes em lote. Retorna o nº de aliases criados.
+    """
+    aceitos = {
+        nome: candidatos[0]
+        for nome, (situacao, candidatos) in resultado.items()
+        if situacao == ACEITO
+    }
+    with transaction.atomic():
+        existentes = set(
+            AliasMedico.objects.filter(nome_chave__in=list(aceitos))
+            .values_list("nome_chave", flat=True)
+        )
+        aliases = [
+            AliasMedico(
+                nome_chave=nome, medico_id=medico_pk,
+                origem=OrigemAlias.AUTOMATICA, pontuacao=pontuacao,
+            )
+            for nome, (medico_pk, pontuacao) in aceitos.items()
+            if nome not in existentes
+        ]
+        if not aliases:
+            return 0
+        # bulk_create não dispara sinais: o vínculo e a versão dos
+        # dashboards são atualizados uma vez aqui
+        AliasMedico.objects.bulk_create(aliases, batch_size=500, ignore_conflicts=True)
+        resolver_chaves(a.nome_chave for a in aliases)
+        incrementar_versao()
+    return len(aliases)
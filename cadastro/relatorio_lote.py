@@ -0,0 +1,279 @@
+"""
+Relatório XLSX de produção: parâmetros por prestador e geração em lote (ZIP).
+
+Os dados de cada prestador (serviços, especialidade, mapeamentos de agenda)
+são lidos do banco no processo principal, com um número fixo de consultas
+para qualquer quantidade de prestadores, mais uma consulta agregada por
+prestador para a produção já importada (ver producao_do_periodo). No
+comando gerar_relatorios, só a montagem do workbook, que é openpyxl puro,
+vai para um ProcessPoolExecutor; cada arquivo entra no ZIP assim que fica
+pronto e deixa a memória em seguida.
+
+Pela tela, o lote é um LoteRelatorio na fila do banco (fila.py): o request
+só grava o pedido, e o worker gera o ZIP no próprio processo
+(processar_lote), sem abrir um pool dentro do servidor web.
+"""
+
+import calendar
+import os
+import shutil
+import tempfile
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from django.core.files import File
+from django.db.models import Exists, OuterRef, Prefetch, Sum
+from django.utils import timezone
+
+from . import cache_relatorios
+from .cache_indicadores import versao_dados
+from .mapeamentos import IndiceMapeamentos
+from .models import (
+    LoteRelatorio, Medico, Prestador, ProducaoFato, ServicoContratado, StatusProcessamento,
+)
+from .relatorio_producao import relatorio_em_bytes
+
+# Lotes pedidos há mais dias que isso são apagados (com o ZIP) a cada novo lote
+DIAS_RETENCAO_LOTES = 7
+
+
+class TempoRelatorio(NamedTuple):
+    prestador: str
+    arquivo: str
+    segundos: float
+    tamanho: int
+    do_cache: bool = False
+
+
+def com_dados_relatorio(prestadores):
+    """Queryset de prestadores com serviços (já ordenados) e especialidades pré-carregados."""
+    return prestadores.annotate(
+        tem_medicos=Exists(Medico.objects.filter(prestador=OuterRef("pk"), ativo=True)),
+    ).prefetch_related(
+        Prefetch(
+            "servicos",
+            queryset=ServicoContratado.objects.order_by("tipo_servico", "descricao"),
+            to_attr="servicos_relatorio",
+        ),
+        "especialidades",
+    )
+
+
+def janela_relatorio(mes_ini: int, ano_ini: int):
+    """Primeiro e último dia do relatório: 21 do mês inicial a 20 do seguinte."""
+    mes_fim = 1 if mes_ini == 12 else mes_ini + 1
+    ano_fim = ano_ini + 1 if mes_ini == 12 else ano_ini
+    return date(ano_ini, mes_ini, 21), date(ano_fim, mes_fim, 20)
+
+
+def nome_arquivo(prestador, mes_ini: int, ano_ini: int) -> str:
+    _, fim = janela_relatorio(mes_ini, ano_ini)
+    return (
+        f"relatorio_{prestador.nome_empresa.replace(' ', '_')}_"
+        f"{mes_ini:02d}{ano_ini}_{fim.month:02d}{fim.year}.xlsx"
+    )
+
+
+def producao_do_periodo(prestador, mes_ini: int, ano_ini: int, chaves, campo="agend_totais") -> dict:
+    """
+    Produção importada do prestador na janela do relatório, numa única
+    consulta agregada sobre a tabela de fatos: { (agenda_chave, (dia, mes)): total }.
+
+    O SIRESP informa totais por mês, não por dia. A janela (21 a 20) cruza
+    dois meses; entra o mês inicial, lançado no seu último dia — o único
+    dos dois cujo fim cai na janela. O mês seguinte entra no relatório
+    seguinte, então nenhum mês é contado duas vezes. Como nos dashboards,
+    valem os dados do upload vigente (UploadVigente/ProducaoFato), e
+    prestador com médicos ativos soma as linhas desses médicos; sem
+    médicos, usa os totais das agendas. `prestador.tem_medicos` vem de
+    com_dados_relatorio().
+    """
+    chaves = list(chaves)
+    if not chaves:
+        return {}
+    mes = date(ano_ini, mes_ini, 1)
+    ultimo_dia = (calendar.monthrange(ano_ini, mes_ini)[1], mes_ini)
+
+    fatos = ProducaoFato.objects.filter(mes=mes, agenda_chave__in=chaves)
+    if prestador.tem_medicos:
+        fatos = fatos.filter(medico__prestador=prestador, medico__ativo=True)
+    else:
+        fatos = fatos.filter(profissional_chave="")
+
+    return {
+        (chave, ultimo_dia): total
+        for chave, total in (
+            fatos.values("agenda_chave").annotate(total=Sum(campo))
+            .values_list("agenda_chave", "total")
+        )
+    }
+
+
+def parametros_relatorio(prestador, mes_ini: int, ano_ini: int, indice: IndiceMapeamentos) -> dict:
+    """Argumentos de criar_relatorio para um prestador vindo de com_dados_relatorio()."""
+    especialidade = next(iter(prestador.especialidades.all()), None)
+
+    chaves_por_servico = {s.pk: indice.chaves_agenda(s) for s in prestador.servicos_relatorio}
+    producao = producao_do_periodo(
+        prestador, mes_ini, ano_ini, {c for cs in chaves_por_servico.values() for c in cs},
+    )
+    por_servico = defaultdict(dict)
+    for (chave, dia), total in producao.items():
+        for pk, chaves in chaves_por_servico.items():
+            if chave in chaves:
+                por_servico[pk][dia] = por_servico[pk].get(dia, 0) + total
+
+    servicos = [
+        {
+            "descricao": s.descricao or s.get_tipo_servico_display(),
+            "cod": s.pk,
+            "agenda": ", ".join(m.nome_agenda for m in indice.mapeamentos(s)),
+            "estimativa": s.quantidade_estimada_mes,
+            "valor_unit": float(s.valor_unitario),
+            "producao": por_servico.get(s.pk, {}),
+        }
+        for s in prestador.servicos_relatorio
+    ]
+    if not servicos:
+        servicos = [{
+            "descricao": especialidade.nome if especialidade else "Serviço",
+            "cod": 1,
+            "agenda": "",
+            "estimativa": 0,
+            "valor_unit": 0.0,
+            "producao": {},
+        }]
+
+    return {
+        "mes_ini": mes_ini,
+        "ano_ini": ano_ini,
+        "nome_empresa": prestador.nome_empresa,
+        "especialidade": especialidade.nome if especialidade else "",
+        "servicos": servicos,
+        "prestador_nome": prestador.nome_representante or prestador.nome_empresa,
+        "crm": prestador.crm_representante or "",
+    }
+
+
+def gerar_lote(destino, prestadores, mes_ini: int, ano_ini: int, *,
+               processos: int | None = None, usar_cache: bool = True, ao_concluir=None) -> list:
+    """
+    Grava em `destino` (caminho ou arquivo binário) um ZIP com o relatório
+    de cada prestador do queryset e devolve [TempoRelatorio, …] na ordem de
+    conclusão.
+
+    `processos`: tamanho do pool (padrão: nº de CPUs; 1 gera no próprio
+    processo). Com `usar_cache`, relatórios já gravados para a versão atual
+    dos dados vêm do cache em disco (ver cache_relatorios) sem que seus
+    parâmetros sejam calculados, e os gerados são gravados nele.
+    `ao_concluir(tempo, feitos, total)` é chamado a cada arquivo.
+    """
+    versao = versao_dados() if usar_cache else None
+
+    # Nomes repetidos (mesma razão social) ganham o pk para não colidir no ZIP
+    tarefas, usados = [], set()
+    for prestador in prestadores.only("pk", "nome_empresa"):
+        nome = nome_arquivo(prestador, mes_ini, ano_ini)
+        if nome in usados:
+            nome = nome.replace(".xlsx", f"_{prestador.pk}.xlsx")
+        usados.add(nome)
+        caminho = (
+            cache_relatorios.caminho_relatorio(prestador.pk, mes_ini, ano_ini, versao)
+            if usar_cache else None
+        )
+        tarefas.append((prestador, nome, caminho))
+
+    tempos = []
+
+    # Os XLSX já são comprimidos: armazenados sem nova compressão
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as zf:
+
+        def registrar(tempo):
+            tempos.append(tempo)
+            if ao_concluir:
+                ao_concluir(tempo, len(tempos), len(tarefas))
+
+        def gravar(prestador, nome, caminho, conteudo, segundos):
+            zf.writestr(nome, conteudo)
+            if caminho:
+                cache_relatorios.gravar(caminho, conteudo)
+            registrar(TempoRelatorio(prestador, nome, segundos, len(conteudo)))
+
+        faltantes = {}
+        for prestador, nome, caminho in tarefas:
+            arquivo = cache_relatorios.abrir(caminho) if caminho else None
+            if arquivo is None:
+                faltantes[prestador.pk] = (nome, caminho)
+                continue
+            with arquivo, zf.open(nome, "w") as entrada:
+                shutil.copyfileobj(arquivo, entrada)
+                tamanho = arquivo.tell()
+            registrar(TempoRelatorio(prestador.nome_empresa, nome, 0.0, tamanho, do_cache=True))
+
+        # Só os relatórios a gerar carregam serviços, mapeamentos e produção
+        a_gerar = []
+        if faltantes:
+            indice = IndiceMapeamentos.dos_prestadores(list(faltantes))
+            for prestador in com_dados_relatorio(prestadores.filter(pk__in=list(faltantes))):
+                nome, caminho = faltantes[prestador.pk]
+                parametros = parametros_relatorio(prestador, mes_ini, ano_ini, indice)
+                a_gerar.append((prestador.nome_empresa, nome, parametros, caminho))
+
+        processos = max(1, min(processos or os.cpu_count() or 1, len(a_gerar) or 1))
+        if processos == 1:
+            for prestador, nome, parametros, caminho in a_gerar:
+                gravar(prestador, nome, caminho, *relatorio_em_bytes(parametros))
+            return tempos
+
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            pendentes = {
+                pool.submit(relatorio_em_bytes, parametros): (prestador, nome, caminho)
+                for prestador, nome, parametros, caminho in a_gerar
+            }
+            for futuro in as_completed(pendentes):
+                gravar(*pendentes.pop(futuro), *futuro.result())
+    return tempos
+
+
+def processar_lote(lote_id: int, ao_progredir=None) -> dict:
+    """
+    Executor da fila "relatorios": gera o ZIP de um LoteRelatorio no próprio
+    processo (processos=1), anexa-o ao lote e o marca como concluído.
+    `ao_progredir(pct)` recebe a fração de relatórios prontos.
+    """
+    lote = LoteRelatorio.objects.get(pk=lote_id)
+    prestadores = Prestador.objects.filter(pk__in=lote.prestadores)
+
+    def progredir(tempo, feitos, total):
+        if ao_progredir:
+            ao_progredir(int(99 * feitos / total))
+
+    with tempfile.TemporaryFile() as arquivo:
+        tempos = gerar_lote(
+            arquivo, prestadores, lote.mes_ini, lote.ano_ini, processos=1, ao_concluir=progredir,
+        )
+        arquivo.seek(0)
+        lote.arquivo.save(lote.nome_download, File(arquivo), save=False)
+
+    lote.total_relatorios = len(tempos)
+    lote.processamento = StatusProcessamento.CONCLUIDO
+    lote.progresso = 100
+    lote.erro = ""
+    lote.save()
+
+    _apagar_lotes_antigos()
+    return {"total_relatorios": len(tempos), "do_cache": sum(t.do_cache for t in tempos)}
+
+
+def _apagar_lotes_antigos() -> None:
+    limite = timezone.now() - timedelta(days=DIAS_RETENCAO_LOTES)
+    antigos = LoteRelatorio.objects.filter(solicitado_em__lt=limite).exclude(
+        processamento=StatusProcessamento.PROCESSANDO,
+    )
+    for lote in antigos:
+        if lote.arquivo:
+            lote.arquivo.delete(save=False)
+        lote.delete()
@@ -4,12 +4,20 @@ Uso:
     from cadastro.relatorio_producao import criar_relatorio
     wb = criar_relatorio(mes_ini=1, ano_ini=2026, nome_empresa='...', ...)
     wb.save('relatorio.xlsx')
+
+Cada combinação de fonte/preenchimento/alinhamento/borda é registrada uma
+única vez no workbook como NamedStyle; as células da grade recebem só o
+nome do estilo (ver _Estilos).
 """
 from datetime import date, timedelta
+from functools import lru_cache
 import calendar
+import io
+import time
 
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
 
 # ── Paleta extraída do modelo original (DR-TATIANA-ROZOV.XLS) ────────────────
@@ -27,28 +35,66 @@ MESES_PT = [
 ]
 
 # ── Helpers de estilo ────────────────────────────────────────────────────────
+# Memorizados: a mesma combinação de argumentos devolve sempre o mesmo objeto
+@lru_cache(maxsize=None)
 def _fill(hex_color):
     return PatternFill("solid", fgColor=hex_color)
 
+@lru_cache(maxsize=None)
 def _font(bold=False, size=11, color=DARK_GRAY):
     return Font(name="Arial", bold=bold, size=size, color=color)
 
+@lru_cache(maxsize=None)
 def _align(h="center", v="center", wrap=False):
     return Alignment(horizontal=h, vertical=v, wrap_text=wrap)
 
+@lru_cache(maxsize=None)
 def _border():
     s = Side(style="thin", color="AAAAAA")
     return Border(left=s, right=s, top=s, bottom=s)
 
-def _apply(cell, fnt=None, fll=None, aln=None):
-    brd = _border()
-    if fnt:
-        cell.font = fnt
-    if fll:
-        cell.fill = fll
-    if aln:
-        cell.alignment = aln
-    cell.border = brd
+
+class _Estilos:
+    """
+    Aplica fonte/preenchimento/alinhamento (sempre com borda) às células.
+
+    Com `nomeados=True` cada combinação vira um NamedStyle registrado uma
+    vez no workbook e a célula recebe só o nome; com False os quatro
+    atributos são atribuídos célula a célula (modo anterior, mantido como
+    referência para o bench_relatorio, que nele também desliga a memorização
+    dos helpers — o resultado visual é o mesmo).
+    """
+
+    def __init__(self, wb, nomeados=True):
+        self._wb = wb
+        self._nomeados = nomeados
+        self._nomes = {}
+
+    def aplicar(self, cell, fnt=None, fll=None, aln=None):
+        if not self._nomeados:
+            if fnt:
+                cell.font = fnt
+            if fll:
+                cell.fill = fll
+            if aln:
+                cell.alignment = aln
+            cell.border = _border()
+            return
+
+        # Os helpers são memorizados: a identidade dos objetos basta como chave
+        chave = (id(fnt), id(fll), id(aln))
+        nome = self._nomes.get(chave)
+        if nome is None:
+            nome = f"relatorio_{len(self._nomes) + 1}"
+            self._wb.add_named_style(NamedStyle(
+                nome, font=fnt or DEFAULT_FONT, fill=fll, border=_border(), alignment=aln,
+            ))
+            self._nomes[chave] = nome
+        # O estilo nomeado traz o formato "General": preserva o já definido
+        formato = cell.number_format
+        cell.style = nome
+        if formato != "General":
+            cell.number_format = formato
 
 
 def _gerar_periodo(mes_ini, ano_ini):
@@ -75,7 +121,8 @@ def _data_pt(d):
 
 # ── Função principal ─────────────────────────────────────────────────────────
 def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
-                    servicos, prestador_nome, crm, observacoes=""):
+                    servicos, prestador_nome, crm, observacoes="",
+                    estilos_nomeados=True):
     """
     Parâmetros
     ----------
@@ -93,6 +140,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
     prestador_nome: str
     crm          : str
     observacoes  : str  (opcional)
+    estilos_nomeados: bool – False atribui os estilos célula a célula (ver _Estilos)
 
     Retorna
     -------
@@ -111,6 +159,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
 
     wb = Workbook()
     ws = wb.active
+    est = _Estilos(wb, nomeados=estilos_nomeados)
     ws.title = f"{_nome_mes(mes_ini, ano_ini)[:3]}-{_nome_mes(mes_fim, ano_fim)[:3]}"
 
     # ── Larguras ──────────────────────────────────────────────────────────
@@ -163,27 +212,27 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
     ws.merge_cells("A8:F8")
     c = ws["A8"]
     c.value = "PERÍODO"
-    _apply(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
+    est.aplicar(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
 
     col_m1_end = get_column_letter(COL_DIA1 + idx_mes2 - 1)
     ws.merge_cells(f"{get_column_letter(COL_DIA1)}8:{col_m1_end}8")
     c = ws.cell(8, COL_DIA1)
     c.value = _nome_mes(mes_ini, ano_ini)
-    _apply(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
+    est.aplicar(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
 
     col_m2_start = get_column_letter(COL_DIA1 + idx_mes2)
     col_m2_end = get_column_letter(COL_DIA1 + n_dias - 1)
     ws.merge_cells(f"{col_m2_start}8:{col_m2_end}8")
     c = ws.cell(8, COL_DIA1 + idx_mes2)
     c.value = _nome_mes(mes_fim, ano_fim)
-    _apply(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
+    est.aplicar(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
 
     for i, sv in enumerate(servicos):
         col_q = COL_SUMBASE + i * 2
         ws.merge_cells(f"{get_column_letter(col_q)}8:{get_column_letter(col_q+1)}8")
         c = ws.cell(8, col_q)
         c.value = sv["descricao"]
-        _apply(c, _font(bold=True, size=11), _fill(TEAL), _align(wrap=True))
+        est.aplicar(c, _font(bold=True, size=11), _fill(TEAL), _align(wrap=True))
 
     # ── Sub-cabeçalhos (row 9) ────────────────────────────────────────────
     ws.merge_cells("A9:B9")
@@ -191,25 +240,25 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
                      (5, "Agenda Prevista"), (6, "Cod.")]:
         c = ws.cell(9, col)
         c.value = txt
-        _apply(c, _font(bold=True, size=11), _fill(TEAL), _align())
+        est.aplicar(c, _font(bold=True, size=11), _fill(TEAL), _align())
 
     for i, (dia, mes, ano, dow) in enumerate(dias):
         c = ws.cell(9, COL_DIA1 + i)
         c.value = dia
-        _apply(c, _font(bold=True, size=11), _fill(BLUE_LIGHT), _align())
+        est.aplicar(c, _font(bold=True, size=11), _fill(BLUE_LIGHT), _align())
 
     for i, sv in enumerate(servicos):
         col_q = COL_SUMBASE + i * 2
         for col, txt in [(col_q, "Qtd."), (col_q + 1, "Valor (R$)")]:
             c = ws.cell(9, col)
             c.value = txt
-            _apply(c, _font(bold=True, size=11), _fill(TEAL), _align())
+            est.aplicar(c, _font(bold=True, size=11), _fill(TEAL), _align())
 
     # ── Dia da semana (row 10) ────────────────────────────────────────────
     for i, (dia, mes, ano, dow) in enumerate(dias):
         c = ws.cell(10, COL_DIA1 + i)
         c.value = dow
-        _apply(c, _font(bold=True, size=11), _fill(BLUE_LIGHT), _align())
+        est.aplicar(c, _font(bold=True, size=11), _fill(BLUE_LIGHT), _align())
 
     # ── Linhas de dados (rows 11+) ────────────────────────────────────────
     for s_idx, sv in enumerate(servicos):
@@ -220,13 +269,13 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
             ws.merge_cells(f"A{row}:B{row}")
             c = ws.cell(row, 1)
             c.value = prestador_nome
-            _apply(c, _font(bold=True, size=11), _fill(GRAY_LIGHT), _align("left"))
+            est.aplicar(c, _font(bold=True, size=11), _fill(GRAY_LIGHT), _align("left"))
             c = ws.cell(row, 3)
             c.value = crm
-            _apply(c, _font(size=11), _fill(GRAY_LIGHT), _align())
+            est.aplicar(c, _font(size=11), _fill(GRAY_LIGHT), _align())
         else:
             for col in (1, 2, 3):
-                _apply(ws.cell(row, col), fll=_fill(GRAY_LIGHT))
+                est.aplicar(ws.cell(row, col), fll=_fill(GRAY_LIGHT))
 
         for col, val, alg in [
             (4, sv["descricao"], "center"),
@@ -235,7 +284,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
         ]:
             c = ws.cell(row, col)
             c.value = val
-            _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align(alg))
+            est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align(alg))
 
         prod = sv.get("producao", {})
         for i, (dia, mes, ano, dow) in enumerate(dias):
@@ -244,10 +293,10 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
             c = ws.cell(row, col)
             if qtd is not None:
                 c.value = qtd
-                _apply(c, _font(bold=True, size=12), _fill(BLUE_LIGHT), _align())
+                est.aplicar(c, _font(bold=True, size=12), _fill(BLUE_LIGHT), _align())
                 c.number_format = "#,##0"
             else:
-                _apply(c, fll=_fill(GRAY_LIGHT), aln=_align())
+                est.aplicar(c, fll=_fill(GRAY_LIGHT), aln=_align())
 
         col_q = COL_SUMBASE + s_idx * 2
         col_v = col_q + 1
@@ -255,12 +304,12 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
         c = ws.cell(row, col_q)
         c.value = f"=SUM({rng})"
         c.number_format = "#,##0"
-        _apply(c, _font(bold=True, size=11), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(bold=True, size=11), _fill(GRAY_LIGHT), _align())
 
         c = ws.cell(row, col_v)
         c.value = f"={get_column_letter(col_q)}{row}*{sv.get('valor_unit', 0)}"
         c.number_format = "R$ #,##0.00"
-        _apply(c, _font(bold=True, size=11), _fill(GRAY_LIGHT), _align("left"))
+        est.aplicar(c, _font(bold=True, size=11), _fill(GRAY_LIGHT), _align("left"))
 
     # ── Linha de total (row 11+n_srv) ─────────────────────────────────────
     row_total = 11 + n_srv
@@ -270,7 +319,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
     )
     c = ws.cell(row_total, 1)
     c.value = "TOTAL"
-    _apply(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align("right"))
+    est.aplicar(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align("right"))
 
     for i in range(n_srv):
         col_q = COL_SUMBASE + i * 2
@@ -278,11 +327,11 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
         c = ws.cell(row_total, col_q)
         c.value = f"=SUM({get_column_letter(col_q)}11:{get_column_letter(col_q)}{row_total - 1})"
         c.number_format = "#,##0"
-        _apply(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
+        est.aplicar(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
         c = ws.cell(row_total, col_v)
         c.value = f"=SUM({get_column_letter(col_v)}11:{get_column_letter(col_v)}{row_total - 1})"
         c.number_format = "R$ #,##0.00"
-        _apply(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
+        est.aplicar(c, _font(bold=True, size=12, color=WHITE), _fill(TEAL), _align())
 
     # ── Legenda ───────────────────────────────────────────────────────────
     row_leg = row_total + 2
@@ -339,7 +388,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
     ]:
         c = ws.cell(row_res_hdr, col)
         c.value = txt
-        _apply(c, _font(bold=True, size=10), _fill(TEAL), _align(wrap=True))
+        est.aplicar(c, _font(bold=True, size=10), _fill(TEAL), _align(wrap=True))
 
     for i, sv in enumerate(servicos):
         r = row_res_hdr + 1 + i
@@ -349,19 +398,19 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
         )
         c = ws.cell(r, col_res)
         c.value = sv["descricao"]
-        _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align())
 
         est_col = col_res + 6
         c = ws.cell(r, est_col)
         c.value = sv.get("estimativa", 0)
         c.number_format = "#,##0"
-        _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align())
 
         tot_col = col_res + 11
         c = ws.cell(r, tot_col)
         c.value = f"={get_column_letter(COL_SUMBASE + i * 2)}{row_total}"
         c.number_format = "#,##0"
-        _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align())
 
         pct_col = col_res + 13
         c = ws.cell(r, pct_col)
@@ -370,19 +419,19 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
             f"{get_column_letter(tot_col)}{r}/{get_column_letter(est_col)}{r})"
         )
         c.number_format = "0.00%"
-        _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align())
 
         vunit_col = col_res + 14
         c = ws.cell(r, vunit_col)
         c.value = sv.get("valor_unit", 0)
         c.number_format = "R$ #,##0.00"
-        _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align())
 
         vtot_col = col_res + 15
         c = ws.cell(r, vtot_col)
         c.value = f"={get_column_letter(COL_SUMBASE + i * 2 + 1)}{row_total}"
         c.number_format = "R$ #,##0.00"
-        _apply(c, _font(size=10), _fill(GRAY_LIGHT), _align())
+        est.aplicar(c, _font(size=10), _fill(GRAY_LIGHT), _align())
 
     r_total_res = row_res_hdr + 1 + n_srv
     ws.row_dimensions[r_total_res].height = 16
@@ -392,7 +441,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
     )
     c = ws.cell(r_total_res, col_res)
     c.value = "TOTAL GERAL"
-    _apply(c, _font(bold=True, size=11, color=WHITE), _fill(TEAL), _align())
+    est.aplicar(c, _font(bold=True, size=11, color=WHITE), _fill(TEAL), _align())
 
     vtot_col = col_res + 15
     c = ws.cell(r_total_res, vtot_col)
@@ -401,7 +450,7 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
         f"{get_column_letter(vtot_col)}{r_total_res - 1})"
     )
     c.number_format = "R$ #,##0.00"
-    _apply(c, _font(bold=True, size=11, color=WHITE), _fill(TEAL), _align())
+    est.aplicar(c, _font(bold=True, size=11, color=WHITE), _fill(TEAL), _align())
 
     # ── Assinatura ────────────────────────────────────────────────────────
     row_sig = r_total_res + 3
@@ -423,3 +472,16 @@ def criar_relatorio(mes_ini, ano_ini, nome_empresa, especialidade,
     ws.sheet_properties.pageSetUpPr.fitToPage = True
 
     return wb
+
+
+def relatorio_em_bytes(parametros: dict):
+    """Monta e serializa um relatório; devolve (conteúdo XLSX, segundos).
+
+    Não depende do Django: é o ponto de entrada dos processos de trabalho da
+    geração em lote (ver cadastro.relatorio_lote), que recebem só os
+    argumentos de criar_relatorio.
+    """
+    inicio = time.perf_counter()
+    buf = io.BytesIO()
+    criar_relatorio(**parametros).save(buf)
+    return buf.getvalue(), time.perf_counter() - inicio
@@ -0,0 +1,98 @@
+"""
+Sinais do app cadastro (conectados em CadastroConfig.ready).
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache_indicadores import incrementar_versao
+from .fatos import despublicar_upload
+from .models import (
+    Especialidade, Medico, AliasMedico, AgendaMapeamento, Prestador,
+    ServicoContratado, UploadProducao,
+)
+from .vinculo_medicos import chaves_afetadas, resolver_chaves
+
+
+# ─── Vínculo produção ↔ médico ────────────────────────────────────────────────
+
+@receiver(post_save, sender=Medico)
+def revincular_producao_ao_salvar(sender, instance, raw=False, **kwargs):
+    """Criação, renomeação ou inativação: re-resolve as chaves envolvidas."""
+    if raw:
+        return
+    resolver_chaves(chaves_afetadas(instance))
+
+
+@receiver(post_delete, sender=Medico)
+def revincular_producao_ao_excluir(sender, instance, **kwargs):
+    """As linhas ficaram sem médico (SET_NULL); outro homônimo pode assumi-las."""
+    resolver_chaves({instance.nome_chave})
+
+
+@receiver(post_save, sender=AliasMedico)
+@receiver(post_delete, sender=AliasMedico)
+def revincular_producao_do_alias(sender, instance, raw=False, **kwargs):
+    """Alias aceito ou removido: a grafia passa a apontar (ou não) para o médico."""
+    if raw:
+        return
+    resolver_chaves({instance.nome_chave})
+
+
+# ─── Upload vigente do mês (fatos.py) ─────────────────────────────────────────
+
+@receiver(post_delete, sender=UploadProducao)
+def republicar_mes_ao_excluir_upload(sender, instance, **kwargs):
+    """O upload anterior do mês assume o ponteiro e os fatos, se for o caso."""
+    with transaction.atomic():
+        despublicar_upload(instance)
+
+
+# ─── Versão dos dados dos dashboards (cache_indicadores) ──────────────────────
+
+@receiver(pre_save, sender=UploadProducao)
+def guardar_status_anterior(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._status_anterior = None
+        return
+    instance._status_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=UploadProducao)
+def versao_ao_mudar_status(sender, instance, raw=False, **kwargs):
+    """
+    Confirmação/erro de um upload. Roda dentro da transação da importação,
+    então a nova versão só fica visível junto com os novos fatos.
+    """
+    if raw:
+        return
+    if instance.status != getattr(instance, "_status_anterior", None):
+        incrementar_versao()
+
+
+@receiver(post_delete, sender=UploadProducao)
+@receiver(post_save, sender=Prestador)
+@receiver(post_delete, sender=Prestador)
+@receiver(post_save, sender=Especialidade)
+@receiver(post_delete, sender=Especialidade)
+@receiver(post_save, sender=AgendaMapeamento)
+@receiver(post_delete, sender=AgendaMapeamento)
+@receiver(post_save, sender=ServicoContratado)
+@receiver(post_delete, sender=ServicoContratado)
+@receiver(post_save, sender=Medico)
+@receiver(post_delete, sender=Medico)
+@receiver(post_save, sender=AliasMedico)
+@receiver(post_delete, sender=AliasMedico)
+def versao_ao_editar_cadastro(sender, raw=False, **kwargs):
+    if not raw:
+        incrementar_versao()
+
+
+@receiver(m2m_changed, sender=Medico.especialidades.through)
+@receiver(m2m_changed, sender=Prestador.especialidades.through)
+def versao_ao_mudar_especialidades(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        incrementar_versao()
@@ -0,0 +1,315 @@
+"""
+Leitor incremental das exportações SIRESP em "HTML disfarçado de XLS".
+
+O SIRESP entrega arquivos .xls que são documentos HTML (ISO-8859-1) com
+algumas tabelas pequenas de metadados (unidade, período…) seguidas da
+tabela principal de produção. Este módulo lê esse HTML em blocos, sem
+carregar o documento inteiro nem montar DataFrames:
+
+  - o arquivo é decodificado de forma incremental (codecs) e varrido por
+    uma única expressão regular de tags — só as tags de tabela importam,
+    o que é bem mais rápido que um parser HTML completo;
+  - cada <tr> fechado vira uma lista de textos, com colspan/rowspan
+    expandidos como no pandas.read_html();
+  - a tabela principal é reconhecida pela assinatura do cabeçalho
+    ("Vagas…"); se nenhuma tabela tiver a assinatura, usa-se a maior;
+  - números no formato brasileiro são normalizados ("1.234" → "1234",
+    "95,51" → "95.51"), equivalente a thousands="." / decimal=",".
+
+As regras de cabeçalho seguem o pandas.read_html(header=None): linhas do
+<thead> e linhas iniciais só com <th> não contam como linhas da tabela.
+"""
+
+import codecs
+import re
+from html import unescape
+
+# Tamanho do bloco lido do arquivo a cada iteração
+TAMANHO_BLOCO = 64 * 1024
+
+# Mesmo padrão usado pelo pandas para reconhecer números com separador de
+# milhar "." e decimal ","
+_NUMERO_BR = re.compile(r"^[\-\+]?[0-9]*(\.[0-9]{3})*(,[0-9]*)?([0-9]?(E|e)\-?[0-9]+)?$")
+
+# Quebras de linha e sequências de espaços dentro da célula viram um espaço
+_ESPACOS = re.compile(r"[\r\n]+|\s{2,}")
+
+# Comentários, <script>/<style> (conteúdo ignorado) e demais tags
+_TAG = re.compile(
+    r"<(?:!--.*?-->"
+    r"|(script|style)\b[^>]*>.*?</\1\s*>"
+    r"|(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>)",
+    re.DOTALL | re.IGNORECASE,
+)
+_SPAN = re.compile(r"\b(rowspan|colspan)\s*=\s*[\"']?\s*(\d+)", re.IGNORECASE)
+
+
+def normalizar_numero(texto: str) -> str:
+    """'1.234' → '1234' e '95,51' → '95.51'; demais textos ficam inalterados."""
+    if texto and _NUMERO_BR.match(texto):
+        return texto.replace(".", "").replace(",", ".")
+    return texto
+
+
+def _spans(attrs: str):
+    """(rowspan, colspan) a partir do texto de atributos da tag."""
+    if "span" not in attrs.lower():
+        return 1, 1
+    spans = {"rowspan": 1, "colspan": 1}
+    for nome, valor in _SPAN.findall(attrs):
+        spans[nome.lower()] = max(int(valor), 1)
+    return spans["rowspan"], spans["colspan"]
+
+
+class _TokenizadorTabelas:
+    """
+    Converte o HTML em linhas de tabela à medida que o texto é recebido.
+
+    Cada <tr> concluído é acrescentado a `self.linhas` como a tupla
+    (indice_tabela, eh_cabecalho, textos). Tags de fechamento omitidas
+    (</td>, </tr>) são tratadas como no navegador.
+    """
+
+    def __init__(self):
+        self._resto = ""      # tag incompleta no fim do último bloco
+        self.linhas = []
+        self._n_tabelas = 0
+        self._tabelas = []    # pilha de tabelas abertas (tabelas aninhadas)
+        self._linha = None    # células da linha atual: (texto, rowspan, colspan)
+        self._linha_so_th = True
+        self._celula = None   # partes de texto da célula atual
+        self._celula_th = False
+        self._spans = (1, 1)
+
+    # ── Estado ───────────────────────────────────────────────────────────────
+    def _fechar_celula(self):
+        if self._celula is None:
+            return
+        texto = "".join(self._celula)
+        if "&" in texto:
+            texto = unescape(texto)
+        texto = _ESPACOS.sub(" ", texto.strip())
+        rowspan, colspan = self._spans
+        if self._linha is not None:
+            self._linha.append((texto, rowspan, colspan))
+            self._linha_so_th = self._linha_so_th and self._celula_th
+        self._celula = None
+
+    def _fechar_linha(self):
+        self._fechar_celula()
+        if self._linha is None or not self._tabelas:
+            self._linha = None
+            return
+        tabela = self._tabelas[-1]
+        textos = self._expandir(tabela, self._linha)
+        cabecalho = tabela["thead"] or (self._linha_so_th and not tabela["dados"])
+        if not cabecalho:
+            tabela["dados"] = True
+        self.linhas.append((tabela["indice"], cabecalho, textos))
+        self._linha = None
+
+    @staticmethod
+    def _expandir(tabela, celulas):
+        """Expande colspan/rowspan (mesmo algoritmo do pandas.read_html)."""
+        textos = []
+        restantes = tabela["rowspans"]
+        proximos = []
+        col = 0
+        for texto, rowspan, colspan in celulas:
+            while restantes and restantes[0][0] <= col:
+                _, texto_ant, rowspan_ant = restantes.pop(0)
+                textos.append(texto_ant)
+                if rowspan_ant > 1:
+                    proximos.append((col, texto_ant, rowspan_ant - 1))
+                col += 1
+            for _ in range(colspan):
+                textos.append(texto)
+                if rowspan > 1:
+                    proximos.append((col, texto, rowspan - 1))
+                col += 1
+        for _, texto_ant, rowspan_ant in restantes:
+            textos.append(texto_ant)
+            if rowspan_ant > 1:
+                proximos.append((col, texto_ant, rowspan_ant - 1))
+            col += 1
+        tabela["rowspans"] = proximos
+        return textos
+
+    # ── Varredura ────────────────────────────────────────────────────────────
+    def feed(self, texto: str) -> None:
+        texto = self._resto + texto
+        pos = 0
+        for m in _TAG.finditer(texto):
+            inicio = m.start()
+            if inicio > pos and self._celula is not None:
+                self._celula.append(texto[pos:inicio])
+            pos = m.end()
+            tag = m.group(3)
+            if tag is None:
+                continue  # comentário, script ou style
+            tag = tag.lower()
+            if m.group(2):
+                self.handle_endtag(tag)
+            else:
+                self.handle_starttag(tag, m.group(4))
+        # Um "<" sem ">" no fim do bloco é tag incompleta: aguarda o próximo
+        inicio_tag = texto.find("<", pos)
+        if inicio_tag == -1:
+            inicio_tag = len(texto)
+        if inicio_tag > pos:
+            self.handle_data(texto[pos:inicio_tag])
+        self._resto = texto[inicio_tag:]
+
+    def close(self) -> None:
+        if self._resto:
+            self.handle_data(self._resto)
+            self._resto = ""
+        while self._tabelas:
+            self.handle_endtag("table")
+
+    # ── Eventos ──────────────────────────────────────────────────────────────
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            # Tabela aninhada: guarda a linha/célula em aberto da tabela externa
+            externo = (self._linha, self._linha_so_th, self._celula, self._celula_th, self._spans)
+            self._linha = self._celula = None
+            self._tabelas.append({
+                "indice": self._n_tabelas, "thead": False, "dados": False, "rowspans": [],
+                "externo": externo,
+            })
+            self._n_tabelas += 1
+        elif not self._tabelas:
+            return
+        elif tag == "thead":
+            self._tabelas[-1]["thead"] = True
+        elif tag in ("tbody", "tfoot"):
+            self._tabelas[-1]["thead"] = False
+        elif tag == "tr":
+            self._fechar_linha()
+            self._linha = []
+            self._linha_so_th = True
+        elif tag in ("td", "th"):
+            if self._celula is not None:
+                self._fechar_celula()
+            if self._linha is None:
+                self._linha = []
+                self._linha_so_th = True
+            self._celula = []
+            self._celula_th = tag == "th"
+            self._spans = _spans(attrs)
+
+    def handle_endtag(self, tag):
+        if not self._tabelas:
+            return
+        if tag in ("td", "th"):
+            if self._celula is not None:
+                self._fechar_celula()
+        elif tag == "tr":
+            self._fechar_linha()
+        elif tag == "thead":
+            self._fechar_linha()
+            self._tabelas[-1]["thead"] = False
+        elif tag == "table":
+            self._fechar_linha()
+            (self._linha, self._linha_so_th, self._celula,
+             self._celula_th, self._spans) = self._tabelas.pop()["externo"]
+
+    def handle_data(self, data):
+        if self._celula is not None:
+            self._celula.append(data)
+
+
+def iter_linhas_tabelas(f, encoding="iso-8859-1"):
+    """
+    Lê o arquivo binário `f` do início, em blocos, e gera
+    (indice_tabela, eh_cabecalho, textos) para cada linha de tabela.
+    """
+    f.seek(0)
+    decodificador = codecs.getincrementaldecoder(encoding)(errors="replace")
+    tokenizador = _TokenizadorTabelas()
+    while True:
+        bloco = f.read(TAMANHO_BLOCO)
+        tokenizador.feed(decodificador.decode(bloco, final=not bloco))
+        if not bloco:
+            tokenizador.close()
+        linhas, tokenizador.linhas = tokenizador.linhas, []
+        yield from linhas
+        if not bloco:
+            return
+
+
+class LeitorTabelaSiresp:
+    """
+    Localiza a tabela principal de uma exportação SIRESP em HTML e itera
+    suas linhas de dados como dicionários com as chaves de `colunas`.
+
+    `n_cabecalhos` é a quantidade de linhas de cabeçalho hierárquico da
+    tabela principal (4 em Consultas, 3 em Cirurgias/Exames) e
+    `assinatura` o início de texto que identifica esse cabeçalho.
+    """
+
+    def __init__(self, f, colunas, n_cabecalhos, assinatura="vagas"):
+        self._f = f
+        self._colunas = colunas
+        self._n_cabecalhos = n_cabecalhos
+        self._assinatura = assinatura.lower()
+
+    def texto_periodo(self) -> str:
+        """Primeira célula com "Período:" (normalmente numa tabela de metadados)."""
+        for _, _, textos in iter_linhas_tabelas(self._f):
+            for texto in textos:
+                if "Período:" in texto:
+                    return texto
+        return ""
+
+    def _tem_assinatura(self, textos) -> bool:
+        return any(t.lower().startswith(self._assinatura) for t in textos)
+
+    def _linhas_principal(self):
+        """
+        Gera as linhas de dados (já sem os cabeçalhos) da tabela principal.
+
+        Cada tabela guarda só as primeiras linhas até se decidir se é a
+        principal; a partir daí as linhas seguem direto para o consumidor.
+        """
+        principal = None
+        inicio = {}   # indice_tabela → [n_linhas, assinatura_encontrada]
+        for indice, cabecalho, textos in iter_linhas_tabelas(self._f):
+            if principal is not None:
+                if indice == principal and not cabecalho:
+                    yield textos
+                continue
+            estado = inicio.setdefault(indice, [0, False])
+            if self._tem_assinatura(textos):
+                estado[1] = True
+            if cabecalho:
+                continue
+            estado[0] += 1
+            if estado[0] == self._n_cabecalhos and estado[1]:
+                principal = indice
+
+        if principal is not None:
+            return
+
+        # Nenhuma tabela com a assinatura: usa a de maior número de linhas
+        contagem = {}
+        for indice, cabecalho, _ in iter_linhas_tabelas(self._f):
+            if not cabecalho:
+                contagem[indice] = contagem.get(indice, 0) + 1
+        if not contagem:
+            raise ValueError("Nenhuma tabela HTML encontrada no arquivo.")
+        maior = max(contagem, key=contagem.get)
+        n = 0
+        for indice, cabecalho, textos in iter_linhas_tabelas(self._f):
+            if indice == maior and not cabecalho:
+                n += 1
+                if n > self._n_cabecalhos:
+                    yield textos
+
+    def iter_linhas(self):
+        colunas = self._colunas
+        for textos in self._linhas_principal():
+            yield {
+                colunas[i]: normalizar_numero(texto)
+                for i, texto in enumerate(textos[:len(colunas)])
+            }
@@ -0,0 +1,1277 @@
+import hashlib
+import io
+import json
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+import openpyxl
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import cache_contratos, cache_relatorios
+from .cache_indicadores import dados_em_cache, incrementar_versao, versao_dados
+from .documento_pdf import HAS_PDFPLUMBER, HAS_PYMUPDF, DocumentoPDF
+from .extrator import extrair_contrato, extrair_do_texto
+from .fatos import publicar_upload, reconstruir_fatos
+from .fila import FILAS, enfileirar
+from .mapeamentos import IndiceMapeamentos
+from .models import (
+    Prestador, Especialidade, ServicoContratado, AgendaMapeamento, Medico, AliasMedico,
+    ContratoUpload, EtapaExtracao,
+    UploadProducao, UploadVigente, ProducaoAgenda, ProducaoMedico, ProducaoFato,
+    LoteRelatorio, StatusProcessamento, StatusUpload, TipoRelatorioProducao,
+    COLUNAS_SIRESP, COLUNAS_SIRESP_EXAMES,
+)
+from .normalizacao import normalizar_nome
+from .producao_siresp import processar_upload
+from .reconciliacao import (
+    ACEITO, AMBIGUO, SEM_CANDIDATO, gravar_aceitos, indice_medicos_ativos, nomes_nao_resolvidos,
+    reconciliar,
+)
+from .relatorio_lote import com_dados_relatorio, gerar_lote, nome_arquivo, parametros_relatorio
+from .views_home import (
+    acompanhamento_status, indicadores_comparativo, indicadores_prestador, relatorio_download,
+)
+from .vinculo_medicos import mapa_medicos
+
+
+def criar_upload_confirmado(inicio, fim, agendas, **campos):
+    """
+    Upload confirmado e publicado (UploadVigente + ProducaoFato), como no fim
+    da importação. `agendas`: { nome_agenda: (agend_totais, {nome_medico: agend_totais}) }.
+    """
+    with transaction.atomic():
+        upload = UploadProducao.objects.create(
+            nome_arquivo="producao.xlsx", status=StatusUpload.CONFIRMADO,
+            data_inicio_periodo=inicio, data_fim_periodo=fim, **campos,
+        )
+        medicos = mapa_medicos()
+        for nome_agenda, (total, por_medico) in agendas.items():
+            agenda = ProducaoAgenda.objects.create(
+                upload=upload, nome_agenda=nome_agenda, agend_totais=total,
+            )
+            for nome_medico, qtd in por_medico.items():
+                ProducaoMedico.objects.create(
+                    agenda=agenda, nome_medico=nome_medico, agend_totais=qtd,
+                    medico_id=medicos.get(normalizar_nome(nome_medico)),
+                )
+        publicar_upload(upload)
+    return upload
+
+
+def planilha_siresp(linhas, periodo="Período:01-04-2026a30-04-2026") -> bytes:
+    """
+    XLSX no layout do SIRESP: período em B2, dados a partir da linha 10 e
+    rodapé "Total Geral". `linhas`: [(nome, agend_totais), …] — agendas em
+    Title Case, profissionais em maiúsculas.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([])
+    ws.append(["", periodo])
+    for _ in range(7):
+        ws.append([])
+    for nome, total in linhas:
+        ws.append([nome, total + 5, total, 90.5] + [1] * 25)
+    ws.append(["Total Geral"])
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue()
+
+
+class IndicadoresPrestadorConsultasTest(TestCase):
+    """O dashboard por prestador faz o mesmo nº de consultas para qualquer nº de serviços."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        cls.prestador = Prestador.objects.create(nome_empresa="Clínica Teste", cnpj="11222333000181")
+        cls.medico = Medico.objects.create(
+            nome_completo="João da Silva", prestador=cls.prestador, cpf="11111111111",
+        )
+        cls.upload = UploadProducao.objects.create(
+            nome_arquivo="producao.xlsx", status=StatusUpload.CONFIRMADO,
+            data_inicio_periodo=date(2026, 1, 1), data_fim_periodo=date(2026, 1, 31),
+        )
+        UploadVigente.objects.create(mes=date(2026, 1, 1), tipo=cls.upload.tipo, upload=cls.upload)
+
+    def setUp(self):
+        cache.clear()
+
+    def _criar_servicos(self, quantidade, inicio=0):
+        for i in range(inicio, inicio + quantidade):
+            servico = ServicoContratado.objects.create(
+                prestador=self.prestador, especialidade=self.especialidade,
+                descricao=f"Serviço {i}", quantidade_estimada_mes=10,
+            )
+            for nome in (f"Agenda {i}", f"Agenda {i} - Retorno"):
+                AgendaMapeamento.objects.create(servico=servico, nome_agenda=nome)
+                ProducaoFato.objects.create(
+                    mes=date(2026, 1, 1), tipo=self.upload.tipo, upload=self.upload,
+                    agenda_chave=normalizar_nome(nome), profissional_chave="JOAO DA SILVA",
+                    medico=self.medico, agend_totais=5,
+                )
+
+    def _renderizar(self):
+        request = RequestFactory().get("/", {"prestador": self.prestador.pk})
+        return indicadores_prestador(request)
+
+    def test_numero_fixo_de_consultas(self):
+        self._criar_servicos(2)
+        with self.assertNumQueries(11):
+            self._renderizar()
+
+        cache.clear()
+        self._criar_servicos(20, inicio=2)
+        with self.assertNumQueries(11):
+            resposta = self._renderizar()
+        self.assertContains(resposta, "Agenda 21 - Retorno")
+
+
+class ProducaoRelatorioTest(TestCase):
+    """O relatório XLSX vem preenchido com a produção do upload vigente do mês."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        cls.com_medicos = Prestador.objects.create(nome_empresa="Clínica A", cnpj="11222333000181")
+        cls.sem_medicos = Prestador.objects.create(nome_empresa="Clínica B", cnpj="11444777000161")
+        Medico.objects.create(nome_completo="Ana Souza", prestador=cls.com_medicos, cpf="11111111111")
+        for prestador in (cls.com_medicos, cls.sem_medicos):
+            servico = ServicoContratado.objects.create(
+                prestador=prestador, especialidade=cls.especialidade, descricao="Consultas",
+            )
+            AgendaMapeamento.objects.create(servico=servico, nome_agenda="Cardiologia Adulto")
+
+        # Upload mensal comum, 01/04 a 30/04 — não cabe na janela 21 a 20
+        criar_upload_confirmado(
+            date(2026, 4, 1), date(2026, 4, 30),
+            {"Cardiologia Adulto": (40, {"ANA SOUZA": 25, "OUTRO MEDICO": 15})},
+        )
+
+    def _producao(self, prestador, mes_ini, ano_ini=2026):
+        prestador = com_dados_relatorio(Prestador.objects.filter(pk=prestador.pk)).get()
+        indice = IndiceMapeamentos.dos_prestadores([prestador.pk])
+        return parametros_relatorio(prestador, mes_ini, ano_ini, indice)["servicos"][0]["producao"]
+
+    def test_mes_lancado_no_ultimo_dia_do_relatorio_que_comeca_nele(self):
+        self.assertEqual(self._producao(self.com_medicos, 4), {(30, 4): 25})
+        self.assertEqual(self._producao(self.sem_medicos, 4), {(30, 4): 40})
+
+    def test_parametros_com_agendas_mapeadas(self):
+        servico = ServicoContratado.objects.create(
+            prestador=self.sem_medicos, especialidade=self.especialidade, descricao="Retornos",
+            quantidade_estimada_mes=30, valor_unitario=55,
+        )
+        for nome in ("Retorno Tarde", "Retorno Manhã"):
+            AgendaMapeamento.objects.create(servico=servico, nome_agenda=nome)
+        ServicoContratado.objects.create(
+            prestador=self.sem_medicos, especialidade=self.especialidade, descricao="Sem agenda",
+        )
+        prestador = com_dados_relatorio(Prestador.objects.filter(pk=self.sem_medicos.pk)).get()
+        indice = IndiceMapeamentos.dos_prestadores([prestador.pk])
+
+        parametros = parametros_relatorio(prestador, 4, 2026, indice)
+
+        self.assertEqual(
+            {s["descricao"]: s["agenda"] for s in parametros["servicos"]},
+            {
+                "Consultas": "Cardiologia Adulto",
+                "Retornos": "Retorno Manhã, Retorno Tarde",
+                "Sem agenda": "",
+            },
+        )
+        retornos = next(s for s in parametros["servicos"] if s["descricao"] == "Retornos")
+        self.assertEqual(
+            (retornos["cod"], retornos["estimativa"], retornos["valor_unit"], retornos["producao"]),
+            (servico.pk, 30, 55.0, {}),
+        )
+        self.assertEqual((parametros["nome_empresa"], parametros["mes_ini"]), ("Clínica B", 4))
+
+    def test_mes_nao_repete_no_relatorio_anterior(self):
+        self.assertEqual(self._producao(self.com_medicos, 3), {})
+
+    def test_vale_o_upload_vigente_do_mes(self):
+        criar_upload_confirmado(
+            date(2026, 4, 1), date(2026, 4, 30),
+            {"Cardiologia Adulto": (50, {"ANA SOUZA": 30})},
+        )
+        self.assertEqual(self._producao(self.com_medicos, 4), {(30, 4): 30})
+        self.assertEqual(self._producao(self.sem_medicos, 4), {(30, 4): 50})
+
+
+class CacheComparativoTest(TestCase):
+    """Editar prestador ou especialidade invalida o comparativo em cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        cls.prestador = Prestador.objects.create(nome_empresa="Clínica Antiga", cnpj="11222333000181")
+        ServicoContratado.objects.create(
+            prestador=cls.prestador, especialidade=cls.especialidade,
+            descricao="Cardiologia Adulto", quantidade_estimada_mes=10,
+        )
+        criar_upload_confirmado(
+            date(2026, 4, 1), date(2026, 4, 30), {"Cardiologia Adulto": (8, {})},
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _renderizar(self):
+        return indicadores_comparativo(RequestFactory().get("/"))
+
+    def test_renomear_e_inativar_prestador(self):
+        self.assertContains(self._renderizar(), "Clínica Antiga")
+
+        self.prestador.nome_empresa = "Clínica Nova"
+        self.prestador.save()
+        resposta = self._renderizar()
+        self.assertContains(resposta, "Clínica Nova")
+        self.assertNotContains(resposta, "Clínica Antiga")
+
+        self.prestador.ativo = False
+        self.prestador.save()
+        self.assertNotContains(self._renderizar(), "Clínica Nova")
+
+    def test_editar_especialidade(self):
+        versao = versao_dados()
+        self.especialidade.nome = "Cardiologia Clínica"
+        self.especialidade.save()
+        self.assertGreater(versao_dados(), versao)
+
+        versao = versao_dados()
+        self.prestador.especialidades.add(self.especialidade)
+        self.assertGreater(versao_dados(), versao)
+
+
+class GravarAceitosTest(TestCase):
+    """Aliases aceitos pela reconciliação vinculam a produção e invalidam os dashboards."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prestador = Prestador.objects.create(nome_empresa="Clínica A", cnpj="11222333000181")
+        cls.medico = Medico.objects.create(
+            nome_completo="Maria Aparecida Souza Oliveira", prestador=cls.prestador, cpf="11111111111",
+        )
+        criar_upload_confirmado(
+            date(2026, 4, 1), date(2026, 4, 30),
+            {"Cardiologia": (10, {"MARIA APARECIDA S OLIVEIRA": 6, "M A SOUZA OLIVEIRA": 4})},
+        )
+        AliasMedico.objects.create(nome_chave="M A SOUZA OLIVEIRA", medico=cls.medico)
+
+    def test_vincula_fatos_conta_so_os_novos_e_incrementa_versao(self):
+        versao = versao_dados()
+        criados = gravar_aceitos({
+            "MARIA APARECIDA S OLIVEIRA": (ACEITO, [(self.medico.pk, 0.93)]),
+            "M A SOUZA OLIVEIRA": (ACEITO, [(self.medico.pk, 0.90)]),
+        })
+        self.assertEqual(criados, 1)
+        self.assertGreater(versao_dados(), versao)
+        self.assertEqual(
+            ProducaoFato.objects.get(profissional_chave="MARIA APARECIDA S OLIVEIRA").medico, self.medico,
+        )
+
+    def test_nada_a_gravar(self):
+        versao = versao_dados()
+        self.assertEqual(gravar_aceitos({"M A SOUZA OLIVEIRA": (ACEITO, [(self.medico.pk, 0.9)])}), 0)
+        self.assertEqual(versao_dados(), versao)
+
+    def test_aceite_manual_com_pontuacao_invalida(self):
+        usuario = get_user_model().objects.create_user(
+            "revisor", "revisor@example.com", "senha", primeiro_acesso=False,
+        )
+        self.client.force_login(usuario)
+        resposta = self.client.post(reverse("cadastro:reconciliacao_medicos"), {
+            "action": "aceitar", "nome_chave": "MARIA APARECIDA S OLIVEIRA",
+            "medico_pk": self.medico.pk, "pontuacao": "abc",
+        })
+        self.assertEqual(resposta.status_code, 302)
+        alias = AliasMedico.objects.get(nome_chave="MARIA APARECIDA S OLIVEIRA")
+        self.assertEqual((alias.medico, alias.pontuacao), (self.medico, 0.0))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ProgressoImportacaoTest(TestCase):
+    """A importação informa o progresso a cada lote gravado, não só no início e no fim."""
+
+    def test_progresso_por_lote(self):
+        linhas = []
+        for a in range(20):
+            linhas.append((f"Agenda {a}", 100))
+            linhas += [(f"MEDICO {a} {m}", 1) for m in range(100)]
+        upload = UploadProducao.objects.create(
+            arquivo=SimpleUploadedFile("producao.xlsx", planilha_siresp(linhas)),
+        )
+        progresso = []
+        resultado = processar_upload(upload.pk, ao_progredir=progresso.append)
+
+        self.assertEqual((resultado["total_agendas"], resultado["total_medicos"]), (20, 2000))
+        self.assertEqual(progresso[0], 10)
+        self.assertEqual(progresso, sorted(set(progresso)))
+        self.assertGreater(len([p for p in progresso if 10 < p <= 90]), 2)
+
+    def test_progresso_dentro_da_transacao_vai_para_o_cache(self):
+        cache.clear()
+        upload = UploadProducao.objects.create(nome_arquivo="producao.xlsx", status=StatusUpload.PROCESSANDO)
+        # O TestCase roda dentro de uma transação, como a importação
+        FILAS["producao"].atualizar_progresso(upload.pk, 42)
+        self.assertEqual(UploadProducao.objects.get(pk=upload.pk).progresso, 0)
+
+        resposta = acompanhamento_status(RequestFactory().get("/", {"ids": str(upload.pk)}))
+        self.assertEqual(json.loads(resposta.content)["uploads"][0]["progresso"], 42)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FilaProcessamentoTest(TestCase):
+    """Reivindicação, liberação de travados e caminho de erro da fila em banco."""
+
+    def setUp(self):
+        self.fila = FILAS["producao"]
+
+    def _upload(self, conteudo=b"lixo", **campos):
+        return UploadProducao.objects.create(
+            arquivo=SimpleUploadedFile("producao.xlsx", conteudo), **campos,
+        )
+
+    def test_reivindicacao_unica(self):
+        upload = self._upload()
+        self.assertEqual(self.fila.reivindicar("w1"), upload.pk)
+        self.assertIsNone(self.fila.reivindicar("w2"))
+        self.assertIsNone(self.fila.reivindicar("w2", pk=upload.pk))
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.worker), (StatusUpload.PROCESSANDO, "w1"))
+
+    def test_liberar_travados(self):
+        travado = self._upload()
+        recente = self._upload()
+        self.fila.reivindicar("w1", pk=travado.pk)
+        self.fila.reivindicar("w1", pk=recente.pk)
+        UploadProducao.objects.filter(pk=travado.pk).update(
+            processando_desde=timezone.now() - timedelta(hours=2),
+        )
+
+        self.assertEqual(self.fila.liberar_travados(timedelta(hours=1)), 1)
+        travado.refresh_from_db()
+        recente.refresh_from_db()
+        self.assertEqual((travado.status, travado.worker), (StatusUpload.PENDENTE, ""))
+        self.assertEqual(recente.status, StatusUpload.PROCESSANDO)
+        self.assertEqual(self.fila.reivindicar("w2"), travado.pk)
+
+    def test_erro_gravado_na_linha(self):
+        upload = self._upload()
+        self.fila.reivindicar("w1", pk=upload.pk)
+        with self.assertRaises(Exception):
+            self.fila.processar(upload.pk)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, StatusUpload.ERRO)
+        self.assertTrue(upload.erro_processamento)
+
+    @override_settings(FILA_SINCRONA=True)
+    def test_modo_sincrono(self):
+        upload = self._upload(planilha_siresp([("Cardiologia", 10), ("ANA SOUZA", 10)]))
+        enfileirar("producao", upload.pk)
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.total_medicos), (StatusUpload.CONFIRMADO, 1))
+
+        com_erro = self._upload()
+        with self.assertLogs("cadastro.fila", "ERROR") as logs:
+            enfileirar("producao", com_erro.pk)
+        self.assertIn("Traceback", logs.output[0])
+        com_erro.refresh_from_db()
+        self.assertEqual(com_erro.status, StatusUpload.ERRO)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CacheRelatoriosTest(TestCase):
+    """Relatórios XLSX em disco: chave pela versão dos dados, sem recalcular no acerto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        cls.prestador = Prestador.objects.create(nome_empresa="Clínica Cache", cnpj="11222333000181")
+        cls.servico = ServicoContratado.objects.create(
+            prestador=cls.prestador, especialidade=especialidade, descricao="Consultas",
+        )
+        AgendaMapeamento.objects.create(servico=cls.servico, nome_agenda="Cardiologia Adulto")
+
+    def _baixar(self):
+        request = RequestFactory().get("/", {"mes": 4, "ano": 2026})
+        resposta = relatorio_download(request, self.prestador.pk)
+        conteudo = b"".join(resposta.streaming_content)
+        resposta.close()
+        return conteudo
+
+    def test_acerto_nao_calcula_parametros(self):
+        gerado = self._baixar()
+        with mock.patch("cadastro.relatorio_lote.parametros_relatorio") as parametros, \
+                mock.patch.object(IndiceMapeamentos, "do_prestador") as indice:
+            with self.assertNumQueries(2):  # prestador + versão dos dados
+                self.assertEqual(self._baixar(), gerado)
+        parametros.assert_not_called()
+        indice.assert_not_called()
+
+    def test_edicao_invalida_entrada(self):
+        self._baixar()
+        self.servico.descricao = "Consultas eletivas"
+        self.servico.save()
+        with mock.patch(
+            "cadastro.relatorio_lote.parametros_relatorio", wraps=parametros_relatorio,
+        ) as parametros:
+            self._baixar()
+        parametros.assert_called_once()
+        entradas = list((cache_relatorios._diretorio() / str(self.prestador.pk)).glob("*.xlsx"))
+        self.assertEqual(len(entradas), 1, "a versão antiga deve ser apagada")
+
+    @override_settings(RELATORIOS_CACHE_MAX_MB=0)
+    def test_gerado_e_servido_mesmo_podado(self):
+        arquivo, do_cache = cache_relatorios.relatorio_em_cache(
+            self.prestador.pk, 5, 2026, lambda: b"conteudo",
+        )
+        with arquivo:
+            self.assertFalse(do_cache)
+            self.assertFalse(
+                cache_relatorios.caminho_relatorio(self.prestador.pk, 5, 2026, versao_dados()).exists()
+            )
+            self.assertEqual(arquivo.read(), b"conteudo")
+
+    def test_entrada_em_uso_nao_falha_a_gravacao(self):
+        """No Windows, substituir ou apagar um arquivo aberto levanta PermissionError."""
+        caminho = cache_relatorios.caminho_relatorio(self.prestador.pk, 6, 2026, versao_dados())
+        cache_relatorios.gravar(caminho, b"em uso")
+
+        with mock.patch("cadastro.cache_relatorios.os.replace", side_effect=PermissionError):
+            cache_relatorios.gravar(caminho, b"em uso")
+        self.assertEqual(caminho.read_bytes(), b"em uso")
+        self.assertEqual(list(caminho.parent.glob("*.tmp")), [], "o temporário não pode sobrar")
+
+        antigo = caminho.with_name(caminho.name.replace(f"_v{versao_dados()}_", "_v0_"))
+        antigo.write_bytes(b"antigo")
+        with mock.patch.object(Path, "unlink", side_effect=PermissionError), \
+                override_settings(RELATORIOS_CACHE_MAX_MB=0):
+            cache_relatorios.gravar(caminho, b"em uso")
+        self.assertTrue(antigo.exists(), "fica para a próxima gravação")
+
+        cache_relatorios.gravar(caminho, b"em uso")
+        self.assertFalse(antigo.exists())
+
+    def test_lote_usa_cache(self):
+        prestadores = Prestador.objects.filter(pk=self.prestador.pk)
+        primeiro = gerar_lote(io.BytesIO(), prestadores, 4, 2026, processos=1)
+        with mock.patch("cadastro.relatorio_lote.parametros_relatorio") as parametros:
+            saida = io.BytesIO()
+            segundo = gerar_lote(saida, prestadores, 4, 2026, processos=1)
+        parametros.assert_not_called()
+        self.assertEqual([t.do_cache for t in primeiro + segundo], [False, True])
+        with zipfile.ZipFile(saida) as zf:
+            self.assertEqual(zf.infolist()[0].file_size, segundo[0].tamanho)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class LoteRelatorioTest(TestCase):
+    """O lote pedido pela tela vai para a fila; o worker gera o ZIP sem pool de processos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        for i in range(3):
+            prestador = Prestador.objects.create(nome_empresa=f"Clínica {i}", cnpj=f"1122233300018{i}")
+            ServicoContratado.objects.create(
+                prestador=prestador, especialidade=especialidade, descricao="Consultas",
+            )
+        Prestador.objects.filter(nome_empresa="Clínica 2").update(ativo=False)
+        cls.usuario = get_user_model().objects.create_user(
+            "relatorios", "relatorios@example.com", "senha", primeiro_acesso=False,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _pedir(self):
+        return self.client.post(reverse("cadastro:relatorio_lote"), {"mes": 4, "ano": 2026})
+
+    def test_pedido_so_enfileira(self):
+        with mock.patch("cadastro.relatorio_lote.ProcessPoolExecutor") as pool, \
+                mock.patch("cadastro.relatorio_lote.gerar_lote") as gerar:
+            resposta = self._pedir()
+        pool.assert_not_called()
+        gerar.assert_not_called()
+
+        lote = LoteRelatorio.objects.get()
+        self.assertRedirects(resposta, reverse("cadastro:relatorio_lote_detalhe", args=[lote.pk]))
+        self.assertEqual(lote.processamento, StatusProcessamento.AGUARDANDO)
+        self.assertEqual(len(lote.prestadores), 2)
+
+        espera = self.client.get(reverse("cadastro:relatorio_lote_detalhe", args=[lote.pk]))
+        self.assertContains(espera, "Gerando Relatórios em Lote")
+
+    def test_worker_gera_zip(self):
+        self._pedir()
+        fila = FILAS["relatorios"]
+        pk = fila.reivindicar("w1")
+        with mock.patch("cadastro.relatorio_lote.ProcessPoolExecutor") as pool:
+            resultado = fila.processar(pk)
+        pool.assert_not_called()
+        self.assertEqual(resultado["total_relatorios"], 2)
+
+        status = self.client.get(reverse("cadastro:relatorio_lote_status", args=[pk])).json()
+        self.assertEqual((status["processamento"], status["progresso"]), ("concluido", 100))
+
+        resposta = self.client.get(reverse("cadastro:relatorio_lote_detalhe", args=[pk]))
+        with zipfile.ZipFile(io.BytesIO(b"".join(resposta.streaming_content))) as zf:
+            self.assertEqual(len(zf.namelist()), 2)
+        resposta.close()
+
+    @override_settings(FILA_SINCRONA=True)
+    def test_pedido_processado_e_baixado(self):
+        """Pedido → worker (síncrono) → download de um XLSX por prestador ativo."""
+        resposta = self._pedir()
+        lote = LoteRelatorio.objects.get()
+        detalhe = reverse("cadastro:relatorio_lote_detalhe", args=[lote.pk])
+        self.assertRedirects(resposta, detalhe, fetch_redirect_response=False)
+        self.assertEqual(lote.processamento, StatusProcessamento.CONCLUIDO)
+        self.assertEqual(lote.total_relatorios, 2)
+
+        download = self.client.get(detalhe)
+        self.assertEqual(download["Content-Type"], "application/zip")
+        self.assertIn(lote.nome_download, download["Content-Disposition"])
+        with zipfile.ZipFile(io.BytesIO(b"".join(download.streaming_content))) as zf:
+            planilhas = {
+                nome: openpyxl.load_workbook(io.BytesIO(zf.read(nome)), read_only=True).active
+                for nome in zf.namelist()
+            }
+        download.close()
+
+        ativos = Prestador.objects.filter(ativo=True).order_by("pk")
+        self.assertEqual(sorted(planilhas), sorted(nome_arquivo(p, 4, 2026) for p in ativos))
+        for prestador in ativos:
+            textos = {
+                c for linha in planilhas[nome_arquivo(prestador, 4, 2026)].iter_rows(values_only=True)
+                for c in linha if isinstance(c, str)
+            }
+            self.assertIn(prestador.nome_empresa, " ".join(textos))
+
+    @override_settings(FILA_SINCRONA=True)
+    def test_falha_do_worker_fica_no_lote(self):
+        with mock.patch("cadastro.relatorio_lote.gerar_lote", side_effect=RuntimeError("disco cheio")), \
+                self.assertLogs("cadastro.fila", "ERROR"):
+            self._pedir()
+        lote = LoteRelatorio.objects.get()
+        status = self.client.get(reverse("cadastro:relatorio_lote_status", args=[lote.pk])).json()
+        self.assertEqual((status["processamento"], status["erro"]), ("erro", "disco cheio"))
+        self.assertFalse(lote.arquivo)
+
+    def test_get_nao_cria_lote(self):
+        self.assertRedirects(
+            self.client.get(reverse("cadastro:relatorio_lote"), {"mes": 4, "ano": 2026}),
+            reverse("cadastro:relatorio"),
+        )
+        self.assertFalse(LoteRelatorio.objects.exists())
+
+
+# Termo de adesão reduzido: cláusulas gerais com valores e prazos que não
+# podem ser confundidos com os do ANEXO 1
+CONTRATO_TEXTO = """\
+TERMO DE ADESÃO
+Nº do processo: 96630 - ID: 2679
+CONTRATANTE: SECONCI-SP - AME CARAGUATATUBA
+Pelo presente instrumento, CLINICA EXEMPLO LTDA, inscrita no CNPJ sob o nº 96.858.658/0001-21,
+Inscrição Municipal nº 87397, com sede na RUA DAS FLORES, 865, CENTRO - SALA 3, CEP: 11660-130,
+no município de Caraguatatuba, Estado de São Paulo, Doravante denominada CONTRATADA, adere às
+Condições Gerais de Contratação.
+CONTRATADO (A)
+Nome: CARLOS EDUARDO LIMA
+CPF: 133.890.838-63
+CONDIÇÕES GERAIS DE CONTRATAÇÃO
+CLÁUSULA 1 - DAS OBRIGAÇÕES
+1.1 A CONTRATADA obriga-se a cumprir as normas internas da CONTRATANTE, com valor
+de R$ 1.000,00 por infração e prazo de 30 (trinta) meses para recurso.
+CLÁUSULA 2 - DAS PENALIDADES
+2.1 O CONTRATADO deverá observar o disposto no item 1.1.
+ANEXO 1 - CONDIÇÕES ESPECÍFICAS
+I. OBJETO
+1.1 O presente contrato tem por objeto a prestação de serviços médicos de Cardiologia aos
+pacientes encaminhados pela CONTRATANTE.
+1.3 Os serviços contratados estão discriminados no quadro abaixo:
+MAPA 108 5 dias úteis
+HOLTER 45 5 dias úteis
+II. PREÇO
+3.1 Pela execução dos serviços a CONTRATANTE pagará à CONTRATADA os valores da tabela abaixo:
+MAPA 126 80,50 10.143,00
+5 dias úteis
+HOLTER 50 45,00 2.250,00
+5 dias úteis
+Valor Estimado Mensal R$ 12.393,00
+3.2 O valor global estimado de R$ 148.716,00 será pago mensalmente.
+4.1 O contrato vigorará pelo prazo de 12 (doze) meses, a partir de 8 de abril de 2022,
+correspondente ao período contratual.
+São Paulo, 8 de abril de 2022
+CONTRATANTE
+Nome: DIRETOR TECNICO
+CONTRATADO (A)
+Nome: CARLOS EDUARDO LIMA
+CPF: 475.255.341-92
+Testemunha Contratado (A)
+Nome: TATIANA ROZOV
+CPF: 832.764.835-03
+"""
+
+
+class ExtracaoTextoContratoTest(TestCase):
+    """Campos do contrato com e sem o índice de seções (indexar=False é a varredura de antes)."""
+
+    ESPERADO = {
+        "numero_processo": "96630",
+        "razao_social": "CLINICA EXEMPLO LTDA",
+        "cnpj": "96.858.658/0001-21",
+        "inscricao_municipal": "87397",
+        "logradouro": "RUA DAS FLORES",
+        "numero": "865",
+        "complemento": "SALA 3",
+        "bairro": "CENTRO",
+        "cep": "11660-130",
+        "cidade": "Caraguatatuba",
+        "especialidade": "Cardiologia",
+        "valor_mensal": 12393.0,
+        "valor_global": 148716.0,
+        "meses_vigencia": 12,
+        "data_assinatura": date(2022, 4, 8),
+        "data_fim": date(2023, 4, 8),
+        "cpf_representante": "133.890.838-63",
+        "erro": None,
+    }
+    SERVICOS = [
+        ("Mapa", 126, 80.5, 10143.0),
+        ("Holter", 50, 45.0, 2250.0),
+    ]
+
+    def test_campos_fixados_nos_dois_modos(self):
+        resultados = {}
+        for indexar in (True, False):
+            with self.subTest(indexar=indexar):
+                resultado = extrair_do_texto(CONTRATO_TEXTO, indexar)
+                self.assertEqual({c: resultado[c] for c in self.ESPERADO}, self.ESPERADO)
+                self.assertEqual(
+                    [(s["descricao"], s["quantidade_estimada_mes"], s["valor_unitario"], s["valor_total"])
+                     for s in resultado["servicos"]],
+                    self.SERVICOS,
+                )
+                resultados[indexar] = resultado
+        self.assertEqual(resultados[True], resultados[False])
+
+    def test_valores_do_anexo1_prevalecem_com_indice(self):
+        """Um valor citado antes do Anexo 1 só vale na varredura do texto todo."""
+        texto = "Valor Estimado Mensal R$ 500,00\n" + CONTRATO_TEXTO
+        self.assertEqual(extrair_do_texto(texto, indexar=False)["valor_mensal"], 500.0)
+        self.assertEqual(extrair_do_texto(texto, indexar=True)["valor_mensal"], 12393.0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImportacaoEmLotesTest(TestCase):
+    """Gravação em lotes da importação SIRESP numa única transação."""
+
+    def _importar(self, linhas, upload=None):
+        if upload is None:
+            upload = UploadProducao.objects.create(
+                arquivo=SimpleUploadedFile("producao.xlsx", planilha_siresp(linhas)),
+            )
+        processar_upload(upload.pk)
+        return upload
+
+    def test_agenda_repetida_depois_do_lote_gravado(self):
+        linhas = [
+            ("Cardiologia", 10), ("ANA SOUZA", 1), ("BRUNO LIMA", 2), ("CARLA DIAS", 3),
+            ("Dermatologia", 5), ("DANIEL REIS", 4),
+            ("Cardiologia", 20), ("EVA MELO", 5),
+        ]
+        with mock.patch("cadastro.importacao_siresp.TAMANHO_LOTE", 3):
+            upload = self._importar(linhas)
+
+        agendas = {a.nome_agenda: a for a in upload.agendas.all()}
+        self.assertEqual(sorted(agendas), ["Cardiologia", "Dermatologia"])
+        cardiologia = agendas["Cardiologia"]
+        self.assertEqual(cardiologia.agend_totais, 20)  # vale a última ocorrência
+        self.assertEqual(
+            sorted(cardiologia.medicos.values_list("nome_medico", flat=True)),
+            ["ANA SOUZA", "BRUNO LIMA", "CARLA DIAS", "EVA MELO"],
+        )
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.total_medicos), (StatusUpload.CONFIRMADO, 5))
+
+    def test_falha_desfaz_a_importacao_inteira(self):
+        upload = self._importar([("Cardiologia", 10), ("ANA SOUZA", 10)])
+        upload.arquivo = SimpleUploadedFile(
+            "producao.xlsx", planilha_siresp([("Dermatologia", 5), ("BRUNO LIMA", 5)]),
+        )
+        upload.save()
+
+        with mock.patch("cadastro.importacao_siresp.publicar_upload", side_effect=RuntimeError("falha")):
+            with self.assertRaises(RuntimeError):
+                self._importar(None, upload)
+
+        self.assertEqual(list(upload.agendas.values_list("nome_agenda", flat=True)), ["Cardiologia"])
+        self.assertEqual(
+            list(ProducaoMedico.objects.filter(agenda__upload=upload).values_list("nome_medico", flat=True)),
+            ["ANA SOUZA"],
+        )
+
+
+class LeitoresSirespTest(TestCase):
+    """Os leitores em streaming devolvem as mesmas linhas que o pandas."""
+
+    @staticmethod
+    def _normalizar(linhas, colunas):
+        # pandas usa NaN e float onde o leitor usa "" e int
+        def valor(v):
+            if v is None or v == "" or (isinstance(v, float) and v != v):
+                return ""
+            if isinstance(v, str):
+                return v.strip()
+            return round(float(v), 4)
+        return [tuple(valor(dados.get(c, "")) for c in colunas) for dados in linhas]
+
+    def test_xlsx_read_only_igual_ao_pandas(self):
+        import pandas as pd
+        from .producao_siresp import _abrir_sheet
+
+        linhas = [("Cardiologia", 10), ("ANA SOUZA", 7), ("Dermatologia - Retorno", 3), ("BRUNO LIMA", 3)]
+        conteudo = planilha_siresp(linhas)
+
+        sheet = _abrir_sheet(io.BytesIO(conteudo))
+        lidas = list(sheet.iter_linhas())
+
+        df = pd.read_excel(io.BytesIO(conteudo), header=None)
+        esperadas = [
+            dict(zip(COLUNAS_SIRESP, row))
+            for row in df.iloc[9:, :len(COLUNAS_SIRESP)].itertuples(index=False)
+        ]
+        self.assertEqual(sheet.cell_b2(), df.iloc[1, 1])
+        self.assertEqual(
+            self._normalizar(lidas, COLUNAS_SIRESP), self._normalizar(esperadas, COLUNAS_SIRESP),
+        )
+
+    def test_html_incremental_igual_ao_pandas(self):
+        from .management.commands.bench_siresp_html import (
+            _chave, _SheetHtmlExamesPandas, _SheetHtmlPandas, gerar_html,
+        )
+        from .producao_siresp import _SheetHtml
+        from .producao_siresp_exames import _SheetHtmlExames
+
+        for colunas, leitor, referencia in (
+            (COLUNAS_SIRESP, _SheetHtml, _SheetHtmlPandas),
+            (COLUNAS_SIRESP_EXAMES, _SheetHtmlExames, _SheetHtmlExamesPandas),
+        ):
+            with self.subTest(leitor=leitor.__name__):
+                conteudo = gerar_html(3, 4, colunas, referencia._N_CABECALHOS)
+                sheet, esperado = leitor(io.BytesIO(conteudo)), referencia(conteudo)
+
+                def chaves(s):
+                    # O pandas já converte "1.234" e "95,51"; o leitor entrega o texto
+                    return [_chave(dados, colunas) for dados in s.iter_linhas()]
+
+                self.assertIn("Período:01-04-2026a30-04-2026", sheet.cell_b2())
+                self.assertIn("Período:01-04-2026a30-04-2026", esperado.cell_b2())
+                linhas = chaves(sheet)
+                self.assertEqual(len(linhas), 3 * 5 + 1)
+                self.assertEqual(linhas, chaves(esperado))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class DeduplicacaoUploadTest(TestCase):
+    """Arquivo de produção com o mesmo SHA-256 não é gravado nem importado de novo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = get_user_model().objects.create_user(
+            "producao", "producao@example.com", "senha", primeiro_acesso=False,
+        )
+        cls.conteudo = planilha_siresp([("Cardiologia", 10), ("ANA SOUZA", 10)])
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _enviar(self, tipo=TipoRelatorioProducao.CONSULTA, nome="producao.xlsx"):
+        return self.client.post(reverse("cadastro:acompanhamento"), {
+            "arquivo_producao": SimpleUploadedFile(nome, self.conteudo), "tipo": tipo,
+        }, follow=True)
+
+    def test_mesmo_conteudo_reaproveita_upload(self):
+        self._enviar()
+        resposta = self._enviar(nome="outro_nome.xlsx")
+        self.assertEqual(UploadProducao.objects.count(), 1)
+        self.assertContains(resposta, "Arquivo idêntico já enviado")
+
+    def test_outro_tipo_compartilha_o_arquivo(self):
+        self._enviar()
+        self._enviar(tipo=TipoRelatorioProducao.CIRURGIA_EXAME)
+        consulta, exame = UploadProducao.objects.order_by("pk")
+        self.assertEqual(exame.tipo, TipoRelatorioProducao.CIRURGIA_EXAME)
+        self.assertEqual(exame.sha256, consulta.sha256)
+        self.assertEqual(exame.arquivo.name, consulta.arquivo.name)
+
+    def test_upload_com_erro_e_refeito_no_mesmo_registro(self):
+        self._enviar()
+        UploadProducao.objects.update(status=StatusUpload.ERRO, erro_processamento="falha")
+        self._enviar()
+        upload = UploadProducao.objects.get()
+        self.assertEqual(upload.status, StatusUpload.PENDENTE)
+
+
+class FatosProducaoTest(TestCase):
+    """reconstruir_fatos: um fato por (agenda, profissional) normalizados, vindo do upload vigente."""
+
+    def test_chaves_normalizadas_sao_somadas(self):
+        medico = Medico.objects.create(nome_completo="Ana Souza", cpf="11111111111")
+        upload = criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {
+            "Cardiologia": (10, {"ANA SOUZA": 4, "BRUNO LIMA": 6}),
+            "CARDIOLOGIA ": (5, {"Ana  Souza": 5}),
+        })
+        fatos = {
+            (f.agenda_chave, f.profissional_chave): (f.agend_totais, f.medico_id)
+            for f in ProducaoFato.objects.filter(upload=upload)
+        }
+        self.assertEqual(fatos, {
+            ("CARDIOLOGIA", ""): (15, None),
+            ("CARDIOLOGIA", "ANA SOUZA"): (9, medico.pk),
+            ("CARDIOLOGIA", "BRUNO LIMA"): (6, None),
+        })
+
+    def test_reconstruir_substitui_os_fatos_do_mes(self):
+        upload = criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {
+            "Cardiologia": (10, {"ANA SOUZA": 10}),
+        })
+        ProducaoMedico.objects.filter(agenda__upload=upload).update(agend_totais=3)
+        with transaction.atomic():
+            self.assertEqual(reconstruir_fatos(date(2026, 4, 15), upload.tipo), 2)
+        self.assertEqual(
+            ProducaoFato.objects.get(profissional_chave="ANA SOUZA").agend_totais, 3,
+        )
+
+
+class UploadVigenteTest(TestCase):
+    """O ponteiro do mês segue o upload confirmado mais recente, inclusive após exclusões."""
+
+    def _upload(self, total):
+        return criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {
+            "Cardiologia": (total, {}),
+        })
+
+    def _vigente(self):
+        vigente = UploadVigente.objects.filter(mes=date(2026, 4, 1)).first()
+        totais = list(ProducaoFato.objects.filter(mes=date(2026, 4, 1)).values_list("upload_id", "agend_totais"))
+        return (vigente.upload_id if vigente else None), totais
+
+    def test_publicar_aponta_para_o_mais_recente(self):
+        self._upload(10)
+        novo = self._upload(20)
+        self.assertEqual(self._vigente(), (novo.pk, [(novo.pk, 20)]))
+
+    def test_excluir_o_vigente_volta_ao_anterior(self):
+        antigo = self._upload(10)
+        self._upload(20).delete()
+        self.assertEqual(self._vigente(), (antigo.pk, [(antigo.pk, 10)]))
+
+    def test_excluir_outro_upload_mantem_o_vigente(self):
+        antigo = self._upload(10)
+        novo = self._upload(20)
+        antigo.delete()
+        self.assertEqual(self._vigente(), (novo.pk, [(novo.pk, 20)]))
+
+    def test_excluir_o_unico_limpa_o_mes(self):
+        self._upload(10).delete()
+        self.assertEqual(self._vigente(), (None, []))
+
+    def test_upload_nao_confirmado_nao_assume(self):
+        antigo = self._upload(10)
+        UploadProducao.objects.create(
+            nome_arquivo="producao.xlsx", status=StatusUpload.ERRO,
+            data_inicio_periodo=date(2026, 4, 1), data_fim_periodo=date(2026, 4, 30),
+        )
+        with transaction.atomic():
+            reconstruir_fatos(date(2026, 4, 1), antigo.tipo)
+        self.assertEqual(self._vigente(), (antigo.pk, [(antigo.pk, 10)]))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class VinculoMedicosTest(TestCase):
+    """O FK `medico` da produção e dos fatos acompanha o cadastro de médicos."""
+
+    def _vinculos(self):
+        return (
+            dict(ProducaoMedico.objects.values_list("nome_chave", "medico_id")),
+            dict(ProducaoFato.objects.exclude(profissional_chave="")
+                 .values_list("profissional_chave", "medico_id")),
+        )
+
+    def _importar(self):
+        upload = UploadProducao.objects.create(arquivo=SimpleUploadedFile(
+            "producao.xlsx",
+            planilha_siresp([("Cardiologia", 10), ("ANA SOUZA", 6), ("BRUNO LIMA", 4)]),
+        ))
+        processar_upload(upload.pk)
+
+    def test_importacao_vincula_pelo_mapa(self):
+        ana = Medico.objects.create(nome_completo="Ana Souza", cpf="11111111111")
+        self._importar()
+        esperado = {"ANA SOUZA": ana.pk, "BRUNO LIMA": None}
+        self.assertEqual(self._vinculos(), (esperado, esperado))
+
+    def test_cadastro_posterior_renomeacao_e_inativacao(self):
+        self._importar()
+        bruno = Medico.objects.create(nome_completo="Bruno Lima", cpf="22222222222")
+        self.assertEqual(self._vinculos()[1]["BRUNO LIMA"], bruno.pk)
+
+        bruno.nome_completo = "Bruno Lima Neto"
+        bruno.save()
+        self.assertEqual(self._vinculos(), ({"ANA SOUZA": None, "BRUNO LIMA": None},) * 2)
+
+        ana = Medico.objects.create(nome_completo="Ana Souza", cpf="11111111111")
+        ana.ativo = False
+        ana.save()
+        self.assertIsNone(self._vinculos()[0]["ANA SOUZA"])
+
+    def test_exclusao_passa_ao_homonimo_e_alias_vincula(self):
+        self._importar()
+        primeira = Medico.objects.create(nome_completo="Ana Souza", cpf="11111111111")
+        segunda = Medico.objects.create(nome_completo="Ana Souza", cpf="33333333333")
+        self.assertEqual(self._vinculos()[0]["ANA SOUZA"], primeira.pk)
+        primeira.delete()
+        self.assertEqual(self._vinculos()[1]["ANA SOUZA"], segunda.pk)
+
+        AliasMedico.objects.create(nome_chave="BRUNO LIMA", medico=segunda)
+        self.assertEqual(self._vinculos()[1]["BRUNO LIMA"], segunda.pk)
+
+
+class ReconciliacaoTest(TestCase):
+    """Classificação dos nomes do SIRESP contra o índice de trigramas dos médicos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        nomes = [
+            "Maria Aparecida Souza Oliveira", "Maria Aparecida Santos",
+            "João Silva", "José Silva", "Antonio Carlos Pereira",
+        ]
+        cls.medicos = {
+            nome: Medico.objects.create(nome_completo=nome, cpf=f"{i:011d}")
+            for i, nome in enumerate(nomes, start=1)
+        }
+        Medico.objects.create(nome_completo="Carlos Inativo", cpf="99999999999", ativo=False)
+
+    def _reconciliar(self, *nomes):
+        return reconciliar(nomes, indice_medicos_ativos())
+
+    def test_abreviacoes_aceitas(self):
+        resultado = self._reconciliar("MARIA APARECIDA S OLIVEIRA", "ANT C PEREIRA")
+        for nome, medico in (
+            ("MARIA APARECIDA S OLIVEIRA", "Maria Aparecida Souza Oliveira"),
+            ("ANT C PEREIRA", "Antonio Carlos Pereira"),
+        ):
+            situacao, candidatos = resultado[nome]
+            self.assertEqual((situacao, candidatos[0][0]), (ACEITO, self.medicos[medico].pk))
+
+    def test_ambiguo_e_sem_candidato(self):
+        resultado = self._reconciliar("J SILVA", "XYZW QWERTY", "CARLOS INATIVO")
+        situacao, candidatos = resultado["J SILVA"]
+        self.assertEqual(situacao, AMBIGUO)
+        self.assertEqual(
+            {pk for pk, _ in candidatos[:2]},
+            {self.medicos["João Silva"].pk, self.medicos["José Silva"].pk},
+        )
+        self.assertEqual(resultado["XYZW QWERTY"], (SEM_CANDIDATO, []))
+        self.assertNotEqual(resultado["CARLOS INATIVO"][0], ACEITO)
+
+    def test_nao_resolvidos_por_volume(self):
+        criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {
+            "Cardiologia": (30, {"JOAO SILVA": 10, "J SILVA": 5, "ANT C PEREIRA": 15}),
+        })
+        self.assertEqual(nomes_nao_resolvidos(), [("ANT C PEREIRA", 1, 15), ("J SILVA", 1, 5)])
+
+
+class CacheIndicadoresTest(TestCase):
+    """Os dados dos dashboards ficam em cache até a versão dos dados mudar."""
+
+    def setUp(self):
+        cache.clear()
+        self.calculos = 0
+
+    def _dados(self, filtros=None):
+        def calcular():
+            self.calculos += 1
+            return {"calculo": self.calculos}
+        return dados_em_cache("teste", filtros or {"prestador": "1"}, calcular)
+
+    def test_acerto_ate_a_proxima_versao(self):
+        self.assertEqual(self._dados(), {"calculo": 1})
+        self.assertEqual(self._dados(), {"calculo": 1})
+        self.assertEqual(self._dados({"prestador": "2"}), {"calculo": 2})
+
+        criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {"Cardiologia": (5, {})})
+        self.assertEqual(self._dados(), {"calculo": 3})
+
+    def test_edicoes_do_cadastro_incrementam_a_versao(self):
+        especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        prestador = Prestador.objects.create(nome_empresa="Clínica A", cnpj="11222333000181")
+        servico = ServicoContratado.objects.create(prestador=prestador, especialidade=especialidade)
+        for editar in (
+            lambda: AgendaMapeamento.objects.create(servico=servico, nome_agenda="Cardiologia"),
+            servico.save,
+            lambda: Medico.objects.create(nome_completo="Ana Souza", cpf="11111111111"),
+        ):
+            versao = versao_dados()
+            editar()
+            self.assertGreater(versao_dados(), versao)
+
+    def test_salvar_upload_sem_mudar_status_nao_invalida(self):
+        upload = UploadProducao.objects.create(nome_arquivo="producao.xlsx", status=StatusUpload.ERRO)
+        versao = versao_dados()
+        upload.erro_processamento = "outra falha"
+        upload.save()
+        self.assertEqual(versao_dados(), versao)
+
+
+class SeriesETagTest(TestCase):
+    """API de séries: 304 enquanto a versão dos dados não muda."""
+
+    @classmethod
+    def setUpTestData(cls):
+        especialidade, _ = Especialidade.objects.get_or_create(nome="Cardiologia")
+        cls.prestador = Prestador.objects.create(nome_empresa="Clínica A", cnpj="11222333000181")
+        servico = ServicoContratado.objects.create(
+            prestador=cls.prestador, especialidade=especialidade, quantidade_estimada_mes=10,
+        )
+        AgendaMapeamento.objects.create(servico=servico, nome_agenda="Cardiologia")
+        criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {"Cardiologia": (8, {})})
+        cls.usuario = get_user_model().objects.create_user(
+            "indicadores", "indicadores@example.com", "senha", primeiro_acesso=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _series(self, **cabecalhos):
+        return self.client.get(
+            reverse("cadastro:indicadores_prestador_series"),
+            {"prestador": self.prestador.pk, "mes_ini": "2026-04", "mes_fim": "2026-04"},
+            **cabecalhos,
+        )
+
+    def test_revalidacao_e_invalidacao(self):
+        resposta = self._series()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("no-cache", resposta["Cache-Control"])
+        etag = resposta["ETag"]
+
+        self.assertEqual(self._series(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        criar_upload_confirmado(date(2026, 4, 1), date(2026, 4, 30), {"Cardiologia": (12, {})})
+        nova = self._series(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(nova.status_code, 200)
+        self.assertNotEqual(nova["ETag"], etag)
+        self.assertNotEqual(nova.json()["series"], resposta.json()["series"])
+
+    def test_versao_dos_dados_nas_duas_apis(self):
+        especialidade = Especialidade.objects.get(nome="Cardiologia")
+        for nome, parametros in (
+            ("indicadores_prestador_series", {"prestador": self.prestador.pk}),
+            ("indicadores_especialidade_series", {"especialidade": especialidade.pk}),
+        ):
+            with self.subTest(view=nome):
+                url = reverse(f"cadastro:{nome}")
+                parametros = {**parametros, "mes_ini": "2026-04", "mes_fim": "2026-04"}
+                etag = self.client.get(url, parametros)["ETag"]
+
+                with mock.patch("cadastro.cache_indicadores.dados_em_cache") as dados:
+                    resposta = self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual((resposta.status_code, resposta.content), (304, b""))
+                dados.assert_not_called()
+
+                incrementar_versao()
+                resposta = self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertNotEqual(resposta["ETag"], etag)
+                self.assertIn("series", resposta.json())
+
+                # Edição de cadastro também invalida (sinais de Prestador/Especialidade)
+                etag = resposta["ETag"]
+                self.prestador.nome_empresa = f"Clínica A {nome}"
+                self.prestador.save()
+                self.assertEqual(self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_filtros_diferentes_etags_diferentes(self):
+        etag = self._series()["ETag"]
+        outra = self.client.get(
+            reverse("cadastro:indicadores_prestador_series"),
+            {"prestador": self.prestador.pk, "mes_ini": "2026-03", "mes_fim": "2026-04"},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(outra.status_code, 200)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ExtracaoContratoFilaTest(TestCase):
+    """A extração em segundo plano grava os dados extras lidos pela tela de revisão."""
+
+    def _extrair(self, caminho, ao_progredir=None, sha256=None):
+        for etapa in (EtapaExtracao.TEXTO, EtapaExtracao.WIDGETS, EtapaExtracao.TABELAS,
+                      EtapaExtracao.VIGENCIA):
+            ao_progredir(etapa)
+        return {**extrair_do_texto(CONTRATO_TEXTO), "nome_representante": "CARLOS EDUARDO DA LIMA"}
+
+    @override_settings(FILA_SINCRONA=True)
+    def test_dados_extras_gravados_e_exibidos_na_revisao(self):
+        contrato = ContratoUpload.objects.create(
+            arquivo=SimpleUploadedFile("contrato.pdf", b"%PDF-1.4"),
+        )
+        fila = FILAS["contratos"]
+        with mock.patch("cadastro.importacao_contrato.extrair_contrato", side_effect=self._extrair), \
+                mock.patch.object(fila, "atualizar_progresso", wraps=fila.atualizar_progresso) as progresso:
+            enfileirar("contratos", contrato.pk)
+
+        self.assertEqual([c.args[1] for c in progresso.call_args_list], [10, 60, 75, 90])
+        contrato.refresh_from_db()
+        self.assertEqual(
+            (contrato.processamento, contrato.progresso, contrato.etapa),
+            (StatusProcessamento.CONCLUIDO, 100, ""),
+        )
+        self.assertEqual(contrato.dados_extras["nome_representante"], "Carlos Eduardo da Lima")
+        self.assertEqual(contrato.dados_extras["cep"], "11660-130")
+        self.assertEqual(len(contrato.dados_extras["servicos_contratados"]), 4)
+
+        usuario = get_user_model().objects.create_user(
+            "contratos", "contratos@example.com", "senha", primeiro_acesso=False,
+        )
+        self.client.force_login(usuario)
+        revisao = self.client.get(reverse("cadastro:contrato_revisao", args=[contrato.pk]))
+        self.assertContains(revisao, "RUA DAS FLORES")
+        self.assertContains(revisao, "Carlos Eduardo da Lima")
+
+
+@skipUnless(HAS_PYMUPDF and HAS_PDFPLUMBER, "requer PyMuPDF e pdfplumber")
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CacheContratosTest(TestCase):
+    """O texto e o layout em cache reproduzem a extração feita sobre o PDF."""
+
+    def setUp(self):
+        import fitz
+
+        self.caminho = Path(tempfile.mkdtemp()) / "contrato.pdf"
+        pdf = fitz.open()
+        linhas = CONTRATO_TEXTO.splitlines()
+        for inicio in range(0, len(linhas), 25):
+            pagina = pdf.new_page()
+            for j, linha in enumerate(linhas[inicio:inicio + 25]):
+                pagina.insert_text((40, 50 + j * 14), linha, fontsize=9)
+        widget = fitz.Widget()
+        widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+        widget.field_name, widget.field_value = "FullName_0", "CARLOS EDUARDO LIMA"
+        widget.rect = fitz.Rect(300, 120, 500, 134)
+        pdf[0].add_widget(widget)
+        pdf.save(self.caminho)
+        pdf.close()
+        self.sha256 = hashlib.sha256(self.caminho.read_bytes()).hexdigest()
+
+    def test_exportar_e_de_dados_equivalem_ao_pdf(self):
+        with DocumentoPDF(self.caminho) as lido:
+            dados = json.loads(json.dumps(lido.exportar()))  # como no arquivo gravado
+            restaurado = DocumentoPDF.de_dados(self.caminho, dados)
+            self.assertEqual(restaurado.texto, lido.texto)
+            self.assertEqual(restaurado.n_paginas_layout, lido.n_paginas_layout)
+            for i in range(lido.n_paginas_layout):
+                self.assertEqual(restaurado.linhas(i), lido.linhas(i))
+                self.assertEqual(restaurado.widgets(i), lido.widgets(i))
+            self.assertTrue(lido.widgets(0))
+
+    def test_segunda_extracao_nao_abre_o_pdf(self):
+        primeira = extrair_contrato(self.caminho, sha256=self.sha256)
+        self.assertTrue(cache_contratos.caminho_cache(self.sha256).exists())
+        self.assertEqual(primeira["razao_social"], "CLINICA EXEMPLO LTDA")
+
+        # Conteúdo ilegível no lugar do PDF: só o cache pode responder
+        self.caminho.write_bytes(b"nao e um pdf")
+        self.assertEqual(extrair_contrato(self.caminho, sha256=self.sha256), primeira)
+
+
+class ImportContratosTest(TestCase):
+    """import_contratos: deduplicação por SHA-256, retomada e gravação em blocos."""
+
+    def setUp(self):
+        media = self.settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media.enable()
+        self.addCleanup(media.disable)
+        self.diretorio = Path(tempfile.mkdtemp())
+        for nome, conteudo in (("a.pdf", b"%PDF a"), ("a_copia.pdf", b"%PDF a"), ("b.pdf", b"%PDF b"),
+                               ("c.pdf", b"%PDF c")):
+            (self.diretorio / nome).write_bytes(conteudo)
+        self.extraidos = []
+
+    def _extrair(self, caminho, sha256=None):
+        self.extraidos.append(Path(caminho).name)
+        return extrair_do_texto(CONTRATO_TEXTO)
+
+    def _importar(self, lote=2):
+        # Threads no lugar do pool de processos: o extrator falso e o banco de teste valem para elas
+        with mock.patch("cadastro.management.commands.import_contratos.ProcessPoolExecutor",
+                        ThreadPoolExecutor), \
+                mock.patch("cadastro.management.commands.import_contratos.extrair_contrato",
+                           self._extrair), \
+                mock.patch.object(ContratoUpload.objects, "bulk_create",
+                                  wraps=ContratoUpload.objects.bulk_create) as bulk_create:
+            call_command("import_contratos", str(self.diretorio), "--lote", str(lote), stdout=io.StringIO())
+        return bulk_create
+
+    def _pdfs_no_storage(self):
+        return sorted(p.name for p in Path(settings.MEDIA_ROOT, "contratos_pdf").rglob("*.pdf"))
+
+    def test_duplicados_pulados_e_gravacao_em_blocos(self):
+        bulk_create = self._importar(lote=2)
+
+        self.assertEqual([len(c.args[0]) for c in bulk_create.call_args_list], [2, 1])
+        self.assertEqual(len(self.extraidos), 3, "a cópia de a.pdf não é extraída")
+        contratos = ContratoUpload.objects.order_by("sha256")
+        self.assertEqual(
+            sorted(contratos.values_list("sha256", flat=True)),
+            sorted(hashlib.sha256(c).hexdigest() for c in (b"%PDF a", b"%PDF b", b"%PDF c")),
+        )
+        for contrato in contratos:
+            self.assertEqual(contrato.processamento, StatusProcessamento.CONCLUIDO)
+            self.assertEqual(contrato.razao_social_extraida, "CLINICA EXEMPLO LTDA")
+            self.assertEqual(contrato.dados_extras["inscricao_municipal"], "87397")
+            self.assertTrue(contrato.arquivo.storage.exists(contrato.arquivo.name))
+        self.assertEqual(len(self._pdfs_no_storage()), 3)
+
+    def test_retomada_extrai_so_os_novos(self):
+        (self.diretorio / "c.pdf").unlink()
+        self._importar()
+        (self.diretorio / "c.pdf").write_bytes(b"%PDF c")
+        self.extraidos.clear()
+
+        self._importar()
+
+        self.assertEqual(self.extraidos, ["c.pdf"])
+        self.assertEqual(ContratoUpload.objects.count(), 3)
+        self.assertEqual(len(self._pdfs_no_storage()), 3)
+
+    def test_falha_na_gravacao_nao_deixa_pdfs(self):
+        with mock.patch.object(ContratoUpload.objects, "bulk_create", side_effect=IntegrityError), \
+                mock.patch("cadastro.management.commands.import_contratos.ProcessPoolExecutor",
+                           ThreadPoolExecutor), \
+                mock.patch("cadastro.management.commands.import_contratos.extrair_contrato",
+                           self._extrair), \
+                self.assertRaises(IntegrityError):
+            call_command("import_contratos", str(self.diretorio), stdout=io.StringIO())
+
+        self.assertFalse(ContratoUpload.objects.exists())
+        self.assertEqual(self._pdfs_no_storage(), [])
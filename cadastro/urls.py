@@ -22,15 +22,22 @@ urlpatterns = [
 
     # ── Módulo: Acompanhamento de Produção ────────────────────────────────────
     path("acompanhamento/", farol_login_required(views_home.acompanhamento), name="acompanhamento"),
+    path("acompanhamento/status/", farol_login_required(views_home.acompanhamento_status), name="acompanhamento_status"),
 
     # ── Módulo: Relatório ─────────────────────────────────────────────────────
     path("relatorio/", farol_login_required(views_home.relatorio), name="relatorio"),
     path("relatorio/<int:pk>/download/", farol_login_required(views_home.relatorio_download), name="relatorio_download"),
+    path("relatorio/lote/", farol_login_required(views_home.relatorio_lote), name="relatorio_lote"),
+    path("relatorio/lote/<int:pk>/", farol_login_required(views_home.relatorio_lote_detalhe), name="relatorio_lote_detalhe"),
+    path("relatorio/lote/<int:pk>/status/", farol_login_required(views_home.relatorio_lote_status), name="relatorio_lote_status"),
 
     # ── Módulo: Indicadores ───────────────────────────────────────────────────
     path("indicadores/", farol_login_required(views_home.indicadores), name="indicadores"),
     path("indicadores/prestador/", farol_login_required(views_home.indicadores_prestador), name="indicadores_prestador"),
     path("indicadores/especialidade/", farol_login_required(views_home.indicadores_especialidade), name="indicadores_especialidade"),
+    path("indicadores/comparativo/", farol_login_required(views_home.indicadores_comparativo), name="indicadores_comparativo"),
+    path("indicadores/prestador/series/", farol_login_required(views_home.indicadores_prestador_series), name="indicadores_prestador_series"),
+    path("indicadores/especialidade/series/", farol_login_required(views_home.indicadores_especialidade_series), name="indicadores_especialidade_series"),
 
     # ── Módulo: Cadastro — Prestadores ────────────────────────────────────────
     path("prestadores/", farol_login_required(views.prestador_list), name="prestador_list"),
@@ -48,6 +55,7 @@ urlpatterns = [
     path("medicos/<int:pk>/", farol_login_required(views.medico_detail), name="medico_detail"),
     path("medicos/<int:pk>/editar/", farol_login_required(views.medico_edit), name="medico_edit"),
     path("medicos/<int:pk>/excluir/", farol_login_required(views.medico_delete), name="medico_delete"),
+    path("medicos/reconciliacao/", farol_login_required(views.reconciliacao_medicos), name="reconciliacao_medicos"),
 
     # ── Módulo: Mapeamento de Agendas ─────────────────────────────────────────
     path("prestadores/<int:prestador_pk>/mapeamentos/", farol_login_required(views.mapeamento_list), name="mapeamento_list"),
@@ -56,5 +64,6 @@ urlpatterns = [
     # ── Módulo: Cadastro — Importação de Contratos via PDF ────────────────────
     path("contrato/upload/", farol_login_required(views.contrato_upload), name="contrato_upload"),
     path("contrato/<int:pk>/revisar/", farol_login_required(views.contrato_revisao), name="contrato_revisao"),
+    path("contrato/<int:pk>/status/", farol_login_required(views.contrato_status), name="contrato_status"),
     path("contrato/<int:pk>/ignorar/", farol_login_required(views.contrato_ignorar), name="contrato_ignorar"),
 ]
@@ -1,9 +1,15 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.db.models import Q, Sum, F
-from .models import Prestador, Especialidade, ContratoUpload, StatusImportacao, ServicoContratado, Medico, AgendaMapeamento
+
+from core.arquivos import calcular_sha256
+
+from .models import (
+    Prestador, Especialidade, ContratoUpload, StatusImportacao, StatusProcessamento,
+    ServicoContratado, Medico, AgendaMapeamento,
+)
 from .forms import PrestadorForm, ServicoFormSet, UploadContratoForm
-from .extrator import extrair_contrato
+from .fila import enfileirar
 
 
 # ─── Prestadores ───────────────────────────────────────────────────────────────────
@@ -130,22 +136,6 @@ def _resolver_especialidade(nome_extraido: str) -> list:
     return resultado
 
 
-def _title_case_nome(nome: str) -> str:
-    """Converte nome em MAIÚSCULAS para Title Case, preservando partículas."""
-    if not nome:
-        return nome
-    particulas = {"de", "da", "do", "das", "dos", "e", "em", "na", "no", "nas", "nos"}
-    palavras = nome.strip().split()
-    resultado = []
-    for i, p in enumerate(palavras):
-        lower = p.lower()
-        if i > 0 and lower in particulas:
-            resultado.append(lower)
-        else:
-            resultado.append(p.capitalize())
-    return " ".join(resultado)
-
-
 def _prazo_para_dias(prazo_str: str) -> int:
     import re
     if not prazo_str:
@@ -183,46 +173,18 @@ def _montar_initial_formset(servicos_tabela: list, servicos_anexo1: list) -> lis
 # ─── Upload / Importação de Contratos ──────────────────────────────────────────────────
 
 def contrato_upload(request):
-    """Recebe o PDF, extrai os dados e redireciona para a tela de revisão."""
+    """Recebe o PDF, enfileira a extração e redireciona para a tela de revisão."""
     if request.method == "POST":
         form = UploadContratoForm(request.POST, request.FILES)
         if form.is_valid():
             contrato = form.save(commit=False)
             contrato.nome_arquivo = request.FILES["arquivo"].name
+            contrato.sha256 = calcular_sha256(request.FILES["arquivo"])
             contrato.save()
 
-            dados = extrair_contrato(contrato.arquivo.path)
-
-            contrato.razao_social_extraida    = dados["razao_social"]
-            contrato.cnpj_extraido            = dados["cnpj"]
-            contrato.objeto_extraido          = dados["objeto"]
-            contrato.servicos_extraidos       = dados["servicos"]
-            contrato.especialidade_extraida   = dados["especialidade"]
-            contrato.data_inicio_extraida     = dados["data_assinatura"]
-            contrato.data_fim_extraida        = dados["data_fim"]
-            contrato.meses_vigencia_extraidos = dados["meses_vigencia"]
-            contrato.valor_mensal_extraido    = dados["valor_mensal"]
-            contrato.valor_global_extraido    = dados["valor_global"]
-            contrato.numero_processo_extraido = dados["numero_processo"]
-            contrato.erro_extracao            = dados["erro"] or ""
-
-            if dados["erro"]:
-                contrato.status = StatusImportacao.ERRO
-            contrato.save()
-
-            # Persiste todos os campos extras (não mapeados no model) na sessão
-            request.session[f"imp_{contrato.pk}"] = {
-                "nome_representante":   _title_case_nome(dados.get("nome_representante", "")),
-                "cpf_representante":    dados.get("cpf_representante", ""),
-                "inscricao_municipal":  dados.get("inscricao_municipal", ""),
-                "logradouro":           dados.get("logradouro", ""),
-                "numero":               dados.get("numero", ""),
-                "complemento":          dados.get("complemento", ""),
-                "bairro":               dados.get("bairro", ""),
-                "cep":                  dados.get("cep", ""),
-                "cidade":               dados.get("cidade", ""),
-                "servicos_contratados": dados.get("servicos_contratados", []),
-            }
+            # A extração roda no worker da fila (manage.py processar_fila);
+            # a revisão mostra o progresso até o resultado ficar pronto.
+            enfileirar("contratos", contrato.pk)
 
             return redirect("cadastro:contrato_revisao", pk=contrato.pk)
     else:
@@ -236,8 +198,11 @@ def contrato_revisao(request, pk):
     """Exibe os dados extraídos para revisão e permite confirmar o cadastro."""
     contrato = get_object_or_404(ContratoUpload, pk=pk)
 
-    # Recupera dados extras da sessão (descartados após leitura)
-    extras = request.session.pop(f"imp_{contrato.pk}", {})
+    if contrato.processamento in (StatusProcessamento.AGUARDANDO, StatusProcessamento.PROCESSANDO):
+        return render(request, "cadastro/contrato_processando.html", {"contrato": contrato})
+
+    # Campos extraídos sem coluna própria, gravados junto com o upload
+    extras = contrato.dados_extras
 
     especialidades_iniciais = _resolver_especialidade(contrato.especialidade_extraida)
 
@@ -320,6 +285,20 @@ def contrato_revisao(request, pk):
     })
 
 
+def contrato_status(request, pk):
+    """Estado da extração de um contrato, consultado pela tela de espera da revisão."""
+    from django.http import JsonResponse
+    contrato = get_object_or_404(ContratoUpload, pk=pk)
+    return JsonResponse({
+        "processamento": contrato.processamento,
+        "processamento_display": contrato.get_processamento_display(),
+        "etapa": contrato.etapa,
+        "etapa_display": contrato.get_etapa_display() if contrato.etapa else "",
+        "progresso": contrato.progresso,
+        "erro": contrato.erro_extracao,
+    })
+
+
 def contrato_ignorar(request, pk):
     contrato = get_object_or_404(ContratoUpload, pk=pk)
     contrato.status = StatusImportacao.IGNORADO
@@ -404,6 +383,77 @@ def medico_delete(request, pk):
     return render(request, "cadastro/medico_confirm_delete.html", {"medico": medico})
 
 
+def reconciliacao_medicos(request):
+    """
+    Revisão dos nomes da produção SIRESP sem médico vinculado: lista os
+    casos ambíguos com seus candidatos e permite aceitar um alias, rodar a
+    reconciliação automática ou remover aliases já gravados.
+    """
+    from .models import AliasMedico, OrigemAlias
+    from .reconciliacao import (
+        AMBIGUO, SEM_CANDIDATO,
+        gravar_aceitos, indice_medicos_ativos, nomes_nao_resolvidos, reconciliar,
+    )
+
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "aceitar":
+            nome_chave = request.POST.get("nome_chave", "").strip()
+            medico = get_object_or_404(Medico, pk=request.POST.get("medico_pk"))
+            try:
+                pontuacao = float(request.POST.get("pontuacao") or 0)
+            except ValueError:
+                pontuacao = 0.0
+            if nome_chave:
+                AliasMedico.objects.update_or_create(
+                    nome_chave=nome_chave,
+                    defaults={
+                        "medico": medico,
+                        "origem": OrigemAlias.MANUAL,
+                        "pontuacao": pontuacao,
+                    },
+                )
+                messages.success(request, f"'{nome_chave}' vinculado a {medico.nome_completo}.")
+        elif action == "remover":
+            alias = get_object_or_404(AliasMedico, pk=request.POST.get("alias_pk"))
+            alias.delete()
+            messages.success(request, f"Alias '{alias.nome_chave}' removido.")
+        elif action == "reconciliar":
+            pendentes = [nome for nome, _, _ in nomes_nao_resolvidos()]
+            criados = gravar_aceitos(reconciliar(pendentes, indice_medicos_ativos()))
+            messages.success(request, f"{criados} nome(s) vinculado(s) automaticamente.")
+        return redirect("cadastro:reconciliacao_medicos")
+
+    pendentes = nomes_nao_resolvidos()
+    resultado = reconciliar([nome for nome, _, _ in pendentes], indice_medicos_ativos())
+
+    pks = {pk for _, candidatos in resultado.values() for pk, _ in candidatos[:5]}
+    medicos = Medico.objects.select_related("prestador").in_bulk(pks)
+
+    ambiguos, sem_candidato, aceitaveis = [], 0, 0
+    for nome, linhas, agend_totais in pendentes:
+        situacao, candidatos = resultado[nome]
+        if situacao == SEM_CANDIDATO:
+            sem_candidato += 1
+        elif situacao == AMBIGUO:
+            ambiguos.append({
+                "nome_chave": nome,
+                "linhas": linhas,
+                "agend_totais": agend_totais or 0,
+                "candidatos": [(medicos[pk], pontos) for pk, pontos in candidatos[:5]],
+            })
+        else:
+            aceitaveis += 1
+
+    return render(request, "cadastro/reconciliacao_medicos.html", {
+        "ambiguos": ambiguos,
+        "total_pendentes": len(pendentes),
+        "sem_candidato": sem_candidato,
+        "aceitaveis": aceitaveis,
+        "aliases": AliasMedico.objects.select_related("medico").order_by("nome_chave"),
+    })
+
+
 # ── Módulo: Mapeamento de Agendas ─────────────────────────────────────────────
 
 from .producao_siresp import AGENDAS_CONHECIDAS
@@ -417,8 +467,9 @@ def mapeamento_list(request, prestador_pk):
     """Lista e gerencia mapeamentos de agenda para todos os serviços de um prestador."""
     from django.http import JsonResponse
 
+    from .mapeamentos import IndiceMapeamentos
+
     prestador = get_object_or_404(Prestador, pk=prestador_pk)
-    servicos  = prestador.servicos.prefetch_related("mapeamentos").order_by("descricao")
 
     # POST: adicionar ou remover mapeamento
     if request.method == "POST":
@@ -447,6 +498,11 @@ def mapeamento_list(request, prestador_pk):
 
         return redirect("cadastro:mapeamento_list", prestador_pk=prestador_pk)
 
+    indice   = IndiceMapeamentos.do_prestador(prestador)
+    servicos = list(prestador.servicos.order_by("descricao"))
+    for servico in servicos:
+        servico.agendas_mapeadas = indice.mapeamentos(servico)
+
     return render(request, "cadastro/mapeamento_list.html", {
         "prestador": prestador,
         "servicos":  servicos,
@@ -1,15 +1,20 @@
-import io
 from datetime import date
 
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import FileResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.arquivos import calcular_sha256
 
 from .models import (
-    Prestador, Especialidade, ContratoUpload,
-    UploadProducao, TipoRelatorioProducao, StatusImportacao,
+    Prestador, Especialidade, ContratoUpload, LoteRelatorio,
+    UploadProducao, TipoRelatorioProducao, StatusUpload, StatusProcessamento,
 )
-from .relatorio_producao import criar_relatorio
+from .fila import enfileirar
+from .relatorio_producao import relatorio_em_bytes
 
 
 def home(request):
@@ -22,6 +27,12 @@ def home(request):
     return render(request, "cadastro/home.html", context)
 
 
+def _upload_com_mesmo_conteudo(sha256: str, tipo: str):
+    """Upload mais recente com o mesmo SHA-256, preferindo o do mesmo tipo."""
+    mesmos = UploadProducao.objects.filter(sha256=sha256).order_by("-enviado_em")
+    return mesmos.filter(tipo=tipo).first() or mesmos.first()
+
+
 def acompanhamento(request):
     """Módulo de acompanhamento de produção — upload de XLS do SIRESP."""
     if request.method == "POST":
@@ -37,21 +48,42 @@ def acompanhamento(request):
             messages.error(request, "Formato inválido. Envie um arquivo .xls ou .xlsx.")
             return redirect("cadastro:acompanhamento")
 
-        upload = UploadProducao(
-            arquivo=arquivo,
-            tipo=tipo,
-            status=StatusImportacao.PENDENTE,
-        )
-        upload.save()
+        # — Mesmo conteúdo já enviado? Reaproveita resultado e arquivo em disco —
+        sha256 = calcular_sha256(arquivo)
+        existente = _upload_com_mesmo_conteudo(sha256, tipo)
 
-        # Processa imediatamente com o parser adequado ao tipo de relatório
-        try:
-            if tipo == TipoRelatorioProducao.CIRURGIA_EXAME:
-                from .producao_siresp_exames import processar_upload_exames as _processar
+        if existente and existente.tipo == tipo and existente.status != StatusUpload.ERRO:
+            messages.info(
+                request,
+                f"Arquivo idêntico já enviado em "
+                f"{timezone.localtime(existente.enviado_em).strftime('%d/%m/%Y %H:%M')} "
+                f"({existente.get_status_display().lower()}) — o resultado existente foi "
+                f"reaproveitado. Período: {existente.periodo_display}.",
+            )
+            return redirect("cadastro:acompanhamento")
+
+        if existente and existente.tipo == tipo:
+            # Falhou antes: tenta de novo sobre o mesmo registro e arquivo
+            upload = existente
+        else:
+            upload = UploadProducao(
+                tipo=tipo,
+                status=StatusUpload.PENDENTE,
+                sha256=sha256,
+            )
+            if existente:
+                # Mesmo arquivo enviado com outro tipo: os bytes não são regravados
+                upload.arquivo.name = existente.arquivo.name
+                upload.nome_arquivo = arquivo.name
             else:
-                from .producao_siresp import processar_upload as _processar
-            _processar(upload.pk)
-            upload.refresh_from_db()
+                upload.arquivo = arquivo
+            upload.save()
+
+        # O parser roda no worker da fila (manage.py processar_fila);
+        # a página acompanha o progresso via acompanhamento_status.
+        enfileirar("producao", upload.pk)
+        upload.refresh_from_db()
+        if upload.status == StatusUpload.CONFIRMADO:
             messages.success(
                 request,
                 f"Arquivo importado com sucesso: "
@@ -59,11 +91,13 @@ def acompanhamento(request):
                 f"{upload.total_medicos} registro(s) de médico(s) processados. "
                 f"Período: {upload.periodo_display}.",
             )
-        except Exception as exc:
-            upload.status = StatusImportacao.ERRO
-            upload.erro_processamento = str(exc)
-            upload.save()
-            messages.error(request, f"Erro ao processar o arquivo: {exc}")
+        elif upload.status == StatusUpload.ERRO:
+            messages.error(request, f"Erro ao processar o arquivo: {upload.erro_processamento}")
+        else:
+            messages.info(
+                request,
+                f"Arquivo “{upload.nome_arquivo}” recebido e aguardando processamento.",
+            )
 
         return redirect("cadastro:acompanhamento")
 
@@ -84,6 +118,34 @@ def acompanhamento(request):
     return render(request, "cadastro/acompanhamento.html", context)
 
 
+def acompanhamento_status(request):
+    """
+    Endpoint leve consultado pela página de acompanhamento enquanto há
+    uploads na fila. GET ?ids=1,2,3 → estado/progresso de cada upload.
+    """
+    from .fila import FILAS
+
+    ids = [int(i) for i in request.GET.get("ids", "").split(",") if i.strip().isdigit()]
+    status_display = dict(StatusUpload.choices)
+    # Durante a importação (uma única transação) o progresso está no cache
+    em_andamento = FILAS["producao"].progresso_em_cache(ids[:50])
+    uploads = [
+        {
+            "pk": u["pk"],
+            "status": u["status"],
+            "status_display": status_display.get(u["status"], u["status"]),
+            "progresso": em_andamento.get(u["pk"], u["progresso"]),
+            "total_agendas": u["total_agendas"],
+            "total_medicos": u["total_medicos"],
+            "erro": u["erro_processamento"],
+        }
+        for u in UploadProducao.objects.filter(pk__in=ids[:50]).values(
+            "pk", "status", "progresso", "total_agendas", "total_medicos", "erro_processamento",
+        )
+    ]
+    return JsonResponse({"uploads": uploads})
+
+
 def indicadores(request):
     """Hub do módulo de indicadores com links para os sub-dashboards."""
     return render(request, "cadastro/indicadores.html", {})
@@ -100,38 +162,94 @@ def indicadores_prestador(request):
       mes_fim        — "AAAA-MM"
       agenda         — nome da agenda (filtro de gráfico)
       medico         — nome do médico em UPPER (filtro de gráfico)
+
+    Os dados calculados ficam em cache por (filtros, versão dos dados) —
+    ver cache_indicadores. As trocas de filtro na página buscam só as
+    séries em indicadores_prestador_series.
     """
-    import json, calendar
-    from datetime import date
-    from collections import defaultdict
+    prestador_obj, dados = _dados_prestador(request)
+    return render(request, "cadastro/indicadores_prestador.html", {
+        "prestadores": Prestador.objects.filter(ativo=True).order_by("nome_empresa"),
+        "especialidades": Especialidade.objects.filter(ativa=True).order_by("nome"),
+        "prestador_obj": prestador_obj,
+        **dados,
+    })
+
 
-    from .models import (
-        Prestador, Especialidade, Medico,
-        ServicoContratado, UploadProducao,
-        ProducaoAgenda, ProducaoMedico, AgendaMapeamento,
+def _filtros_prestador(request):
+    return {
+        "prestador":     request.GET.get("prestador", ""),
+        "especialidade": request.GET.get("especialidade", ""),
+        "mes_ini":       request.GET.get("mes_ini", ""),
+        "mes_fim":       request.GET.get("mes_fim", ""),
+        "agenda":        request.GET.get("agenda", "").strip(),
+        "medico":        request.GET.get("medico", "").strip().upper(),
+        "hoje":          date.today().isoformat(),  # meses padrão sem uploads
+    }
+
+
+def _dados_prestador(request):
+    """(Prestador ou None, dados do dashboard) — compartilhado pela página e pela API."""
+    from .cache_indicadores import dados_em_cache
+
+    filtros = _filtros_prestador(request)
+    prestador_obj = (
+        get_object_or_404(Prestador, pk=filtros["prestador"], ativo=True)
+        if filtros["prestador"] else None
+    )
+    dados = dados_em_cache(
+        "indicadores_prestador", filtros,
+        lambda: _dados_indicadores_prestador(prestador_obj, filtros),
     )
+    return prestador_obj, dados
 
-    prestadores    = Prestador.objects.filter(ativo=True).order_by("nome_empresa")
-    especialidades = Especialidade.objects.filter(ativa=True).order_by("nome")
 
-    prestador_pk     = request.GET.get("prestador", "")
-    especialidade_pk = request.GET.get("especialidade", "")
-    mes_ini_str      = request.GET.get("mes_ini", "")
-    mes_fim_str      = request.GET.get("mes_fim", "")
-    filtro_agenda    = request.GET.get("agenda", "").strip()
-    filtro_medico    = request.GET.get("medico", "").strip().upper()
+def _etag_prestador(request):
+    from .cache_indicadores import etag_indicadores
+    return etag_indicadores("indicadores_prestador", _filtros_prestador(request))
+
+
+@condition(etag_func=_etag_prestador)
+def indicadores_prestador_series(request):
+    """
+    API JSON com labels/séries do dashboard por prestador (mesmos filtros GET
+    da página). O ETag muda com a versão dos dados: sem mudanças, 304.
+    """
+    _, dados = _dados_prestador(request)
+    return _resposta_series(dados)
+
+
+def _resposta_series(dados):
+    resposta = JsonResponse({
+        "labels": dados["labels"],
+        "series": dados["series"],
+        "periodo_label": dados["periodo_label"],
+    }, json_dumps_params={"ensure_ascii": False})
+    # O navegador guarda a resposta, mas revalida (If-None-Match) a cada uso
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+
+def _dados_indicadores_prestador(prestador_obj, filtros):
+    """Séries e listas de filtros do dashboard por prestador (sem cache)."""
+    import json, calendar
+
+    from .models import Medico, ServicoContratado
+    from .consultas_producao import (
+        meses_disponiveis, intervalo_meses, producao_por_agenda_mes, agendas_com_producao,
+    )
+    from .mapeamentos import IndiceMapeamentos
+    from .normalizacao import normalizar_nome
 
-    # ── Opções de mês (deduplica por chave) ─────────────────────────────────
-    uploads_qs = UploadProducao.objects.filter(
-        status="confirmado", data_inicio_periodo__isnull=False,
-    ).order_by("data_inicio_periodo")
+    prestador_pk     = filtros["prestador"]
+    especialidade_pk = filtros["especialidade"]
+    mes_ini_str      = filtros["mes_ini"]
+    mes_fim_str      = filtros["mes_fim"]
+    filtro_agenda    = filtros["agenda"]
+    filtro_medico    = filtros["medico"]
 
-    periodos_disponiveis, seen = [], set()
-    for u in uploads_qs:
-        chave = u.data_inicio_periodo.strftime("%Y-%m")
-        if chave not in seen:
-            seen.add(chave)
-            periodos_disponiveis.append((chave, u.data_inicio_periodo.strftime("%b/%Y").capitalize()))
+    # ── Opções de mês ────────────────────────────────────────────────────────
+    periodos_disponiveis = meses_disponiveis()
 
     if not periodos_disponiveis:
         hoje = date.today()
@@ -144,8 +262,6 @@ def indicadores_prestador(request):
     mes_fim_sel = mes_fim_str or (periodos_disponiveis[-1][0] if periodos_disponiveis else date.today().strftime("%Y-%m"))
 
     ctx_base = {
-        "prestadores": prestadores,
-        "especialidades": especialidades,
         "meses_opcoes": periodos_disponiveis,
         "mes_ini_selecionado": mes_ini_sel,
         "mes_fim_selecionado": mes_fim_sel,
@@ -154,17 +270,14 @@ def indicadores_prestador(request):
         "filtro_medico": filtro_medico,
     }
 
-    if not prestador_pk:
-        return render(request, "cadastro/indicadores_prestador.html", {
+    if prestador_obj is None:
+        return {
             **ctx_base,
             "prestador_selecionado": "",
-            "prestador_obj": None,
-            "series": [], "series_json": "[]", "labels_json": "[]",
+            "series": [], "series_json": "[]", "labels": [], "labels_json": "[]",
             "periodo_label": "", "aviso_sem_medicos": False,
             "medicos_disponiveis": [], "agendas_disponiveis": [],
-        })
-
-    prestador_obj = get_object_or_404(Prestador, pk=prestador_pk, ativo=True)
+        }
 
     # ── Serviços contratados ─────────────────────────────────────────────────
     servicos_qs = ServicoContratado.objects.filter(prestador=prestador_obj).select_related("especialidade")
@@ -181,69 +294,32 @@ def indicadores_prestador(request):
     labels = [label for _, label in periodos_no_range]
     chaves = [chave for chave, _ in periodos_no_range]
 
-    ini_global = date(int(chaves[0][:4]), int(chaves[0][5:]), 1)
-    fim_global  = date(
-        int(chaves[-1][:4]), int(chaves[-1][5:]),
-        calendar.monthrange(int(chaves[-1][:4]), int(chaves[-1][5:]))[1],
-    )
-
-    # ── Upload representativo por mês (o mais recente de cada mês) ───────────
-    # Evita acumulação quando há múltiplos uploads para o mesmo mês
-    upload_por_mes = {}  # chave_mes → upload_pk mais recente
-    for u in UploadProducao.objects.filter(
-        status="confirmado",
-        data_inicio_periodo__gte=ini_global,
-        data_inicio_periodo__lte=fim_global,
-    ).order_by("data_inicio_periodo", "-enviado_em"):
-        chave = u.data_inicio_periodo.strftime("%Y-%m")
-        if chave not in upload_por_mes:   # order_by enviado_em desc → primeiro = mais recente
-            upload_por_mes[chave] = u.pk
-
-    uploads_representativos = list(upload_por_mes.values())
+    ini_global, fim_global = intervalo_meses(chaves)
 
     # ── Médicos do prestador ─────────────────────────────────────────────────
-    medicos_do_prestador = sorted(
+    medicos_qs = list(
         Medico.objects.filter(prestador=prestador_obj, ativo=True)
-        .values_list("nome_completo", flat=True)
+        .values_list("pk", "nome_completo")
     )
-    nomes_upper = {n.strip().upper() for n in medicos_do_prestador}
-    aviso_sem_medicos = len(nomes_upper) == 0
-
-    # ── Construir índice de produção ─────────────────────────────────────────
-    # { agenda_upper: { chave_mes: { medico_upper: valor } } }
-    # Granularidade por médico para permitir filtro posterior
-    prod_index = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-
-    if nomes_upper:
-        for pm in ProducaoMedico.objects.filter(
-            agenda__upload__in=uploads_representativos,
-        ).select_related("agenda__upload"):
-            nome_up = pm.nome_medico.strip().upper()
-            if nome_up not in nomes_upper:
-                continue
-            chave_mes  = pm.agenda.upload.data_inicio_periodo.strftime("%Y-%m")
-            agenda_key = pm.agenda.nome_agenda.strip().upper()
-            prod_index[agenda_key][chave_mes][nome_up] += pm.agend_totais
-    else:
-        for ag in ProducaoAgenda.objects.filter(
-            upload__in=uploads_representativos,
-        ).select_related("upload"):
-            chave_mes  = ag.upload.data_inicio_periodo.strftime("%Y-%m")
-            agenda_key = ag.nome_agenda.strip().upper()
-            prod_index[agenda_key][chave_mes]["__total__"] += ag.agend_totais
+    medicos_do_prestador = sorted(nome for _, nome in medicos_qs)
+    pks_medicos = [pk for pk, _ in medicos_qs]
+    aviso_sem_medicos = len(pks_medicos) == 0
 
     # ── Listas para filtros dinâmicos ────────────────────────────────────────
-    agendas_disponiveis = sorted({
-        ag for ag in prod_index.keys()
-    })
+    agendas_disponiveis = agendas_com_producao(ini_global, fim_global, pks_medicos)
     medicos_disponiveis = sorted(medicos_do_prestador)
 
-    # ── Mapeamentos ──────────────────────────────────────────────────────────
-    mapeamentos_por_servico = defaultdict(list)
-    for srv_pk, nome in AgendaMapeamento.objects.filter(
-        servico__prestador=prestador_obj
-    ).values_list("servico_id", "nome_agenda"):
-        mapeamentos_por_servico[srv_pk].append(nome.strip().upper())
+    # ── Mapeamentos (uma consulta para todos os serviços) ───────────────────
+    indice = IndiceMapeamentos.do_prestador(prestador_obj)
+
+    # ── Produção agregada no banco, já com os filtros de agenda e médico ────
+    chaves_por_servico = {srv.pk: indice.chaves_agenda(srv) for srv in servicos}
+    producao = producao_por_agenda_mes(
+        ini_global, fim_global, pks_medicos,
+        agendas={k for ks in chaves_por_servico.values() for k in ks},
+        trecho_agenda=normalizar_nome(filtro_agenda),
+        trecho_medico=normalizar_nome(filtro_medico),
+    )
 
     # ── Montar séries ────────────────────────────────────────────────────────
     tipo_labels = {
@@ -251,101 +327,119 @@ def indicadores_prestador(request):
         "cirurgia_medio": "Cirurgia M. Porte", "exame": "Exame / Laudo", "outro": "Outro",
     }
 
-    # Filtro de agenda aplicado ao conjunto de chaves_agenda
-    def filtrar_agendas(chaves_ag):
-        if filtro_agenda:
-            return [k for k in chaves_ag if filtro_agenda.upper() in k]
-        return chaves_ag
-
-    # Filtro de médico aplicado ao somar o índice
-    def somar_mes(agenda_key, chave_mes):
-        medicos_mes = prod_index[agenda_key].get(chave_mes, {})
-        if filtro_medico:
-            return sum(v for k, v in medicos_mes.items() if filtro_medico in k)
-        return sum(medicos_mes.values())
-
     series = []
     for srv in servicos:
-        chaves_agenda = mapeamentos_por_servico.get(srv.pk) or [srv.descricao.strip().upper()]
-        chaves_agenda = filtrar_agendas(chaves_agenda)
+        chaves_agenda = chaves_por_servico[srv.pk]
 
         producao_por_mes = [
-            sum(somar_mes(ag_key, chave) for ag_key in chaves_agenda)
+            sum(producao.get((ag_key, chave), 0) for ag_key in chaves_agenda)
             for chave in chaves
         ]
 
-        agendas_mapeadas = [
-            m.nome_agenda for m in AgendaMapeamento.objects.filter(servico=srv).order_by("nome_agenda")
-        ] or [srv.descricao]
-
         series.append({
             "id": srv.pk,
             "descricao":      srv.descricao or srv.get_tipo_servico_display(),
             "tipo_label":     tipo_labels.get(srv.tipo_servico, srv.tipo_servico),
             "meta_fixa":      srv.quantidade_estimada_mes,
             "producao":       producao_por_mes,
-            "agendas_mapeadas": agendas_mapeadas,
-            "tem_mapeamento": bool(mapeamentos_por_servico.get(srv.pk)),
+            "agendas_mapeadas": indice.nomes_agenda(srv),
+            "tem_mapeamento": indice.tem_mapeamento(srv),
         })
 
     periodo_label = (
         f"{periodos_no_range[0][1]} – {periodos_no_range[-1][1]}" if periodos_no_range else "—"
     )
 
-    return render(request, "cadastro/indicadores_prestador.html", {
+    return {
         **ctx_base,
         "prestador_selecionado": prestador_pk,
-        "prestador_obj": prestador_obj,
         "series": series,
         "series_json":  json.dumps(series, ensure_ascii=False),
+        "labels":       labels,
         "labels_json":  json.dumps(labels, ensure_ascii=False),
         "periodo_label": periodo_label,
         "aviso_sem_medicos": aviso_sem_medicos,
         "medicos_do_prestador": medicos_do_prestador,
         "medicos_disponiveis":  medicos_disponiveis,
         "agendas_disponiveis":  agendas_disponiveis,
-    })
+    }
 
 
 
 def indicadores_especialidade(request):
     """
     Dashboard de produção por especialidade — independente de prestador.
-    Agrega ProducaoMedico de todos os médicos de uma especialidade,
-    cruzando via Medico.especialidades (M2M).
+    Agrega a produção (ProducaoFato) de todos os médicos de uma
+    especialidade, cruzando via Medico.especialidades (M2M). Os dados
+    calculados ficam em cache por (filtros, versão dos dados).
     """
-    import json, calendar
-    from datetime import date
-    from collections import defaultdict
+    especialidade_obj, dados = _dados_especialidade(request)
+    return render(request, "cadastro/indicadores_especialidade.html", {
+        "especialidades": Especialidade.objects.filter(ativa=True).order_by("nome"),
+        "especialidade_obj": especialidade_obj,
+        **dados,
+    })
+
+
+def _filtros_especialidade(request):
+    return {
+        "especialidade": request.GET.get("especialidade", ""),
+        "mes_ini":       request.GET.get("mes_ini", ""),
+        "mes_fim":       request.GET.get("mes_fim", ""),
+        "medico":        request.GET.get("medico", "").strip().upper(),
+        "hoje":          date.today().isoformat(),
+    }
 
-    from .models import (
-        Especialidade, Medico, UploadProducao,
-        ProducaoMedico, ProducaoAgenda, AgendaMapeamento,
+
+def _dados_especialidade(request):
+    from .cache_indicadores import dados_em_cache
+
+    filtros = _filtros_especialidade(request)
+    especialidade_obj = (
+        get_object_or_404(Especialidade, pk=filtros["especialidade"])
+        if filtros["especialidade"] else None
+    )
+    dados = dados_em_cache(
+        "indicadores_especialidade", filtros,
+        lambda: _dados_indicadores_especialidade(especialidade_obj, filtros),
     )
+    return especialidade_obj, dados
 
-    especialidades    = Especialidade.objects.filter(ativa=True).order_by("nome")
-    especialidade_pk  = request.GET.get("especialidade", "")
-    mes_ini_str       = request.GET.get("mes_ini", "")
-    mes_fim_str       = request.GET.get("mes_fim", "")
-    filtro_medico     = request.GET.get("medico", "").strip().upper()
 
-    # ── Opções de mês ────────────────────────────────────────────────────────
-    uploads_qs = UploadProducao.objects.filter(
-        status="confirmado", data_inicio_periodo__isnull=False,
-    ).order_by("data_inicio_periodo")
+def _etag_especialidade(request):
+    from .cache_indicadores import etag_indicadores
+    return etag_indicadores("indicadores_especialidade", _filtros_especialidade(request))
+
 
-    periodos_disponiveis, seen = [], set()
-    for u in uploads_qs:
-        chave = u.data_inicio_periodo.strftime("%Y-%m")
-        if chave not in seen:
-            seen.add(chave)
-            periodos_disponiveis.append((chave, u.data_inicio_periodo.strftime("%b/%Y").capitalize()))
+@condition(etag_func=_etag_especialidade)
+def indicadores_especialidade_series(request):
+    """API JSON com labels/séries do dashboard por especialidade (ETag / 304)."""
+    _, dados = _dados_especialidade(request)
+    return _resposta_series(dados)
+
+
+def _dados_indicadores_especialidade(especialidade_obj, filtros):
+    """Séries do dashboard por especialidade (sem cache)."""
+    import json
+
+    from .models import Medico
+    from .consultas_producao import (
+        meses_disponiveis, intervalo_meses, producao_por_agenda_mes,
+    )
+    from .normalizacao import normalizar_nome
+
+    especialidade_pk  = filtros["especialidade"]
+    mes_ini_str       = filtros["mes_ini"]
+    mes_fim_str       = filtros["mes_fim"]
+    filtro_medico     = filtros["medico"]
+
+    # ── Opções de mês ────────────────────────────────────────────────────────
+    periodos_disponiveis = meses_disponiveis()
 
     mes_ini_sel = mes_ini_str or (periodos_disponiveis[0][0]  if periodos_disponiveis else date.today().strftime("%Y-%m"))
     mes_fim_sel = mes_fim_str or (periodos_disponiveis[-1][0] if periodos_disponiveis else date.today().strftime("%Y-%m"))
 
     ctx_base = {
-        "especialidades": especialidades,
         "meses_opcoes": periodos_disponiveis,
         "mes_ini_selecionado": mes_ini_sel,
         "mes_fim_selecionado": mes_fim_sel,
@@ -353,15 +447,12 @@ def indicadores_especialidade(request):
         "filtro_medico": filtro_medico,
     }
 
-    if not especialidade_pk:
-        return render(request, "cadastro/indicadores_especialidade.html", {
+    if especialidade_obj is None:
+        return {
             **ctx_base,
-            "especialidade_obj": None,
-            "series": [], "series_json": "[]", "labels_json": "[]",
+            "series": [], "series_json": "[]", "labels": [], "labels_json": "[]",
             "periodo_label": "", "medicos_disponiveis": [],
-        })
-
-    especialidade_obj = get_object_or_404(Especialidade, pk=especialidade_pk)
+        }
 
     # ── Intervalo ────────────────────────────────────────────────────────────
     periodos_no_range = [
@@ -371,66 +462,30 @@ def indicadores_especialidade(request):
     labels = [l for _, l in periodos_no_range]
     chaves = [c for c, _ in periodos_no_range]
 
-    ini_global = date(int(chaves[0][:4]), int(chaves[0][5:]), 1)
-    fim_global  = date(
-        int(chaves[-1][:4]), int(chaves[-1][5:]),
-        calendar.monthrange(int(chaves[-1][:4]), int(chaves[-1][5:]))[1],
-    )
-
-    # Upload representativo por mês (mais recente)
-    upload_por_mes = {}
-    for u in UploadProducao.objects.filter(
-        status="confirmado",
-        data_inicio_periodo__gte=ini_global,
-        data_inicio_periodo__lte=fim_global,
-    ).order_by("data_inicio_periodo", "-enviado_em"):
-        chave = u.data_inicio_periodo.strftime("%Y-%m")
-        if chave not in upload_por_mes:
-            upload_por_mes[chave] = u.pk
-
-    uploads_rep = list(upload_por_mes.values())
+    ini_global, fim_global = intervalo_meses(chaves)
 
     # ── Médicos desta especialidade ──────────────────────────────────────────
-    medicos_esp = Medico.objects.filter(
-        especialidades=especialidade_obj, ativo=True,
-    ).values_list("nome_completo", flat=True)
-    nomes_upper = {n.strip().upper() for n in medicos_esp}
-    medicos_disponiveis = sorted(medicos_esp)
-
-    # ── Índice de produção: { agenda_upper: { chave_mes: { medico: val } } } ─
-    prod_index = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-
-    if nomes_upper:
-        for pm in ProducaoMedico.objects.filter(
-            agenda__upload__in=uploads_rep,
-        ).select_related("agenda__upload"):
-            nome_up = pm.nome_medico.strip().upper()
-            if nome_up not in nomes_upper:
-                continue
-            chave_mes  = pm.agenda.upload.data_inicio_periodo.strftime("%Y-%m")
-            agenda_key = pm.agenda.nome_agenda.strip().upper()
-            prod_index[agenda_key][chave_mes][nome_up] += pm.agend_totais
-    else:
-        # Sem médicos cadastrados: usa ProducaoAgenda para as agendas da especialidade
-        for ag in ProducaoAgenda.objects.filter(upload__in=uploads_rep).select_related("upload"):
-            chave_mes  = ag.upload.data_inicio_periodo.strftime("%Y-%m")
-            agenda_key = ag.nome_agenda.strip().upper()
-            prod_index[agenda_key][chave_mes]["__total__"] += ag.agend_totais
+    medicos_esp = list(
+        Medico.objects.filter(especialidades=especialidade_obj, ativo=True)
+        .values_list("pk", "nome_completo")
+    )
+    pks_medicos = [pk for pk, _ in medicos_esp]
+    medicos_disponiveis = sorted(nome for _, nome in medicos_esp)
 
-    # ── Agrupar por agenda (cada agenda = uma série / gráfico) ───────────────
-    def somar_mes(agenda_key, chave_mes):
-        medicos_mes = prod_index[agenda_key].get(chave_mes, {})
-        if filtro_medico:
-            return sum(v for k, v in medicos_mes.items() if filtro_medico in k)
-        return sum(medicos_mes.values())
+    # ── Produção por agenda/mês (sem médicos cadastrados, totais das agendas) ─
+    producao = producao_por_agenda_mes(
+        ini_global, fim_global, pks_medicos,
+        trecho_medico=normalizar_nome(filtro_medico),
+    )
 
-    agendas_com_dados = [ag for ag in sorted(prod_index.keys()) if any(
-        somar_mes(ag, c) > 0 for c in chaves
-    )]
+    # ── Agrupar por agenda (cada agenda = uma série / gráfico) ───────────────
+    agendas_com_dados = sorted({
+        ag for (ag, chave), total in producao.items() if total > 0 and chave in chaves
+    })
 
     series = []
     for ag_key in agendas_com_dados:
-        producao_por_mes = [somar_mes(ag_key, c) for c in chaves]
+        producao_por_mes = [producao.get((ag_key, c), 0) for c in chaves]
         series.append({
             "id":        ag_key,
             "descricao": ag_key.title(),
@@ -442,16 +497,183 @@ def indicadores_especialidade(request):
         f"{periodos_no_range[0][1]} – {periodos_no_range[-1][1]}" if periodos_no_range else "—"
     )
 
-    return render(request, "cadastro/indicadores_especialidade.html", {
+    return {
         **ctx_base,
-        "especialidade_obj": especialidade_obj,
         "series": series,
         "series_json":  json.dumps(series, ensure_ascii=False),
+        "labels":       labels,
         "labels_json":  json.dumps(labels, ensure_ascii=False),
         "periodo_label": periodo_label,
         "medicos_disponiveis": medicos_disponiveis,
+    }
+
+
+def indicadores_comparativo(request):
+    """
+    Comparativo de metas de todos os prestadores ativos.
+
+    Filtros GET:
+      especialidade  — pk da Especialidade
+      mes_ini        — "AAAA-MM"
+      mes_fim        — "AAAA-MM"
+
+    A produção de todos os prestadores e serviços vem de uma única consulta
+    agregada (producao_por_prestador_agenda_mes) e é comparada com
+    ServicoContratado.quantidade_estimada_mes. Os dados ficam em cache por
+    (filtros, versão dos dados), como nos demais dashboards.
+    """
+    from .cache_indicadores import dados_em_cache
+
+    filtros = {
+        "especialidade": request.GET.get("especialidade", ""),
+        "mes_ini":       request.GET.get("mes_ini", ""),
+        "mes_fim":       request.GET.get("mes_fim", ""),
+    }
+    dados = dados_em_cache(
+        "indicadores_comparativo", filtros,
+        lambda: _dados_indicadores_comparativo(filtros),
+    )
+    return render(request, "cadastro/indicadores_comparativo.html", {
+        "especialidades": Especialidade.objects.filter(ativa=True).order_by("nome"),
+        **dados,
     })
 
+
+def _sparkline(valores, meta=0):
+    """Pontos de uma polyline SVG (viewBox 0 0 100 30) e a altura da linha da meta."""
+    topo = max([*valores, meta, 1])
+    passo = 100 / (len(valores) - 1) if len(valores) > 1 else 0
+    pontos = " ".join(
+        f"{i * passo:.1f},{30 - 28 * v / topo:.1f}" for i, v in enumerate(valores)
+    )
+    return {"pontos": pontos, "meta_y": round(30 - 28 * meta / topo, 1) if meta else None}
+
+
+def _atingimento(total, meta):
+    return round(100 * total / meta, 1) if meta else None
+
+
+def _cor_atingimento(atingimento):
+    """Verde a partir de 100%, âmbar a partir de 80%, vermelho abaixo disso."""
+    if atingimento is None:
+        return "#6B5B2E"
+    if atingimento >= 100:
+        return "#2EAA57"
+    return "#C98A00" if atingimento >= 80 else "#C0392B"
+
+
+def _dados_indicadores_comparativo(filtros):
+    """Linhas por prestador e por serviço do comparativo de metas (sem cache)."""
+    from collections import defaultdict
+
+    from .models import Medico, ServicoContratado
+    from .consultas_producao import (
+        meses_disponiveis, intervalo_meses, producao_por_prestador_agenda_mes,
+    )
+    from .mapeamentos import IndiceMapeamentos
+
+    periodos_disponiveis = meses_disponiveis()
+    mes_ini_sel = filtros["mes_ini"] or (periodos_disponiveis[0][0]  if periodos_disponiveis else "")
+    mes_fim_sel = filtros["mes_fim"] or (periodos_disponiveis[-1][0] if periodos_disponiveis else "")
+
+    ctx_base = {
+        "meses_opcoes": periodos_disponiveis,
+        "mes_ini_selecionado": mes_ini_sel,
+        "mes_fim_selecionado": mes_fim_sel,
+        "especialidade_selecionada": filtros["especialidade"],
+    }
+    if not periodos_disponiveis:
+        return {**ctx_base, "prestadores": [], "servicos": [], "labels": [], "periodo_label": ""}
+
+    periodos_no_range = [
+        (c, l) for c, l in periodos_disponiveis if mes_ini_sel <= c <= mes_fim_sel
+    ] or periodos_disponiveis
+    chaves = [c for c, _ in periodos_no_range]
+    ini_global, fim_global = intervalo_meses(chaves)
+
+    # ── Serviços de todos os prestadores ativos ─────────────────────────────
+    servicos_qs = (
+        ServicoContratado.objects.filter(prestador__ativo=True)
+        .select_related("prestador", "especialidade")
+        .order_by("prestador__nome_empresa", "descricao")
+    )
+    if filtros["especialidade"]:
+        servicos_qs = servicos_qs.filter(especialidade__pk=filtros["especialidade"])
+    servicos = list(servicos_qs)
+
+    indice = IndiceMapeamentos.dos_prestadores({srv.prestador_id for srv in servicos})
+    chaves_por_servico = {srv.pk: indice.chaves_agenda(srv) for srv in servicos}
+
+    # Prestadores sem médicos ativos usam os totais das agendas (como no dashboard)
+    com_medicos = set(
+        Medico.objects.filter(ativo=True, prestador__ativo=True)
+        .order_by().values_list("prestador_id", flat=True).distinct()
+    )
+
+    # ── Produção de todos os prestadores numa única consulta ────────────────
+    producao = producao_por_prestador_agenda_mes(
+        ini_global, fim_global,
+        agendas={k for ks in chaves_por_servico.values() for k in ks},
+    )
+
+    linhas_servico = []
+    por_prestador = defaultdict(lambda: {"producao": [0] * len(chaves), "meta_mensal": 0, "servicos": 0})
+    for srv in servicos:
+        origem = srv.prestador_id if srv.prestador_id in com_medicos else None
+        producao_por_mes = [
+            sum(producao.get((origem, ag_key, chave), 0) for ag_key in chaves_por_servico[srv.pk])
+            for chave in chaves
+        ]
+        total = sum(producao_por_mes)
+        meta_mensal = srv.quantidade_estimada_mes or 0
+        atingimento = _atingimento(total, meta_mensal * len(chaves))
+        linhas_servico.append({
+            "prestador_pk": srv.prestador_id,
+            "prestador":    srv.prestador.nome_empresa,
+            "servico":      srv.descricao or srv.get_tipo_servico_display(),
+            "especialidade": srv.especialidade.nome if srv.especialidade else "",
+            "meta_mensal":  meta_mensal,
+            "total":        total,
+            "media":        round(total / len(chaves), 1),
+            "atingimento":  atingimento,
+            "cor":          _cor_atingimento(atingimento),
+            "tem_mapeamento": indice.tem_mapeamento(srv),
+            "sparkline":    _sparkline(producao_por_mes, meta_mensal),
+        })
+
+        resumo = por_prestador[srv.prestador_id]
+        resumo["prestador"] = srv.prestador.nome_empresa
+        resumo["meta_mensal"] += meta_mensal
+        resumo["servicos"] += 1
+        resumo["producao"] = [a + b for a, b in zip(resumo["producao"], producao_por_mes)]
+
+    linhas_prestador = []
+    for prestador_pk, resumo in por_prestador.items():
+        total = sum(resumo["producao"])
+        atingimento = _atingimento(total, resumo["meta_mensal"] * len(chaves))
+        linhas_prestador.append({
+            "prestador_pk": prestador_pk,
+            "prestador":    resumo["prestador"],
+            "servicos":     resumo["servicos"],
+            "meta_mensal":  resumo["meta_mensal"],
+            "total":        total,
+            "media":        round(total / len(chaves), 1),
+            "atingimento":  atingimento,
+            "cor":          _cor_atingimento(atingimento),
+            "sem_medicos":  prestador_pk not in com_medicos,
+            "sparkline":    _sparkline(resumo["producao"], resumo["meta_mensal"]),
+        })
+    linhas_prestador.sort(key=lambda l: (l["atingimento"] is None, -(l["atingimento"] or 0)))
+
+    return {
+        **ctx_base,
+        "prestadores": linhas_prestador,
+        "servicos": linhas_servico,
+        "labels": [l for _, l in periodos_no_range],
+        "periodo_label": f"{periodos_no_range[0][1]} – {periodos_no_range[-1][1]}",
+    }
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Módulo Relatório
 # ─────────────────────────────────────────────────────────────────────────────
@@ -476,75 +698,94 @@ def relatorio(request):
 
 def relatorio_download(request, pk):
     """Gera e devolve o relatório XLSX de um prestador para um período."""
+    from .cache_relatorios import relatorio_em_cache
+    from .mapeamentos import IndiceMapeamentos
+    from .relatorio_lote import com_dados_relatorio, nome_arquivo, parametros_relatorio
+
     prestador = get_object_or_404(Prestador, pk=pk)
     mes_ini = int(request.GET.get("mes", date.today().month))
     ano_ini = int(request.GET.get("ano", date.today().year))
 
-    servicos = []
-    for s in prestador.servicos.all().order_by("tipo_servico", "descricao"):
-        servicos.append({
-            "descricao": s.descricao or s.get_tipo_servico_display(),
-            "cod": s.pk,
-            "agenda": "",
-            "estimativa": s.quantidade_estimada_mes,
-            "valor_unit": float(s.valor_unitario),
-            "producao": {},
-        })
+    def gerar():
+        completo = com_dados_relatorio(Prestador.objects.all()).get(pk=prestador.pk)
+        indice = IndiceMapeamentos.do_prestador(completo)
+        return relatorio_em_bytes(parametros_relatorio(completo, mes_ini, ano_ini, indice))[0]
 
-    if not servicos:
-        especialidade_nome = (
-            prestador.especialidades.first().nome
-            if prestador.especialidades.exists()
-            else "Serviço"
-        )
-        servicos = [{
-            "descricao": especialidade_nome,
-            "cod": 1,
-            "agenda": "",
-            "estimativa": 0,
-            "valor_unit": 0.0,
-            "producao": {},
-        }]
-
-    especialidade_nome = (
-        prestador.especialidades.first().nome
-        if prestador.especialidades.exists()
-        else ""
-    )
+    # Servido direto do cache em disco; só é gerado quando os dados mudaram
+    arquivo, _ = relatorio_em_cache(prestador.pk, mes_ini, ano_ini, gerar)
 
-    wb = criar_relatorio(
-        mes_ini=mes_ini,
-        ano_ini=ano_ini,
-        nome_empresa=prestador.nome_empresa,
-        especialidade=especialidade_nome,
-        servicos=servicos,
-        prestador_nome=prestador.nome_representante or prestador.nome_empresa,
-        crm=prestador.crm_representante or "",
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=nome_arquivo(prestador, mes_ini, ano_ini),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
 
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
 
-    mes_fim = 1 if mes_ini == 12 else mes_ini + 1
-    ano_fim = ano_ini + 1 if mes_ini == 12 else ano_ini
-    filename = (
-        f"relatorio_{prestador.nome_empresa.replace(' ', '_')}_"
-        f"{mes_ini:02d}{ano_ini}_{mes_fim:02d}{ano_fim}.xlsx"
-    )
+def relatorio_lote(request):
+    """
+    Pede o ZIP com o relatório XLSX de todos os prestadores ativos para um
+    período (POST). Filtros opcionais: prestador (repetível) e especialidade.
+
+    O ZIP é gerado pelo worker da fila (LoteRelatorio, ver
+    relatorio_lote.processar_lote); o request só grava o pedido e leva à
+    tela de espera, que baixa o arquivo quando ele fica pronto.
+    """
+    if request.method != "POST":
+        return redirect("cadastro:relatorio")
+
+    mes_ini = int(request.POST.get("mes", date.today().month))
+    ano_ini = int(request.POST.get("ano", date.today().year))
+
+    prestadores = Prestador.objects.filter(ativo=True)
+    pks = [pk for pk in request.POST.getlist("prestador") if pk.isdigit()]
+    if pks:
+        prestadores = prestadores.filter(pk__in=pks)
+    especialidade = request.POST.get("especialidade", "")
+    if especialidade.isdigit():
+        prestadores = prestadores.filter(especialidades=especialidade).distinct()
+
+    pks = sorted(prestadores.values_list("pk", flat=True))
+    if not pks:
+        messages.warning(request, "Nenhum prestador ativo para os filtros selecionados.")
+        return redirect("cadastro:relatorio")
+
+    lote = LoteRelatorio.objects.create(mes_ini=mes_ini, ano_ini=ano_ini, prestadores=pks)
+    enfileirar("relatorios", lote.pk)
+    return redirect("cadastro:relatorio_lote_detalhe", pk=lote.pk)
+
+
+def relatorio_lote_detalhe(request, pk):
+    """Tela de espera de um lote; depois de concluído, devolve o ZIP."""
+    lote = get_object_or_404(LoteRelatorio, pk=pk)
+    if lote.processamento == StatusProcessamento.CONCLUIDO and lote.arquivo:
+        return FileResponse(
+            lote.arquivo.open("rb"),
+            as_attachment=True,
+            filename=lote.nome_download,
+            content_type="application/zip",
+        )
+    return render(request, "cadastro/relatorio_lote.html", {"lote": lote})
 
-    response = HttpResponse(
-        buf,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
+
+def relatorio_lote_status(request, pk):
+    """Estado de um lote, consultado pela tela de espera."""
+    lote = get_object_or_404(LoteRelatorio, pk=pk)
+    return JsonResponse({
+        "processamento": lote.processamento,
+        "processamento_display": lote.get_processamento_display(),
+        "progresso": lote.progresso,
+        "erro": lote.erro,
+    })
 
 
 def diagnostico_producao(request):
     """Rota temporária de diagnóstico — remover após resolver o problema."""
     from django.http import JsonResponse
     from .models import UploadProducao, ProducaoAgenda, ProducaoMedico, Prestador, Medico
+    from .normalizacao import normalizar_nome
+    from .reconciliacao import nomes_nao_resolvidos
+    from .cache_indicadores import estatisticas
 
     prestador_pk = request.GET.get("prestador", "")
 
@@ -554,6 +795,8 @@ def diagnostico_producao(request):
         "amostra_medicos_producao": [],
         "prestador": None,
         "medicos_cadastrados": [],
+        "medicos_nao_resolvidos": [],
+        "cache_indicadores": estatisticas(),
     }
 
     # Uploads
@@ -580,6 +823,8 @@ def diagnostico_producao(request):
         data["amostra_medicos_producao"].append({
             "periodo": str(pm.agenda.upload.data_inicio_periodo),
             "nome_medico": pm.nome_medico,
+            "nome_chave": pm.nome_chave,
+            "medico_id": pm.medico_id,
             "agenda": pm.agenda.nome_agenda,
             "agend_totais": pm.agend_totais,
         })
@@ -595,7 +840,7 @@ def diagnostico_producao(request):
                              for s in p.servicos.all()],
             }
             data["medicos_cadastrados"] = [
-                {"nome_completo": m.nome_completo, "nome_upper": m.nome_completo.strip().upper()}
+                {"pk": m.pk, "nome_completo": m.nome_completo, "nome_chave": m.nome_chave}
                 for m in Medico.objects.filter(prestador=p)
             ]
         except Prestador.DoesNotExist:
@@ -603,19 +848,25 @@ def diagnostico_producao(request):
 
     # Cruzamento: nomes de médicos cadastrados vs nomes na produção
     if data["medicos_cadastrados"] and data["amostra_medicos_producao"]:
-        nomes_upper = {m["nome_upper"] for m in data["medicos_cadastrados"]}
+        pks = {m["pk"] for m in data["medicos_cadastrados"]}
         matches = [pm for pm in data["amostra_medicos_producao"]
-                   if pm["nome_medico"].strip().upper() in nomes_upper]
+                   if pm["medico_id"] in pks]
         data["cruzamento_matches"] = matches
     else:
         data["cruzamento_matches"] = []
 
+    # Nomes da produção sem médico cadastrado correspondente
+    data["medicos_nao_resolvidos"] = [
+        {"nome_chave": nome, "linhas": linhas, "agend_totais": agend_totais or 0}
+        for nome, linhas, agend_totais in nomes_nao_resolvidos()[:100]
+    ]
+
     # Busca específica por nome de médico na produção
     buscar_medico = request.GET.get("buscar_medico", "").strip().upper()
     if buscar_medico:
         matches = list(
             ProducaoMedico.objects
-            .filter(nome_medico__icontains=buscar_medico)
+            .filter(nome_chave__contains=normalizar_nome(buscar_medico))
             .select_related("agenda__upload")
             .values("nome_medico", "agenda__nome_agenda",
                     "agenda__upload__data_inicio_periodo", "agend_totais")
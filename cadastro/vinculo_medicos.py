@@ -0,0 +1,63 @@
+"""
+Vínculo entre a produção do SIRESP e os médicos cadastrados.
+
+O nome do profissional no relatório é casado uma única vez com o cadastro,
+pela chave normalizada (nome_chave), e o resultado fica gravado no FK
+`medico` de ProducaoMedico e ProducaoFato:
+
+  - na importação, cada linha recebe o médico a partir de um dicionário
+    em memória com as chaves de todos os médicos ativos (mapa_medicos);
+  - quando um médico é criado, renomeado, inativado ou excluído, as linhas
+    com as chaves afetadas são re-resolvidas em lote (ver signals.py).
+
+Além do nome cadastrado, valem as grafias aceitas em AliasMedico (ver
+reconciliacao.py); o nome exato tem prioridade sobre um alias. Se dois
+médicos ativos tiverem a mesma chave, vale o cadastrado primeiro.
+"""
+
+from collections import defaultdict
+
+from .models import Medico, AliasMedico, ProducaoMedico, ProducaoFato
+
+
+def mapa_medicos(chaves=None) -> dict:
+    """{ nome_chave: pk } dos médicos ativos (opcionalmente só das `chaves`)."""
+    aliases = AliasMedico.objects.filter(medico__ativo=True)
+    qs = Medico.objects.filter(ativo=True).exclude(nome_chave="")
+    if chaves is not None:
+        aliases = aliases.filter(nome_chave__in=list(chaves))
+        qs = qs.filter(nome_chave__in=list(chaves))
+    mapa = dict(aliases.values_list("nome_chave", "medico_id"))
+    # Ordem decrescente: em chaves repetidas o menor pk sobrescreve os demais
+    mapa.update(qs.order_by("-pk").values_list("nome_chave", "pk"))
+    return mapa
+
+
+def resolver_chaves(chaves) -> None:
+    """Atualiza o FK `medico` das linhas de produção e dos fatos com essas chaves."""
+    chaves = {c for c in chaves if c}
+    if not chaves:
+        return
+    mapa = mapa_medicos(chaves)
+    # Um UPDATE por médico de destino (e um para as chaves sem médico)
+    por_medico = defaultdict(list)
+    for chave in chaves:
+        por_medico[mapa.get(chave)].append(chave)
+    for medico_id, chaves_medico in por_medico.items():
+        ProducaoMedico.objects.filter(nome_chave__in=chaves_medico).exclude(
+            medico_id=medico_id,
+        ).update(medico_id=medico_id)
+        ProducaoFato.objects.filter(profissional_chave__in=chaves_medico).exclude(
+            medico_id=medico_id,
+        ).update(medico_id=medico_id)
+
+
+def chaves_afetadas(medico: Medico) -> set:
+    """Chaves atuais do médico (nome e aliases) e as das linhas hoje vinculadas a ele."""
+    chaves = set(
+        ProducaoMedico.objects.filter(medico=medico)
+        .order_by().values_list("nome_chave", flat=True).distinct()
+    )
+    chaves.update(medico.aliases.values_list("nome_chave", flat=True))
+    chaves.add(medico.nome_chave)
+    return chaves
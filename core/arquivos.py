@@ -0,0 +1,29 @@
+"""
+Utilitários para arquivos enviados pelos usuários.
+"""
+
+import hashlib
+
+# Tamanho do bloco lido a cada iteração ao calcular o hash
+_TAMANHO_BLOCO = 1024 * 1024
+
+
+def calcular_sha256(arquivo) -> str:
+    """
+    Retorna o SHA-256 (hex) do conteúdo de `arquivo`.
+
+    Aceita um UploadedFile do Django (lido por .chunks(), sem carregar o
+    arquivo inteiro na memória) ou qualquer arquivo binário aberto. A
+    posição de leitura volta ao início ao final, para que o arquivo possa
+    ser salvo ou lido em seguida.
+    """
+    h = hashlib.sha256()
+    if hasattr(arquivo, "chunks"):
+        for bloco in arquivo.chunks(_TAMANHO_BLOCO):
+            h.update(bloco)
+    else:
+        arquivo.seek(0)
+        for bloco in iter(lambda: arquivo.read(_TAMANHO_BLOCO), b""):
+            h.update(bloco)
+    arquivo.seek(0)
+    return h.hexdigest()
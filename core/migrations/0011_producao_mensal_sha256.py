@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_usuario_email_verificado_usuario_mudar_senha_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producaomensal',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='SHA-256 do Arquivo'),
+        ),
+    ]
@@ -362,6 +362,9 @@ class ProducaoMensal(models.Model):
 
     perc_desperdicadas = models.DecimalField('% Desperdiçadas', max_digits=7, decimal_places=2, null=True, blank=True)
 
+    # SHA-256 da planilha de origem — identifica reenvios do mesmo arquivo
+    sha256 = models.CharField('SHA-256 do Arquivo', max_length=64, blank=True, db_index=True)
+
     importado_por = models.ForeignKey(
         Usuario,
         on_delete=models.SET_NULL,
@@ -17,6 +17,7 @@ from .forms import (
     ProducaoUploadForm,
 )
 from .models import Usuario, Cirurgia, Exame, ServicoMedico, ProducaoMensal
+from .arquivos import calcular_sha256
 
 
 # DECORATOR PARA TIER 5
@@ -789,6 +790,21 @@ def producao_upload_view(request):
         if form.is_valid():
             arquivo = request.FILES['arquivo']
             nome = arquivo.name.lower()
+
+            # Arquivo idêntico já gravado: não há o que reprocessar
+            sha256 = calcular_sha256(arquivo)
+            importado = (
+                ProducaoMensal.objects.filter(sha256=sha256)
+                .values_list('mes_ano', flat=True).first()
+            )
+            if importado:
+                messages.info(
+                    request,
+                    f'Este arquivo já foi importado para '
+                    f'{_NOMES_MESES[importado.month]}/{importado.year}. Nenhum dado foi alterado.'
+                )
+                return redirect('producao_dashboard')
+
             try:
                 if nome.endswith('.xlsx'):
                     mes_ano, registros = _parse_xlsx(arquivo)
@@ -805,6 +821,7 @@ def producao_upload_view(request):
                     'mes_ano': mes_ano.isoformat(),
                     'mes_ano_display': f"{_NOMES_MESES[mes_ano.month]}/{mes_ano.year}",
                     'registros': registros,
+                    'sha256': sha256,
                 }
                 return redirect('producao_confirmar')
 
@@ -856,6 +873,7 @@ def producao_confirmar_view(request):
                         vagas_extras=reg['vagas_extras'],
                         perc_extras=_d(reg['perc_extras']),
                         perc_desperdicadas=_d(reg['perc_desperdicadas']),
+                        sha256=dados.get('sha256', ''),
                         importado_por=request.user,
                     )
             del request.session['producao_upload']
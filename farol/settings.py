@@ -110,6 +110,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
+# Fila de processamento (uploads SIRESP / contratos PDF)
+# Em produção rode `python manage.py processar_fila`; com FILA_SINCRONA=True
+# o trabalho é executado no próprio request (útil sem worker, em desenvolvimento).
+FILA_SINCRONA = config('FILA_SINCRONA', default=False, cast=bool)
+
+# Cache (dashboards de indicadores — ver cadastro/cache_indicadores.py)
+# Com o worker processar_fila em outro processo, use "file" ou "redis": o
+# progresso das importações é publicado no cache e lido pelo servidor web.
+# CACHE_BACKEND: "locmem" (padrão, por processo), "file" (CACHE_LOCATION é o
+# diretório) ou "redis" (CACHE_LOCATION é a URL, ex. redis://localhost:6379/1;
+# requer o pacote redis).
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'farol'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default='') or _CACHE_BACKENDS[CACHE_BACKEND][1],
+    }
+}
+INDICADORES_CACHE_TIMEOUT = config('INDICADORES_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Cache em disco dos relatórios XLSX (MEDIA_ROOT/relatorios_cache — ver
+# cadastro/cache_relatorios.py): tamanho máximo em MB, com descarte LRU.
+RELATORIOS_CACHE_MAX_MB = config('RELATORIOS_CACHE_MAX_MB', default=200, cast=int)
+
 # Login settings
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hipertensao', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='afericao',
+            index=models.Index(fields=['paciente', '-data_afericao'], name='afericao_paciente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='avaliacaoprevent',
+            index=models.Index(fields=['paciente', '-data_avaliacao', 'risco_10_anos'], name='prevent_paciente_data_idx'),
+        ),
+    ]
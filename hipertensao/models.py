@@ -79,6 +79,10 @@ class Afericao(models.Model):
 
     class Meta:
         ordering = ['-data_afericao']
+        indexes = [
+            # Última aferição do paciente
+            models.Index(fields=['paciente', '-data_afericao'], name='afericao_paciente_data_idx'),
+        ]
 
 
 class AtendimentoMultidisciplinar(models.Model):
@@ -156,6 +160,14 @@ class AvaliacaoPrevent(models.Model):
 
     class Meta:
         verbose_name = "Avaliação PREVENT"
+        indexes = [
+            # Último score por paciente (monitoramento_lista); o risco no fim
+            # do índice responde a subquery sem ler a tabela
+            models.Index(
+                fields=['paciente', '-data_avaliacao', 'risco_10_anos'],
+                name='prevent_paciente_data_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Multi - {self.paciente.nome} - {self.data_atendimento}"